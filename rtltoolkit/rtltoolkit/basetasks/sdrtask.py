@@ -1,11 +1,46 @@
-import os
-import sys
+import threading
 import numpy as np
 
+from rtltoolkit.helpers.blockring import BlockRing
+from rtltoolkit.helpers.metrics import NullMetrics
+from rtltoolkit.sources.pipesource import PipeSource
+
 
 class SDRTask:
     defaults = {}
 
+    # Lookup table holding the normalised value for every byte 'rtl_sdr'
+    # can produce. Indexing it with the raw uint8 samples converts a whole
+    # block to floats between [-1, 1] in a single vectorised pass
+    IQ_LUT = (np.arange(256, dtype=np.float64) - 127.5) / 127.5
+
+    # Seconds of samples the ring buffer between the reader thread and
+    # 'execute' can hold before blocks start being dropped
+    buffer_time = 1.0
+
+    # SampleSource the task reads from. When left unset the samples
+    # come from an 'rtl_sdr' process
+    source = None
+
+    # Tasks whose detection step is stateless set 'parallel'. Their
+    # blocks can then be spread over 'workers' processes. The detector
+    # sees the last 'block_overlap' samples of the previous block in
+    # front of every block, so nothing on a boundary is missed
+    parallel = False
+    workers = 0
+    block_overlap = 0
+    # Whether 'report' needs the samples of the block in parallel mode
+    report_samples = False
+
+    # Tasks which work on the raw interleaved uint8 I/Q bytes set
+    # 'raw_samples'. They get the block as it was read, without it
+    # being converted to complex floats first
+    raw_samples = False
+
+    # Stage timing. Instrumentation is off unless a Metrics instance
+    # is set, the stand-in's hooks do nothing
+    metrics = NullMetrics()
+
     def __init__(self, samp_rate, center_freq, gain, samp_size):
         # Instantiate rtl-sdr instance. If no RTL-SDR is found
         # a OSError will be raised which is handled in main.py
@@ -32,74 +67,180 @@ class SDRTask:
     def execute(self, samples):
         pass
 
+    def detect(self, samples, position=0):
+        # Stateless part of the processing of parallel tasks. It runs
+        # in the worker processes and its result is handed to 'report'.
+        # 'position' is the index of the first sample within the stream,
+        # block overlap included
+        return None
+
+    def report(self, samples, detected):
+        # Stateful part of the processing of parallel tasks. It runs in
+        # the main process, in the order the blocks were received
+        pass
+
+    def open_outputs(self):
+        # Start the task's outputs (e.g. network servers). Called once
+        # the worker processes are forked, so threads started here are
+        # never copied into them
+        pass
+
+    def close_outputs(self):
+        pass
+
     def print_info(self):
         print('Sampling at {} S/s'.format(self.samp_rate))
         print('Tuned to {} Hz'.format(self.center_freq))
         print('Tuner gain set to {} dB'.format(self.gain))
         print('Sample block size is {} bytes'.format(self.samp_size))
 
-    def normalise_samples(data):
-        data = np.array(data).astype(np.float64).view(np.complex128)
-        data /= 127.5
-        data -= (1 + 1j)
+    def tune(self, center_freq=None, gain=None):
+        # Change the tuning of a running task without restarting
+        # the source
+        if not self.source.tunable:
+            raise ValueError('Source can not be retuned while streaming')
 
-        return data
+        if center_freq:
+            self.center_freq = center_freq
+        if gain:
+            self.gain = gain
+
+        self.source.retune(self)
+
+    def normalise_samples(data, out=None):
+        # Wrap the raw bytes in a uint8 array without copying them. Lists
+        # are still accepted so older callers keep working
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = np.frombuffer(data, dtype=np.uint8)
+        else:
+            data = np.asarray(data, dtype=np.uint8)
+
+        # Map every byte through the lookup table. When 'out' is given the
+        # result is written into it, so no new array is allocated per block
+        data = np.take(SDRTask.IQ_LUT, data, out=out)
+
+        return data.view(np.complex128)
+
+    def init_buffers(self):
+        # Preallocate the buffer the raw bytes are read into and the
+        # float buffer the normalised samples are written to. Both are
+        # reused for every block
+        self.samp_size = int(self.samp_size)
+        self.raw_buf = bytearray(self.samp_size * 2)
+        self.raw_arr = np.frombuffer(self.raw_buf, dtype=np.uint8)
+        self.samp_buf = np.empty(self.samp_size * 2, dtype=np.float64)
+
+    def init_ring(self):
+        # Size the ring so it holds roughly 'buffer_time' seconds
+        # of samples, but never less than a few blocks
+        block_count = int(self.buffer_time * self.samp_rate / self.samp_size)
+        self.ring = BlockRing(max(block_count, 4), self.samp_size * 2)
+
+    def add_ring_gauges(self):
+        ring = self.ring
+        self.metrics.add_gauge('ring_overruns', 'Times the ring ran full',
+                               lambda: ring.overruns)
+        self.metrics.add_gauge('ring_dropped_blocks',
+                               'Blocks dropped because the ring was full',
+                               lambda: ring.dropped)
+        if isinstance(ring, BlockRing):
+            self.metrics.add_gauge('ring_fill', 'Blocks waiting in the ring',
+                                   ring.fill)
+
+    def process_blocks(self):
+        metrics = self.metrics
+
+        while True:
+            block = self.ring.get_read_block()
+            if block is None:
+                break
+
+            start = metrics.clock()
+
+            if self.pool is not None:
+                # The block is copied into the pool's shared memory,
+                # after which its slot can be handed back. Submitting
+                # waits while every worker is busy, so its time shows
+                # whether the workers keep up
+                self.pool.submit(block)
+                self.ring.release_read()
+                metrics.count_block(metrics.record('submit', start) - start)
+                continue
+
+            if self.raw_samples:
+                # The block is processed in place, its slot is handed
+                # back only afterwards
+                self.execute(block)
+                self.ring.release_read()
+                metrics.count_block(metrics.record('execute', start) - start)
+                continue
+
+            # Because 'rtl_sdr' serves data byte by byte, meaning
+            # that the even bytes will be the In-phase component
+            # and the odd ones - the Quadrature or vice-versa
+            # Thus we need to split them in order to get complex
+            # numbers and normalise them between [1 + 1j] and [-1 + -1j]
+            samples = SDRTask.normalise_samples(block, self.samp_buf)
+
+            # The block is already converted, so its slot can be
+            # handed back to the reader before processing starts
+            self.ring.release_read()
+            now = metrics.record('normalise', start)
+
+            # Call the execute function to process the incoming signal
+            self.execute(samples)
+            metrics.count_block(metrics.record('execute', now) - start)
 
     def run(self):
         # Print SDR tuning info
         self.print_info()
 
-        # Create pipe for communication between the
-        # 'rtl_sdr' process and the main program
-        r, w = os.pipe()
-        os.set_inheritable(r, True)
-        os.set_inheritable(w, True)
-
-        # Fork process
-        pid = os.fork()
-
-        if pid != 0:
-            # Close the write end of the parent process
-            os.close(w)
-            r = os.fdopen(r, 'rb')
-
-            while True:
-                data = []
-                # Wait for the child process to append data to
-                # the pipe
-                while len(data) == 0:
-                    data = list(r.read(self.samp_size * 2))
-
-                # Because 'rtl_sdr' serves data byte by byte, meaning
-                # that the even bytes will be the In-phase component
-                # and the odd ones - the Quadrature or vice-versa
-                # Thus we need to split them in order to get complex
-                # numbers and normalise them between [1 + 1j] and [-1 + -1j]
-                samples = SDRTask.normalise_samples(data)
-                # Call the execute function to process the incoming signal
-                self.execute(samples)
+        # Unless another source was chosen, samples are read from
+        # an 'rtl_sdr' process
+        if self.source is None:
+            self.source = PipeSource()
+
+        self.init_buffers()
+
+        # The worker processes are started before the source and the
+        # reader thread, so they are forked from a single threaded
+        # process
+        self.pool = None
+        if self.workers and self.parallel:
+            # Imported here, 'multiprocessing.shared_memory' needs
+            # Python 3.8 and single process runs don't use it
+            from rtltoolkit.helpers.blockpool import BlockPool
+            self.pool = BlockPool(self, self.workers)
+        elif self.workers:
+            print('{} does not support parallel processing'
+                  .format(type(self).__name__))
+
+        self.open_outputs()
+        self.source.open(self)
+
+        if self.source.provides_ring:
+            self.ring = self.source.ring
         else:
-            print('Listening...'.format(self.center_freq))
-
-            # Close the read end of the pipe
-            os.close(r)
-            # Redirect the stdin of the new process to the
-            # writting end of the pipe
-            os.dup2(w, sys.stdout.fileno())
-
-            # Redirect the stderr of the new process to
-            # /dev/null. Done because the programe 'rtl_sdr'
-            # starts printing info about the SDR to the
-            # stderr, which pollutes the terminal
-            err = os.open('/dev/null', os.O_WRONLY)
-            os.dup2(err, sys.stderr.fileno())
-
-            # Build the argument array for 'rtl_sdr'
-            # Argument descriptions can be found with
-            # 'rtl_sdr --help'
-            cmd_args = ['rtl_sdr', '-', '-f', str(self.center_freq), '-s',
-                        str(self.samp_rate), '-g', str(self.gain), '-b',
-                        str(self.samp_size * 2)]
-
-            # Execute 'rtl-sdr' in the child process
-            os.execvp('rtl_sdr', cmd_args)
+            self.init_ring()
+
+            # Read the source on a dedicated thread so that a slow call
+            # to 'execute' never backs up the SDR
+            reader = threading.Thread(target=self.source.stream,
+                                      args=(self.ring,), daemon=True)
+            reader.start()
+
+        self.add_ring_gauges()
+        self.metrics.start(self)
+
+        try:
+            self.process_blocks()
+            if self.pool is not None:
+                self.pool.finish()
+        finally:
+            self.metrics.stop()
+            if self.pool is not None:
+                self.pool.close()
+            self.close_outputs()
+            self.ring.print_stats()
+            self.source.close()
+            self.source.print_stats()
@@ -0,0 +1,344 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+from rtltoolkit.basetasks.sdrtask import SDRTask
+from rtltoolkit.helpers import ffthelpers
+from rtltoolkit.helpers import siggen
+from rtltoolkit.helpers.recordsamp import RecordSamp
+
+
+def signal_length(seconds, samp_rate, samp_size):
+    # Samples generated for 'seconds' of signal, cut down to whole blocks
+    # (at least one) as a trailing partial block is never processed and
+    # the messages in it would still be counted as expected
+    return max(int(seconds * samp_rate) // int(samp_size), 1) * int(samp_size)
+
+
+# Every benchmark is given the seconds of signal to generate and a scratch
+# directory, removed once the benchmark is measured. It returns the signal
+# to feed, the sampling rate and block size it's fed at, a factory building
+# a fresh block processor and the number of messages hidden in the signal
+# (None if nothing is decoded)
+
+def bench_adsb(seconds, tmp_dir):
+    from rtltoolkit.demodtasks.adsbdemod import AdsbDemod
+
+    class CountingAdsb(AdsbDemod):
+        decoded = 0
+
+        def report(self, samples, msgs):
+            # Only messages with plain parity, the signal has no others
+            self.decoded += sum(1 for msg, rem in msgs if not rem)
+
+    samp_rate = AdsbDemod.defaults['samp_rate']
+    samp_size = AdsbDemod.defaults['samp_size']
+    iq, expected = siggen.modes_frames(
+        signal_length(seconds, samp_rate, samp_size))
+
+    def factory():
+        return CountingAdsb(samp_rate, None, None, samp_size, False, '')
+
+    return iq, samp_rate, samp_size, factory, expected
+
+
+def bench_temp(seconds, tmp_dir):
+    from rtltoolkit.demodtasks.tempdemod import TempDemod
+
+    samp_rate = TempDemod.defaults['samp_rate']
+    samp_size = TempDemod.defaults['samp_size']
+    iq, expected = siggen.ook_frames(
+        signal_length(seconds, samp_rate, samp_size), samp_rate)
+
+    def factory():
+        return TempDemod(samp_rate, None, None, samp_size, False, '')
+
+    return iq, samp_rate, samp_size, factory, expected
+
+
+def bench_fm(seconds, tmp_dir):
+    from rtltoolkit.demodtasks.fmdemod import FmDemod
+
+    class CountingFm(FmDemod):
+        decoded = 0
+
+        def execute(self, samples):
+            super().execute(samples)
+            self.decoded += 1
+
+    samp_rate = FmDemod.defaults['samp_rate']
+    samp_size = FmDemod.defaults['samp_size']
+    iq = siggen.fm_tone(signal_length(seconds, samp_rate, samp_size),
+                        samp_rate)
+
+    def factory():
+        return CountingFm(samp_rate, None, None, samp_size, False, '')
+
+    return iq, samp_rate, samp_size, factory, None
+
+
+def bench_fft(seconds, tmp_dir):
+    # FftSink's defaults. The sink itself isn't used, only its FFT, so
+    # the benchmark doesn't need matplotlib
+    samp_rate = 2e6
+    samp_size = 2**13
+    iq = siggen.noise(signal_length(seconds, samp_rate, samp_size))
+
+    class FftOnly(SDRTask):
+        decoded = 0
+
+        def execute(self, samples):
+            ffthelpers.calc_fft(samples, samp_rate, len(samples), True)
+
+    def factory():
+        return FftOnly(samp_rate, 1, 1, samp_size)
+
+    return iq, samp_rate, samp_size, factory, None
+
+
+def bench_record(seconds, tmp_dir):
+    from rtltoolkit.recordtasks.rawiq import RawIQ
+
+    samp_rate = RawIQ.defaults['samp_rate']
+    samp_size = RawIQ.defaults['samp_size']
+    iq = siggen.noise(signal_length(seconds, samp_rate, samp_size))
+
+    class Recorder(SDRTask):
+        decoded = 0
+
+        def __init__(self):
+            super().__init__(samp_rate, 1, 1, samp_size)
+            self.samp_record = RecordSamp(os.path.join(tmp_dir, 'bench.npy'))
+
+        def execute(self, samples):
+            self.samp_record.add_to_queue(samples)
+            self.samp_record.save_to_file()
+
+    return iq, samp_rate, samp_size, Recorder, None
+
+
+BENCHES = {
+        'adsb': bench_adsb,
+        'temp': bench_temp,
+        'fm': bench_fm,
+        'fft': bench_fft,
+        'record': bench_record
+        }
+
+
+def run_blocks(task, iq, samp_size, max_blocks=None):
+    block_len = samp_size * 2
+    block_count = len(iq) // block_len
+    if max_blocks:
+        block_count = min(block_count, max_blocks)
+
+    buf = np.empty(block_len, dtype=np.float64)
+
+    # Tasks print their decoded messages, which would only measure
+    # the terminal
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for i in range(block_count):
+            block = iq[i * block_len:(i + 1) * block_len]
+            if task.raw_samples:
+                task.execute(block)
+            else:
+                task.execute(SDRTask.normalise_samples(block, buf))
+        elapsed = time.perf_counter() - start
+
+    return elapsed, block_count * samp_size
+
+
+def measure(name, seconds, repeat):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        iq, samp_rate, samp_size, factory, expected = \
+            BENCHES[name](seconds, tmp_dir)
+        samp_size = int(samp_size)
+
+        # Best of 'repeat' runs, each with a freshly built task
+        best = None
+        decoded = None
+        for _ in range(repeat):
+            task = factory()
+            elapsed, samples = run_blocks(task, iq, samp_size)
+            if best is None or elapsed < best:
+                best = elapsed
+            decoded = task.decoded
+
+        # Peak memory is measured in a separate, shorter run, as tracing
+        # the allocations slows the task down
+        task = factory()
+        tracemalloc.start()
+        run_blocks(task, iq, samp_size, max_blocks=4)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    rate = samples / max(best, 1e-9)
+
+    return {
+            'samp_rate': samp_rate,
+            'samp_size': samp_size,
+            'samples': samples,
+            'seconds': best,
+            'samples_per_sec': rate,
+            'realtime_factor': rate / samp_rate,
+            'peak_mem_bytes': peak,
+            'decoded': decoded,
+            'expected': expected
+            }
+
+
+def print_results(results, baseline=None):
+    print('{:<8}{:>12}{:>12}{:>12}{:>12}{:>10}'.format(
+          'TASK', 'MS/s', 'REALTIME', 'PEAK MB', 'DECODED', 'CHANGE'))
+    print('-' * 66)
+
+    for name, res in results.items():
+        decoded = '-'
+        if res['expected'] is not None:
+            decoded = '{}/{}'.format(res['decoded'], res['expected'])
+
+        change = ''
+        if baseline and name in baseline:
+            old = baseline[name]['samples_per_sec']
+            change = '{:+.1f}%'.format((res['samples_per_sec'] / old - 1) * 100)
+
+        print('{:<8}{:>12.3f}{:>11.2f}x{:>12.2f}{:>12}{:>10}'.format(
+              name, res['samples_per_sec'] / 1e6, res['realtime_factor'],
+              res['peak_mem_bytes'] / 2**20, decoded, change))
+
+
+# Modules which take long to import and must not be loaded before a
+# task is selected
+HEAVY_MODULES = ('numpy', 'scipy', 'matplotlib', 'pyaudio', 'pyModeS',
+                 'rtlsdr')
+
+# Builds the command line parser and parses a task selection the way
+# 'rtltoolkit' does, then reports the time taken and the heavy modules
+# loaded by then
+STARTUP_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+import argparse
+from rtltoolkit import main, registry
+tasks = registry.all_tasks()
+parser = argparse.ArgumentParser()
+main.init_parser(parser, tasks)
+registry.selected_task(parser.parse_args(['--raw']), tasks)
+print(time.perf_counter() - start)
+print(','.join(m for m in {} if m in sys.modules))
+'''.format(HEAVY_MODULES)
+
+
+def measure_startup(repeat):
+    # Every run is a fresh interpreter, the best one is reported. The
+    # total includes starting Python itself
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT],
+                             check=True, stdout=subprocess.PIPE,
+                             universal_newlines=True).stdout
+        total = time.perf_counter() - start
+
+        cli_time, heavy = out.splitlines()[-2:]
+        if best is None or total < best[0]:
+            best = (total, float(cli_time), heavy)
+
+    return best
+
+
+def check_startup(repeat, max_startup):
+    # Startup time regression check. Fails if a heavy module is loaded
+    # before a task is selected or starting takes over 'max_startup'
+    total, cli_time, heavy = measure_startup(repeat)
+    print('Startup: {:.3f} s total, {:.3f} s in the toolkit'
+          .format(total, cli_time))
+
+    failed = False
+    if heavy:
+        print('FAIL: {} imported before a task is selected'.format(heavy))
+        failed = True
+    if max_startup and total > max_startup:
+        print('FAIL: startup took over {:.3f} s'.format(max_startup))
+        failed = True
+
+    return not failed
+
+
+def init_parser(parser):
+    parser.add_argument("tasks",
+                        nargs="*",
+                        help="Benchmarks to run: {} (default: all)"
+                             .format(', '.join(BENCHES)))
+    parser.add_argument("-s",
+                        "--seconds",
+                        type=float,
+                        default=2.0,
+                        help="Seconds of signal generated for each task")
+    parser.add_argument("-n",
+                        "--repeat",
+                        type=int,
+                        default=3,
+                        help="Runs per task, the fastest one is reported")
+    parser.add_argument("-o",
+                        "--output",
+                        help="Save the results to a JSON file")
+    parser.add_argument("--compare",
+                        help="JSON file of an earlier run to compare against")
+    parser.add_argument("--startup",
+                        action="store_true",
+                        help="Check the command line starts without importing any heavy module")
+    parser.add_argument("--max-startup",
+                        type=float,
+                        help="Fail the startup check if starting takes longer, in seconds")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='rtltoolkit bench',
+                                     description="Benchmark the toolkit's tasks on synthetic signals")
+    init_parser(parser)
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        if not check_startup(args.repeat, args.max_startup):
+            sys.exit(1)
+        return
+
+    for name in args.tasks:
+        if name not in BENCHES:
+            parser.error('unknown benchmark \'{}\''.format(name))
+
+    results = {}
+    for name in args.tasks or BENCHES:
+        try:
+            results[name] = measure(name, args.seconds, args.repeat)
+        except ImportError as err:
+            print('Skipping {}: {}'.format(name, err))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'machine': platform.machine(),
+                'results': results
+                }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
@@ -1,8 +1,16 @@
 import numpy as np
 import pyModeS as pms
 import pprint
+import time
+from fractions import Fraction
 
 from rtltoolkit.basetasks.demodtask import DemodTask
+from rtltoolkit.helpers import modescrc
+from rtltoolkit.helpers.aircraft import AircraftTable
+from rtltoolkit.helpers.icaocache import IcaoCache
+from rtltoolkit.helpers.outputserver import OutputServer
+from rtltoolkit.helpers.trackstore import TrackStore
+from rtltoolkit.helpers import basestation
 
 
 class AdsbDemod(DemodTask):
@@ -18,37 +26,152 @@ class AdsbDemod(DemodTask):
     MODES_SHORT_MSG_BITS = 56
     MODES_FULL_LEN = MODES_PREAMBLE + MODES_LONG_MSG_BITS
 
+    # Candidates of one message found at different phases start less
+    # than this many half bits apart
+    COPY_WINDOW = 1
+
+    # Message detection is stateless, so blocks can be searched in
+    # parallel. The scan stops a full message before the end of a
+    # block, and the samples before the scanned part are searched again
+    # only to tell which messages were already found there. Both are
+    # carried into the next block, see 'block_overlap_for'
+    parallel = True
+    block_overlap = (MODES_FULL_LEN * 2 + COPY_WINDOW + 2) * 2
+
+    # Magnitude of every possible I/Q byte pair. Normalised samples
+    # scaled by 255 are 2 * byte - 255, so the squared magnitude is the
+    # sum of two odd squares and halving it is exact. Halved it fits in
+    # 16 bits. The table is indexed with a pair read as a little endian
+    # uint16, i.e. Q * 256 + I
+    MAG_LUT = (((2 * np.arange(256) - 255)[:, None] ** 2 +
+                (2 * np.arange(256) - 255)[None, :] ** 2) // 2) \
+        .astype(np.uint16).ravel()
+
+    # Minimal average difference between the two halves of the bits of
+    # a message, on the halved scale of MAG_LUT
+    MIN_DELTA = 255 / 2
+
+    # Sampling rate the detector was designed for, one sample per
+    # half bit. Faster rates are demodulated at several fractional
+    # phase offsets (in half bits) instead
+    MODES_RATE = 2e6
+    MAX_PHASES = 8
+
+    # Downlink formats whose parity field is XORed with the address
+    ADDR_PARITY_DF = (0, 4, 5, 16, 20, 21)
+
+    # Detection runs straight on the bytes read from the SDR
+    raw_samples = True
+
     def __init__(self, samp_rate, center_freq, gain, samp_size,
-                 verbose=True, file_name=''):
+                 verbose=True, file_name='', ref_pos=None,
+                 beast_port=None, sbs_port=None):
         super().__init__(samp_rate, center_freq, gain, samp_size,
                          verbose, file_name)
-        self.prev_msg = None
+        # Network outputs for other Mode S tools, raw frames in the
+        # Beast binary format and decoded messages as SBS BaseStation
+        # lines. They are started along with the task
+        self.beast = None
+        self.sbs = None
+        if beast_port is not None:
+            self.beast = OutputServer('Beast', beast_port)
+        if sbs_port is not None:
+            self.sbs = OutputServer('SBS', sbs_port)
+
+        # Messages are printed unless they are served to other tools
+        self.print_msgs = verbose or (self.beast is None and self.sbs is None)
+
+        # State of every aircraft in range, keyed by ICAO address. CPR
+        # frames are paired per aircraft, so frames of different
+        # aircraft are never mixed up
+        self.aircraft = AircraftTable(ref_pos=ref_pos)
+        # Addresses confirmed by DF11/DF17, used to accept the replies
+        # whose parity is XORed with the address
+        self.known_icao = IcaoCache()
+
+        # Decoded positions are kept in a track store in the directory
+        # given with --file, to be queried later with 'rtltoolkit tracks'
+        self.tracks = None
+        if file_name:
+            self.tracks = TrackStore(file_name)
+
+        # Samples per half bit
+        self.samp_ratio = self.samp_rate / AdsbDemod.MODES_RATE
+        self.block_overlap = AdsbDemod.block_overlap_for(self.samp_ratio)
+        self.phases = AdsbDemod.phases_for(self.samp_ratio)
+
+        # The scan of a block stops a full message before its end. Those
+        # last samples are kept and searched again in front of the next
+        # block, so frames on a block boundary are not lost. The buffer
+        # holds the magnitude of the carried samples followed by that of
+        # the new block
+        self.carry = None
+        self.carry_len = 0
+        self.init_carry(int(self.samp_size) * 2)
+
+        # Index of the first sample of the next block within the stream,
+        # and of the first sample whose messages weren't reported yet
+        self.stream_pos = 0
+        self.scanned = 0
+
+    def scan_reach(ratio):
+        # Samples spanned by a full message plus the window within which
+        # its copies are compared, at the given rate
+        reach = AdsbDemod.MODES_FULL_LEN * 2 + AdsbDemod.COPY_WINDOW
+        return int(np.ceil(reach * max(ratio, 1))) + 2
+
+    def block_overlap_for(ratio):
+        # The last 'reach' samples of a block can't be scanned yet. The
+        # 'reach' samples before them were scanned, but a message found
+        # there still hides (or is a copy of) one starting after them
+        return AdsbDemod.scan_reach(ratio) * 2
+
+    def phases_for(ratio):
+        # Phase offsets (in half bits) at which to demodulate. With
+        # 'ratio' equal to p / q, the samples are split among the half
+        # bits in only p different ways, one for each multiple of 1 / p
+        steps = Fraction(ratio).limit_denominator(1000).numerator
+        steps = min(steps, AdsbDemod.MAX_PHASES)
+        return np.arange(steps) / steps
+
+    def init_carry(self, block_len):
+        # 'block_len' is in bytes, the buffer has one value per sample.
+        # Samples already carried over survive a change of block size
+        carry = np.empty(self.block_overlap + block_len // 2, dtype=np.uint16)
+        if self.carry is not None:
+            carried = slice(self.block_overlap - self.carry_len,
+                            self.block_overlap)
+            carry[carried] = self.carry[carried]
+        self.carry = carry
 
     def calc_magnitude(samples):
-        samples *= 255
-        samp_mag = np.around(samples.real ** 2 + samples.imag ** 2)
-        return samp_mag
+        # Map every uint8 I/Q pair of the block through the table in
+        # one pass, without converting the block to complex floats
+        if isinstance(samples, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(samples, dtype=np.uint8)
+        pairs = np.ascontiguousarray(samples, dtype=np.uint8).view('<u2')
+
+        return np.take(AdsbDemod.MAG_LUT, pairs)
 
     def detect_out_phase(mag):
-        if mag[3] > mag[2] / 3:
-            return 1
-        if mag[10] > mag[9] / 3:
-            return 1
-        if mag[6] > mag[7] / 3:
-            return 1
+        # 'mag' holds one candidate per row. Returns which of them look
+        # sampled out of phase
+        return (mag[:, 3] > mag[:, 2] / 3) | \
+               (mag[:, 10] > mag[:, 9] / 3) | \
+               (mag[:, 6] > mag[:, 7] / 3)
         # if samp_mag[-1] > samp_mag[1] / 3 return 1
-        return 0
 
     def correct_phase(data_mag):
+        # Every bit's correction depends on the already corrected previous
+        # bit, so the bits are walked in order, but each step handles the
+        # rows of all candidates at once. 'data_mag' is changed in place
         for i in range(0, AdsbDemod.MODES_LONG_MSG_BITS*2 - 2, 2):
-            if(data_mag[i] > data_mag[i + 1]):
-                data_mag[i + 2] = (data_mag[i + 2] * 5) / 4
-            else:
-                data_mag[i + 2] = (data_mag[i + 2] * 4) / 5
+            data_mag[:, i + 2] *= np.where(data_mag[:, i] > data_mag[:, i + 1],
+                                           5 / 4, 4 / 5)
 
         return data_mag
 
-    def check_preamble(mag):
+    def find_preambles(mag, count):
         # PREAMBLE STRUCTURE
         # Each sample has a length of 0.5 microseconds
         # Thus the total length of 16 samples
@@ -69,71 +192,57 @@ class AdsbDemod(DemodTask):
         # 13  -
         # 14  --
         # 15  -
-        if not (mag[0] > mag[1] and
-                mag[1] < mag[2] and
-                mag[2] > mag[3] and
-                mag[3] < mag[0] and
-                mag[4] < mag[0] and
-                mag[5] < mag[0] and
-                mag[6] < mag[0] and
-                mag[7] > mag[8] and
-                mag[8] < mag[9] and
-                mag[9] > mag[6]):
-            return 0
-
-        high = (mag[0] + mag[2] + mag[7] + mag[9]) / 6
+        #
+        # Every one of the first 'count' offsets is tested at once. The
+        # offsets are first narrowed down with the comparisons of the
+        # first three samples over the whole array, the remaining tests
+        # only run on the samples gathered for the surviving offsets.
+        # Returns the offsets at which a preamble starts
+        cand = np.flatnonzero((mag[:count] > mag[1:count + 1]) &
+                              (mag[1:count + 1] < mag[2:count + 2]) &
+                              (mag[2:count + 2] > mag[3:count + 3]))
+
+        # The quiet samples after the first pulse rule out most of the
+        # rest before all of the samples are gathered
+        first = mag[cand]
+        cand = cand[(mag[cand + 3] < first) &
+                    (mag[cand + 4] < first) &
+                    (mag[cand + 5] < first) &
+                    (mag[cand + 6] < first)]
+
+        # Widened, as the sums below would overflow 16 bits
+        m = [mag[cand + k].astype(np.int32)
+             for k in range(AdsbDemod.MODES_PREAMBLE * 2 - 1)]
+
+        valid = ((m[7] > m[8]) &
+                 (m[8] < m[9]) &
+                 (m[9] > m[6]))
+
+        high = (m[0] + m[2] + m[7] + m[9]) / 6
 
         # Check if the 4th and 5th bit of the preamble are lower than the
         # average high. Those two bits are the furthest from two high states
         # which means that that there should be no energy leakege from previous
         # high bits. If those two have a higher level than the average it means
         # that even after applying correction we won't get a valid message
-        if mag[4] >= high or mag[5] >= high:
-            return 0
+        valid &= (m[4] < high) & (m[5] < high)
 
         # Same as for the 4th and 5th
-        if mag[11] >= high or \
-           mag[12] >= high or \
-           mag[13] >= high or \
-           mag[14] >= high:
-            return 0
+        valid &= (m[11] < high) & \
+                 (m[12] < high) & \
+                 (m[13] < high) & \
+                 (m[14] < high)
 
-        return 1
+        return cand[valid]
 
     def pack_into_bits(mag):
-        data_bits = []
-        for j in range(0, AdsbDemod.MODES_LONG_MSG_BITS * 2, 2):
-            low = mag[j]
-            high = mag[j + 1]
-
-            if low == high:
-                data_bits.append(2)
-            elif low > high:
-                data_bits.append(1)
-            else:
-                data_bits.append(0)
-
-        return data_bits
+        # A one has its pulse in the first half of the bit. Equal halves
+        # can't be told apart and are read as a zero, the CRC sorts
+        # those messages out
+        return mag[:, 0::2] > mag[:, 1::2]
 
     def pack_into_bytes(data_bits):
-        data_bytes = []
-        for j in range(0, AdsbDemod.MODES_LONG_MSG_BITS, 8):
-            cur_byte = 0
-            cur_byte |= data_bits[j + 0] << 7
-            cur_byte |= data_bits[j + 1] << 6
-            cur_byte |= data_bits[j + 2] << 5
-            cur_byte |= data_bits[j + 3] << 4
-            cur_byte |= data_bits[j + 4] << 3
-            cur_byte |= data_bits[j + 5] << 2
-            cur_byte |= data_bits[j + 6] << 1
-            cur_byte |= data_bits[j + 7] << 0
-
-            if cur_byte > 255 or cur_byte < 0:
-                cur_byte = 0
-
-            data_bytes.append(cur_byte)
-
-        return data_bytes
+        return np.packbits(data_bits, axis=1)
 
     def dump_magnitude_bar(mag, index):
 
@@ -153,16 +262,11 @@ class AdsbDemod(DemodTask):
 
         return vector
 
-    def is_valid(msg):
-        return int(pms.crc(msg)) == 0
-
     def return_msg_len(msg_type):
-        if msg_type == 16 or msg_type == 17 or \
-           msg_type == 19 or msg_type == 20 or \
-           msg_type == 21:
-            return AdsbDemod.MODES_LONG_MSG_BITS
-        else:
-            return AdsbDemod.MODES_SHORT_MSG_BITS
+        # Works on single values as well as arrays of types
+        long_msg = np.isin(msg_type, (16, 17, 19, 20, 21))
+        return np.where(long_msg, AdsbDemod.MODES_LONG_MSG_BITS,
+                        AdsbDemod.MODES_SHORT_MSG_BITS)
 
     def decode_msg_type(msg):
         return pms.df(msg)
@@ -177,23 +281,17 @@ class AdsbDemod(DemodTask):
 
         return id_fields
 
-    def decode_adsb_pos(self, msg):
+    def decode_adsb_pos(self, plane, msg, now):
         pos_fields = dict()
-        if self.prev_msg is not None \
-           and pms.adsb.oe_flag(msg) != pms.adsb.oe_flag(self.prev_msg):
-
-            lat, lon = 0, 0
-            if pms.adsb.oe_flag(msg) == 0:
-                lat, lon = pms.adsb.airborne_position(msg, self.prev_msg, 1, 0)
-            else:
-                lat, lon = pms.adsb.airborne_position(self.prev_msg, msg, 0, 1)
-
-            pos_fields['LAT'] = lat
-            pos_fields['LON'] = lon
-        else:
-            self.prev_msg = msg
+        plane.alt = pms.adsb.altitude(msg)
+        pos = self.aircraft.update_position(plane, msg, now)
+        if pos is not None:
+            pos_fields['LAT'], pos_fields['LON'] = pos
+            if self.tracks is not None:
+                self.tracks.append(now, plane.icao, pos[0], pos[1],
+                                   plane.alt, plane.speed)
 
-        pos_fields['ALT'] = pms.adsb.altitude(msg)
+        pos_fields['ALT'] = plane.alt
 
         return pos_fields
 
@@ -213,24 +311,34 @@ class AdsbDemod(DemodTask):
 
         return op_fields
 
-    def decode(self, msg):
+    def decode(self, msg, now=None):
+        if now is None:
+            now = time.time()
+
         msg_fields = dict()
         msg_fields['HEX'] = '0x' + msg
         msg_fields['DF'] = AdsbDemod.decode_msg_type(msg)
         msg_fields['ICAO'] = AdsbDemod.decode_msg_icao(msg)
 
         if msg_fields['DF'] == 17:
+            plane = self.aircraft.get(msg_fields['ICAO'], now)
+
             adsb_fields = dict()
             adsb_fields['TC'] = pms.typecode(msg)
 
             if 1 <= adsb_fields['TC'] <= 4:
                 adsb_fields['ID'] = AdsbDemod.decode_adsb_id(msg)
+                plane.callsign = adsb_fields['ID']['CS']
+                plane.category = adsb_fields['ID']['CAT']
 
             if 9 <= adsb_fields['TC'] <= 18:
-                adsb_fields['POS'] = AdsbDemod.decode_adsb_pos(self, msg)
+                adsb_fields['POS'] = self.decode_adsb_pos(plane, msg, now)
 
             if adsb_fields['TC'] == 19:
                 adsb_fields['VEL'] = AdsbDemod.decode_adsb_velocity(msg)
+                plane.speed = adsb_fields['VEL']['SPEED']
+                plane.heading = adsb_fields['VEL']['HEADING']
+                plane.vertical = adsb_fields['VEL']['VERTICAL']
 
             if adsb_fields['TC'] == 31:
                 adsb_fields['OP-STATUS'] = AdsbDemod.decode_adsb_ver(msg)
@@ -239,90 +347,378 @@ class AdsbDemod(DemodTask):
 
         return msg_fields
 
-    def execute(self, samples):
-        mag = AdsbDemod.calc_magnitude(samples)
-        mag_cpy = []
-
-        # Cycle through array of samples searching for a valid message
-        # structure within it
-        for i in range(len(mag) - AdsbDemod.MODES_FULL_LEN * 2):
-            # All of the MODES lengths (defined in the begining of the class)
-            # are multiplied by two, because of the encoding of the data, unitl
-            # the data is converted into bits.
-            # The modulation is PPM(Pulse Position Modulation) and each
-            # pulse accompanied by and idle period represents a bit. Therefore
-            # if one bit is with a length of 1 ms each of the two pulses
-            # representing it will have a length of 0.5 ms. Because of this the
-            # minimal sampling rate needed to catch those short pulses is 2 MHz
-            # (T = 1/(2 * 10^6) = 0.5 ms)
-            #        _____ _____            _____       _____
-            #       |     |     |          |     |     |     |
-            #       |     |     |          |     |     |     |
-            #   OFF | ON  | ON  | OFF  OFF | ON  |     |     |
-            #  _____|     |     |__________|     |_____|     |
-            #
-            # |<--->|<--->|
-            # 0.5ms 0.5ms
-            #
-            # A logical one is denoted by an ON followed by and OFF and a
-            # logical zero by an OFF followed by an ON
-
-            # Check for a valid preamble denoting an incoming message
-            # Keep in mind that having 2 MS/s means that alot of the noice will
-            # be mistaken for a valid preamble, which is the reason for the
-            # later tests of the message
-            if not AdsbDemod.check_preamble(mag[i:
-                                                i+AdsbDemod.MODES_PREAMBLE*2]):
-                continue
-
-            # Due to the fact that the sample period is equal to the length
-            # of the pulses It is unlikely that the pulses will be totaly
-            # synchronised with the sampling process. Therefore small
-            # correction can be made to fix this. The main problem is that
-            # if the pulses are not sampled properly they may "leak" in two
-            # adjecent ones. Therefore phase correction is applied if we
-            # detect that the difference between the low(OFF) and high(ON)
-            # levels is too small which usually denotes incorrect(out of phase)
-            # sampling. In the phase correction we make the high levels a bit
-            # higher and the low ones a bit lower
-
-            data_mag = mag[i + AdsbDemod.MODES_PREAMBLE * 2:
-                           i + AdsbDemod.MODES_FULL_LEN * 2]
-            mag_cpy = list(data_mag)
-
-            if(i and AdsbDemod.detect_out_phase(mag_cpy)):
-                mag_cpy = AdsbDemod.correct_phase(mag_cpy)
-
-            data_bits = AdsbDemod.pack_into_bits(mag_cpy)
-            data_bytes = AdsbDemod.pack_into_bytes(data_bits)
-
-            # The downlink format is contained within the first 5 bits of the
-            # ADS-B message structure. With it we can determine the length of
-            # the message
-            # +--------+--------+-----------+---------------------+---------+
-            # |  DF 5  |  ** 3  |  ICAO 24  |       DATA 56       |  PI 24  |
-            # +--------+--------+-----------+---------------------+---------+
-
-            msg_type = data_bytes[0] >> 3
-            msg_len = AdsbDemod.return_msg_len(msg_type) // 8
-
-            delta = 0
-            for j in range(0, msg_len * 8 * 2, 2):
-                delta += abs(data_mag[j] -
-                             data_mag[j + 1])
-
-            delta /= msg_len * 8
-
-            if delta < 255:
+    def detect(self, samples, position=0):
+        # 'position' is the index of the first sample within the stream.
+        # Every block but the first starts with the previous block's
+        # overlap, the first half of which was scanned already
+        scan_from = 0
+        if position:
+            scan_from = position + self.block_overlap // 2
+        return self.detect_magnitude(AdsbDemod.calc_magnitude(samples),
+                                     position, scan_from)
+
+    def detect_magnitude(self, mag, position=0, scan_from=0):
+        # All of the MODES lengths (defined in the begining of the class)
+        # are multiplied by two, because of the encoding of the data, unitl
+        # the data is converted into bits.
+        # The modulation is PPM(Pulse Position Modulation) and each
+        # pulse accompanied by and idle period represents a bit. Therefore
+        # if one bit is with a length of 1 ms each of the two pulses
+        # representing it will have a length of 0.5 ms. Because of this the
+        # minimal sampling rate needed to catch those short pulses is 2 MHz
+        # (T = 1/(2 * 10^6) = 0.5 ms)
+        #        _____ _____            _____       _____
+        #       |     |     |          |     |     |     |
+        #       |     |     |          |     |     |     |
+        #   OFF | ON  | ON  | OFF  OFF | ON  |     |     |
+        #  _____|     |     |__________|     |_____|     |
+        #
+        # |<--->|<--->|
+        # 0.5ms 0.5ms
+        #
+        # A logical one is denoted by an ON followed by and OFF and a
+        # logical zero by an OFF followed by an ON
+
+        # Candidate starts are in half bits from the start of the stream,
+        # so every block sees the same candidates near its edges as its
+        # neighbours do. Only messages starting from 'scan_from' up to
+        # the last half of the overlap are reported
+        ratio = max(self.samp_ratio, 1)
+        scan_to = position + len(mag) - self.block_overlap // 2
+
+        if self.samp_ratio > 1:
+            starts, data_bytes, msg_bits, delta = \
+                AdsbDemod.oversampled_candidates(mag, self.samp_ratio,
+                                                 self.phases, position)
+        else:
+            starts, data_bytes, msg_bits, delta = AdsbDemod.candidates(mag)
+            starts = starts + position
+
+        keep = np.flatnonzero(delta >= AdsbDemod.MIN_DELTA)
+
+        return AdsbDemod.check_candidates(starts[keep], data_bytes[keep],
+                                          msg_bits[keep], delta[keep],
+                                          scan_from / ratio, scan_to / ratio)
+
+    def candidates(mag):
+        # Search the whole array of samples for the offsets at which a
+        # valid preamble denoting an incoming message starts
+        # Keep in mind that having 2 MS/s means that alot of the noice will
+        # be mistaken for a valid preamble, which is the reason for the
+        # later tests of the message
+        count = max(len(mag) - AdsbDemod.MODES_FULL_LEN * 2, 0)
+        preambles = AdsbDemod.find_preambles(mag, count)
+
+        # Gather the data part of every candidate into a matrix with one
+        # row per candidate, so the tests below run on all of them at once
+        data_len = AdsbDemod.MODES_LONG_MSG_BITS * 2
+        data_idx = preambles[:, None] + AdsbDemod.MODES_PREAMBLE * 2 + \
+            np.arange(data_len)
+        data_mag = mag[data_idx].astype(np.float64)
+
+        # Due to the fact that the sample period is equal to the length
+        # of the pulses It is unlikely that the pulses will be totaly
+        # synchronised with the sampling process. Therefore small
+        # correction can be made to fix this. The main problem is that
+        # if the pulses are not sampled properly they may "leak" in two
+        # adjecent ones. Therefore phase correction is applied if we
+        # detect that the difference between the low(OFF) and high(ON)
+        # levels is too small which usually denotes incorrect(out of phase)
+        # sampling. In the phase correction we make the high levels a bit
+        # higher and the low ones a bit lower
+        out_phase = AdsbDemod.detect_out_phase(data_mag) & (preambles != 0)
+        mag_cpy = data_mag.copy()
+        if np.any(out_phase):
+            mag_cpy[out_phase] = AdsbDemod.correct_phase(mag_cpy[out_phase])
+
+        return (preambles,) + AdsbDemod.score_candidates(data_mag, mag_cpy)
+
+    def slice_half_bits(cum_mag, edges):
+        # Average magnitude of the half bits between consecutive 'edges',
+        # the indices of their first samples. 'cum_mag' is the cumulative
+        # sum of the magnitude with a leading zero, so the sums are exact
+        # and a half bit reads the same in every block
+        return (cum_mag[edges[1:]] - cum_mag[edges[:-1]]) / np.diff(edges)
+
+    def oversampled_candidates(mag, ratio, phases, position=0):
+        # Above 2 MS/s a half bit spans 'ratio' samples and a message
+        # can start anywhere in between them. The magnitude is reduced
+        # to one value per half bit for each of several fractional phase
+        # offsets and every phase is searched as a 2 MS/s signal would
+        # be. The half bits of every phase lie on a grid fixed to the
+        # start of the stream, wherever the block begins. No phase
+        # correction is needed, instead the same message is usually
+        # found at neighbouring phases and 'check_candidates' keeps its
+        # best copy
+        cum_mag = np.concatenate(([0], np.cumsum(mag, dtype=np.int64)))
+
+        found = []
+        for phase in phases:
+            # Every half bit gets the samples whose centre falls within
+            # it. The index of the half bit is added first, so the edges
+            # are rounded the same way whatever block they're in
+            first = int(np.floor((position - 0.5) / ratio - phase))
+            count = int((len(mag) + 1) / ratio) + 2
+            edges = (phase + (first + np.arange(count + 1))) * ratio
+            edges = np.ceil(edges - 0.5).astype(np.int64) - position
+
+            # Only the half bits all of whose samples are in the block
+            lo = np.searchsorted(edges, 0)
+            hi = np.searchsorted(edges, len(mag), side='right')
+            half_bits = AdsbDemod.slice_half_bits(cum_mag, edges[lo:hi])
+            first += lo
+            count = len(half_bits)
+
+            scan = max(count - AdsbDemod.MODES_FULL_LEN * 2, 0)
+            preambles = AdsbDemod.find_preambles(half_bits, scan)
+
+            data_idx = preambles[:, None] + AdsbDemod.MODES_PREAMBLE * 2 + \
+                np.arange(AdsbDemod.MODES_LONG_MSG_BITS * 2)
+            data_mag = half_bits[data_idx]
+            found.append((phase + (preambles + first),) +
+                         AdsbDemod.score_candidates(data_mag, data_mag))
+
+        starts, data_bytes, msg_bits, delta = \
+            (np.concatenate(parts) for parts in zip(*found))
+
+        order = np.argsort(starts, kind='stable')
+        return starts[order], data_bytes[order], msg_bits[order], delta[order]
+
+    def score_candidates(data_mag, mag_cpy):
+        # Bits are decided on the (phase corrected) 'mag_cpy', the
+        # quality of the candidates is judged on the unaltered
+        # 'data_mag'
+        data_bits = AdsbDemod.pack_into_bits(mag_cpy)
+        data_bytes = AdsbDemod.pack_into_bytes(data_bits)
+
+        # The downlink format is contained within the first 5 bits of the
+        # ADS-B message structure. With it we can determine the length of
+        # the message
+        # +--------+--------+-----------+---------------------+---------+
+        # |  DF 5  |  ** 3  |  ICAO 24  |       DATA 56       |  PI 24  |
+        # +--------+--------+-----------+---------------------+---------+
+        msg_type = data_bytes[:, 0] >> 3
+        msg_bits = AdsbDemod.return_msg_len(msg_type)
+
+        # Average difference between the two halves of every bit of the
+        # message
+        diff = np.abs(data_mag[:, 0::2] - data_mag[:, 1::2])
+        short_sum = diff[:, :AdsbDemod.MODES_SHORT_MSG_BITS].sum(axis=1)
+        long_sum = short_sum + \
+            diff[:, AdsbDemod.MODES_SHORT_MSG_BITS:].sum(axis=1)
+        delta = np.where(msg_bits == AdsbDemod.MODES_LONG_MSG_BITS,
+                         long_sum, short_sum) / msg_bits
+
+        return data_bytes, msg_bits, delta
+
+    def best_copies(starts, valid, delta):
+        # 'starts' are sorted. A candidate is dropped if another one less
+        # than COPY_WINDOW half bits away is better: it passed its CRC
+        # where this one didn't, or has the more distinct bits. Equal
+        # ones leave the earliest. A message whose cleanest copy fails
+        # its CRC is thus still taken from the next best copy
+        keep = np.ones(len(starts), dtype=bool)
+        for d in range(1, len(starts)):
+            a = np.flatnonzero(starts[d:] - starts[:-d] <
+                               AdsbDemod.COPY_WINDOW)
+            if not len(a):
+                break
+            b = a + d
+            a_better = (valid[a] > valid[b]) | \
+                ((valid[a] == valid[b]) & (delta[a] >= delta[b]))
+            keep[b[a_better]] = False
+            keep[a[~a_better]] = False
+
+        return keep
+
+    def check_candidates(starts, data_bytes, msg_bits, delta,
+                         first=0, last=np.inf):
+        # 'starts' are the positions of the candidates in half bits, in
+        # ascending order. Only messages starting within [first, last)
+        # are returned, the ones before 'first' just hide their data
+        msgs = []
+        msg_type = data_bytes[:, 0] >> 3
+
+        # Check the parity of every remaining candidate in one pass.
+        # Extended squitters (DF17) carry plain parity, so a single
+        # wrong bit can be located from the remainder and flipped back
+        rem = modescrc.batch_remainder(data_bytes, msg_bits)
+        df17 = np.flatnonzero((msg_type == 17) & (rem != 0))
+        if len(df17):
+            fix_bytes = data_bytes[df17]
+            fixed = modescrc.fix_single_bit(fix_bytes, rem[df17])
+            data_bytes[df17] = fix_bytes
+            rem[df17[fixed]] = 0
+
+        # Replies with address/parity can only be checked against the
+        # known addresses, which is done in order by 'report'. They are
+        # passed on along with their remainder
+        addr_parity = np.isin(msg_type, AdsbDemod.ADDR_PARITY_DF) | \
+            ((msg_type == 11) & (rem < 0x80))
+
+        found = np.flatnonzero((rem == 0) | addr_parity)
+        found = found[AdsbDemod.best_copies(starts[found], rem[found] == 0,
+                                            delta[found])]
+
+        # Half bits up to 'next_free' belong to an already decoded
+        # message, preambles found within it are just parts of its data
+        next_free = -np.inf
+
+        for k in found.tolist():
+            i = starts[k]
+            if i >= last:
+                break
+            if i < next_free:
                 continue
 
-            data_bytes = data_bytes[:msg_len]
-
-            msg = bytes(data_bytes).hex()
-
-            if AdsbDemod.is_valid(msg):
-                msg_fields = self.decode(msg)
+            msg_len = int(msg_bits[k]) // 8
+            if i >= first:
+                msgs.append((data_bytes[k, :msg_len].tobytes().hex(),
+                             int(rem[k])))
+            if not rem[k]:
+                next_free = i + (AdsbDemod.MODES_PREAMBLE + msg_len * 8) * 2
+
+        return msgs
+
+    def check_address(self, msg, rem, now):
+        # DF11 carries its address in the clear, the remainder is the
+        # interrogator code. The other formats XOR the address into the
+        # parity, so the remainder itself has to be a known address
+        if int(msg[:2], 16) >> 3 == 11:
+            return self.known_icao.contains(int(msg[2:8], 16), now)
+
+        return self.known_icao.contains(rem, now)
+
+    def report(self, samples, msgs):
+        # Decoding keeps state between messages (e.g. the previous
+        # position frame), so it runs in the order the messages arrived
+        now = time.time()
+        self.aircraft.expire(now)
+        self.known_icao.expire(now)
+
+        beast = []
+        sbs = []
+
+        for msg, rem in msgs:
+            if rem:
+                if not self.check_address(msg, rem, now):
+                    continue
+            elif int(msg[:2], 16) >> 3 in (11, 17):
+                # Plain parity confirms the address of the aircraft
+                self.known_icao.add(int(msg[2:8], 16), now)
+
+            msg_fields = self.decode(msg, now)
+
+            if self.beast is not None:
+                beast.append(basestation.beast_frame(bytes.fromhex(msg), now))
+            if self.sbs is not None:
+                line = AdsbDemod.sbs_message(msg, msg_fields, now)
+                if line:
+                    sbs.append(line.encode())
+
+            if self.print_msgs:
                 pprint.pprint(msg_fields)
                 print('-' * 60)
 
+        # One write per block and output, however many messages it held
+        if beast:
+            self.beast.send(b''.join(beast))
+        if sbs:
+            self.sbs.send(b''.join(sbs))
+
+    def sbs_message(msg, msg_fields, now):
+        # Map a decoded message to its BaseStation transmission type
+        df = msg_fields['DF']
+        icao = msg_fields['ICAO']
+
+        if df == 17:
+            adsb_fields = msg_fields['ADS-B']
+            if 'ID' in adsb_fields:
+                callsign = adsb_fields['ID']['CS'].strip('_ ')
+                return basestation.sbs_line(basestation.SBS_ID, icao, now,
+                                            callsign=callsign)
+            if 'POS' in adsb_fields:
+                pos = adsb_fields['POS']
+                return basestation.sbs_line(basestation.SBS_AIRBORNE_POS,
+                                            icao, now, alt=pos['ALT'],
+                                            lat=pos.get('LAT'),
+                                            lon=pos.get('LON'))
+            if 'VEL' in adsb_fields:
+                vel = adsb_fields['VEL']
+                return basestation.sbs_line(basestation.SBS_AIRBORNE_VEL,
+                                            icao, now, speed=vel['SPEED'],
+                                            track=vel['HEADING'],
+                                            vertical=vel['VERTICAL'])
+            return None
+
+        if df in (4, 20):
+            return basestation.sbs_line(basestation.SBS_SURV_ALT, icao, now,
+                                        alt=pms.altcode(msg))
+        if df in (5, 21):
+            return basestation.sbs_line(basestation.SBS_SURV_ID, icao, now,
+                                        squawk=pms.idcode(msg))
+        if df in (0, 16):
+            return basestation.sbs_line(basestation.SBS_AIR_TO_AIR, icao, now,
+                                        alt=pms.altcode(msg))
+        if df == 11:
+            return basestation.sbs_line(basestation.SBS_ALL_CALL, icao, now)
+
+        return None
+
+    def open_outputs(self):
+        for server in (self.beast, self.sbs):
+            if server is not None:
+                server.start()
+
+    def close_outputs(self):
+        for server in (self.beast, self.sbs):
+            if server is not None:
+                server.close()
+                server.print_stats()
+
+        if self.tracks is not None:
+            self.tracks.close()
+            print('Stored {} track points in {}'.format(len(self.tracks),
+                                                        self.file_name))
+
+    def carry_over(self, samples):
+        # The magnitude of the block is looked up straight into the
+        # buffer, behind the magnitude carried over from the previous
+        # one, so the block itself is never copied. Returns the view to
+        # search
+        if isinstance(samples, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(samples, dtype=np.uint8)
+        pairs = np.ascontiguousarray(samples, dtype=np.uint8).view('<u2')
+
+        overlap = self.block_overlap
+        if len(self.carry) != overlap + len(pairs):
+            self.init_carry(len(samples))
+
+        np.take(AdsbDemod.MAG_LUT, pairs, out=self.carry[overlap:])
+        return self.carry[overlap - self.carry_len:]
+
+    def keep_tail(self, mag):
+        # Move the end of the searched magnitude to the front of the
+        # buffer. Short blocks may not fill the whole overlap on their own
+        overlap = self.block_overlap
+        self.carry_len = min(overlap, len(mag))
+        self.carry[overlap - self.carry_len:overlap] = \
+            mag[len(mag) - self.carry_len:]
+
+    def execute(self, samples):
+        start = self.metrics.clock()
+        mag = self.carry_over(samples)
+        position = self.stream_pos - self.carry_len
+        msgs = self.detect_magnitude(mag, position, self.scanned)
+
+        # A block shorter than the overlap scans nothing, its samples are
+        # all carried over
+        scan_to = position + len(mag) - self.block_overlap // 2
+        self.scanned = max(self.scanned, scan_to)
+        self.stream_pos = position + len(mag)
+        self.keep_tail(mag)
+        start = self.metrics.record('detect', start)
+        self.report(samples, msgs)
+        self.metrics.record('report', start)
+
 # print(AdsbDemod.dump_magnitude_vect(mag[i - 5:i+AdsbDemod.MODES_FULL_LEN]))
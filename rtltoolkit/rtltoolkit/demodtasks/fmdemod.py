@@ -1,8 +1,10 @@
 import numpy as np
-import pyaudio
 import scipy.signal as signal
 
 from rtltoolkit.basetasks.demodtask import DemodTask
+from rtltoolkit.helpers.audiosink import AudioSink
+from rtltoolkit.helpers.discriminator import FmDiscriminator
+from rtltoolkit.helpers.polyphase import Decimator, Resampler
 
 # 1. Refactor code and remove 'self' where possible
 # 1.5. Deal with annoying warnings and remove pyadio messages
@@ -15,14 +17,19 @@ class FmDemod(DemodTask):
             'samp_rate': 1e6,
             'center_freq': 89.5e6,
             'gain': 'auto',
-            'samp_size': 2e19
+            'samp_size': 2**19
             }
 
     FM_BW = 200000
-    AUDIO_RATE = 44100
+    AUDIO_RATE = 48000
+    AUDIO_LATENCY = 0.2
+    # The discriminator's output, a phase step, is within +-pi. This
+    # maps that range onto 16 bit audio
+    AUDIO_GAIN = (2**15 - 1) / np.pi
 
     def __init__(self, samp_rate, center_freq, gain, samp_size,
-                 verbose=True, file_name=''):
+                 verbose=True, file_name='', audio_rate=None,
+                 fm_polar=False, audio_latency=None):
 
         super().__init__(samp_rate, center_freq, gain, samp_size,
                          verbose, file_name)
@@ -30,66 +37,103 @@ class FmDemod(DemodTask):
         self.dec_rate = int(self.samp_rate / FmDemod.FM_BW)
         self.fm_rate = int(self.samp_rate / self.dec_rate)
 
-        self.dec_audio = int(self.fm_rate / FmDemod.AUDIO_RATE)
-        self.audio_rate = int(self.fm_rate / self.dec_audio)
-        self.stream = None
-
+        # The audio is resampled to exactly the rate the sound card
+        # plays, rather than to the nearest integer fraction of the FM
+        # rate, which would be resampled again by the host
+        self.audio_rate = audio_rate or FmDemod.AUDIO_RATE
+
+        # Filter state is carried from block to block, so the audio has
+        # no discontinuities at the block edges
+        self.fm_decimator = Decimator(self.dec_rate)
+        self.discriminator = FmDiscriminator(polar=fm_polar)
+        self.audio_resampler = Resampler.from_rates(
+            self.samp_rate / self.dec_rate, self.audio_rate)
+        self.de_emphasis_zi = np.zeros(1)
+
+        # The sound card is fed from its own thread, started along with
+        # the task. PyAudio is only needed to play the audio, recording
+        # it to a file works without it
+        self.audio_sink = None
         if verbose:
-            p = pyaudio.PyAudio()
-            self.stream = p.open(format=pyaudio.paInt16,
-                                 channels=1,
-                                 rate=self.audio_rate,
-                                 output=True,
-                                 frames_per_buffer=self.audio_rate)
-
-    def focus_FM_signal(samples, samp_rate):
-        dec_rate = int(samp_rate / FmDemod.FM_BW)
-        samples = signal.decimate(samples, dec_rate)
+            block_len = int(self.samp_size / self.samp_rate *
+                            self.audio_rate) + 1
+            self.audio_sink = AudioSink(self.audio_rate, audio_latency or
+                                        FmDemod.AUDIO_LATENCY, block_len)
+
+    def focus_FM_signal(samples, decimator):
+        samples = decimator.process(samples)
         return samples
 
-    def demod_FM_signal(samples):
-        samples = samples[1:] * np.conj(samples[:-1])
-        samples = np.angle(samples)
+    def demod_FM_signal(samples, discriminator):
+        samples = discriminator.process(samples)
         return samples
 
-    def de_emphasis_filter(samples, fm_rate):
+    def de_emphasis_filter(samples, fm_rate, zi):
         # The de-emphasis filter
         # Given a signal (in a numpy array) with sampling rate samp_rate_fm
+        # and the filter state left by the previous block
         d = fm_rate * 75e-6  # Calculate the # of samples to hit the -3dB point
         x = np.exp(-1 / d)   # Calculate the decay between each sample
         b = [1 - x]          # Create the filter coefficients
         a = [1, -x]
-        samples = signal.lfilter(b, a, samples)
-        return samples
+        samples, zi = signal.lfilter(b, a, samples, zi=zi)
+        return samples, zi
 
-    def focus_mono_signal(samples, fm_rate):
-        dec_audio = int(fm_rate / FmDemod.AUDIO_RATE)
-        samples = signal.decimate(samples, dec_audio)
+    def focus_mono_signal(samples, resampler):
+        samples = resampler.process(samples)
         return samples
 
     def scale_audio(samples):
-        samples *= 2**15 / np.max(np.abs(samples))
+        # Fixed gain, normalising every block by its own peak would make
+        # the level pump from block to block and a silent block divide
+        # by zero. The filters after the discriminator can overshoot its
+        # range a little, that is clipped
+        if not len(samples):
+            return samples
+
+        samples *= FmDemod.AUDIO_GAIN
+        np.clip(samples, -(2**15 - 1), 2**15 - 1, out=samples)
         return samples
 
-    def play_samples(audio_data, stream):
-        audio_data = np.ndarray.tobytes(audio_data.astype("int16"))
-        stream.write(audio_data)
+    def play_samples(audio_data, audio_sink):
+        # Never blocks, the audio is only queued for the sound card
+        audio_sink.write(audio_data.astype("int16"))
+
+    def open_outputs(self):
+        if self.audio_sink is not None:
+            self.audio_sink.start()
+            self.audio_sink.add_gauges(self.metrics)
+
+    def close_outputs(self):
+        if self.audio_sink is not None:
+            self.audio_sink.close()
+            self.audio_sink.print_stats()
 
     def execute(self, samples):
-        samples = np.array(samples)
-        samples = FmDemod.focus_FM_signal(samples, self.samp_rate)
-        samples = FmDemod.demod_FM_signal(samples)
-        samples = FmDemod.de_emphasis_filter(samples, self.fm_rate)
-        samples = FmDemod.focus_mono_signal(samples, self.fm_rate)
+        metrics = self.metrics
+        start = metrics.clock()
+
+        # Narrowed once at the input, the decimator then filters in
+        # single precision and hands complex64 on to the discriminator
+        samples = np.asarray(samples, dtype=np.complex64)
+        samples = FmDemod.focus_FM_signal(samples, self.fm_decimator)
+        start = metrics.record('focus_FM_signal', start)
+        samples = FmDemod.demod_FM_signal(samples, self.discriminator)
+        start = metrics.record('demod_FM_signal', start)
+        samples, self.de_emphasis_zi = \
+            FmDemod.de_emphasis_filter(samples, self.fm_rate,
+                                       self.de_emphasis_zi)
+        start = metrics.record('de_emphasis_filter', start)
+        samples = FmDemod.focus_mono_signal(samples, self.audio_resampler)
+        start = metrics.record('focus_mono_signal', start)
         audio_data = FmDemod.scale_audio(samples)
+        start = metrics.record('scale_audio', start)
 
         if self.verbose:
-            FmDemod.play_samples(audio_data, self.stream)
+            FmDemod.play_samples(audio_data, self.audio_sink)
+            start = metrics.record('play_samples', start)
 
         if self.file_name:
             with open(self.file_name, 'ab') as f:
                 f.write(audio_data.astype('int16'))
-
-    def __del__(self):
-        if self.stream is not None:
-            self.stream.close()
+            metrics.record('write_file', start)
@@ -0,0 +1,115 @@
+import os
+import numpy as np
+
+from rtltoolkit.basetasks.demodtask import DemodTask
+from rtltoolkit.demodtasks.fmdemod import FmDemod
+from rtltoolkit.helpers.audiosink import AudioSink
+from rtltoolkit.helpers.channelizer import Channelizer
+from rtltoolkit.helpers.discriminator import FmDiscriminator
+from rtltoolkit.helpers.polyphase import Resampler
+
+
+class Station:
+    # Demodulation state of one station of the capture
+    def __init__(self, freq, fm_rate, audio_rate, fm_polar, file_name):
+        self.freq = freq
+        self.discriminator = FmDiscriminator(polar=fm_polar)
+        self.de_emphasis_zi = np.zeros(1)
+        self.audio_resampler = Resampler.from_rates(fm_rate, audio_rate)
+        self.file_name = file_name
+
+
+class MultiFmDemod(DemodTask):
+    # Demodulates every station of a list which falls within the
+    # captured band. A channelizer splits each block into one baseband
+    # channel per station for about the cost of a single FFT, then
+    # every channel goes through the same chain FmDemod uses after its
+    # decimation. With '--file NAME.EXT' each station is recorded to
+    # NAME_<MHz>.EXT, with '--verbose' the first one is played
+    defaults = {
+            'samp_rate': 2.4e6,
+            'center_freq': 98e6,
+            'gain': 'auto',
+            'samp_size': 2**18
+            }
+
+    def __init__(self, samp_rate, center_freq, gain, samp_size,
+                 verbose=True, file_name='', stations=(), audio_rate=None,
+                 fm_polar=False, audio_latency=None):
+
+        super().__init__(samp_rate, center_freq, gain, samp_size,
+                         verbose, file_name)
+
+        if not stations:
+            raise ValueError('no stations to demodulate')
+
+        self.audio_rate = audio_rate or FmDemod.AUDIO_RATE
+
+        offsets = [freq - self.center_freq for freq in stations]
+        self.channelizer = Channelizer(self.samp_rate, offsets,
+                                       FmDemod.FM_BW)
+        self.fm_rate = self.channelizer.out_rate
+
+        root, ext = os.path.splitext(file_name)
+        self.stations = []
+        for freq in stations:
+            station_file = ''
+            if file_name:
+                station_file = '{}_{:g}{}'.format(root, freq / 1e6, ext)
+            self.stations.append(Station(freq, self.fm_rate, self.audio_rate,
+                                         fm_polar, station_file))
+
+        self.audio_sink = None
+        if verbose:
+            block_len = int(self.samp_size / self.samp_rate *
+                            self.audio_rate) + 1
+            self.audio_sink = AudioSink(self.audio_rate, audio_latency or
+                                        FmDemod.AUDIO_LATENCY, block_len)
+
+    def print_info(self):
+        super().print_info()
+        for station in self.stations:
+            print('Demodulating {:g} MHz'.format(station.freq / 1e6), end='')
+            if station.file_name:
+                print(' into {}'.format(station.file_name), end='')
+            print()
+
+    def demod_station(self, station, samples):
+        samples = FmDemod.demod_FM_signal(samples, station.discriminator)
+        samples, station.de_emphasis_zi = \
+            FmDemod.de_emphasis_filter(samples, self.fm_rate,
+                                       station.de_emphasis_zi)
+        samples = FmDemod.focus_mono_signal(samples, station.audio_resampler)
+        return FmDemod.scale_audio(samples)
+
+    def execute(self, samples):
+        metrics = self.metrics
+        start = metrics.clock()
+
+        channels = self.channelizer.process(np.asarray(samples))
+        start = metrics.record('channelize', start)
+
+        for k, (station, channel) in enumerate(zip(self.stations, channels)):
+            audio_data = self.demod_station(station, channel)
+            start = metrics.record('demod_station', start)
+            if not len(audio_data):
+                continue
+
+            if self.audio_sink is not None and k == 0:
+                FmDemod.play_samples(audio_data, self.audio_sink)
+                start = metrics.record('play_samples', start)
+
+            if station.file_name:
+                with open(station.file_name, 'ab') as f:
+                    f.write(audio_data.astype('int16'))
+                start = metrics.record('write_file', start)
+
+    def open_outputs(self):
+        if self.audio_sink is not None:
+            self.audio_sink.start()
+            self.audio_sink.add_gauges(self.metrics)
+
+    def close_outputs(self):
+        if self.audio_sink is not None:
+            self.audio_sink.close()
+            self.audio_sink.print_stats()
@@ -25,6 +25,8 @@ class TempDemod(DemodTask):
                          verbose, file_name)
         self.dig_data = []
         self.prev_switch = []
+        # Number of valid messages decoded so far
+        self.decoded = 0
 
     def calc_magnitude(samples):
         mag = samples.real ** 2 + samples.imag ** 2
@@ -53,7 +55,10 @@ class TempDemod(DemodTask):
         if len(off_count) == 1:
             self.prev_switch.clear()
 
-        if self.prev_switch:
+        # The last off-switching goes on in the next block. It's
+        # dropped also when the block ends in a pulse and it hasn't
+        # started yet, otherwise it would be read as a zero
+        if self.prev_switch or samp_ampl[-1] > ampl_mean:
             off_count.pop()
 
         return off_count
@@ -119,6 +124,7 @@ class TempDemod(DemodTask):
             if len(sens_data) != TempDemod.STAT_MSG_BITS:
                 continue
 
+            self.decoded += 1
             print(sens_data)
             msg_fields['HUMID'] = TempDemod.get_humidity(sens_data)
             msg_fields['TEMP'] = TempDemod.get_temp(sens_data)
@@ -127,14 +133,20 @@ class TempDemod(DemodTask):
         return msg_fields
 
     def execute(self, samples):
+        metrics = self.metrics
+        start = metrics.clock()
+
         mag = TempDemod.calc_magnitude(samples)
         off_switch = self.calc_offswitchings(mag)
+        start = metrics.record('calc_offswitchings', start)
         new_data = TempDemod.digitize_signal(off_switch, self.samp_rate)
+        start = metrics.record('digitize_signal', start)
         if not np.any(new_data):
             return
 
         self.dig_data += new_data
         msg_fields = self.decode_data()
+        metrics.record('decode_data', start)
 
         if self.verbose and msg_fields:
             pprint.pprint(msg_fields)
@@ -1,10 +1,10 @@
 import os
-import sys
 import numpy as np
 import scipy
 
 from rtltoolkit.basetasks.displaytask import DisplayTask
 from rtltoolkit.helpers import ffthelpers
+from rtltoolkit.sources.pipesource import PipeSource
 
 
 class ScanFm(DisplayTask):
@@ -114,12 +114,20 @@ class ScanFm(DisplayTask):
         self.print_info()
 
         stations = dict()
-        r, w = os.pipe()
-        os.set_inheritable(r, True)
-        os.set_inheritable(w, True)
 
-        r = os.fdopen(r, 'rb')
+        # Unless another source was chosen, samples are read from
+        # an 'rtl_sdr' process which is restarted at every step
+        if self.source is None:
+            self.source = PipeSource()
 
+        self.init_buffers()
+
+        try:
+            self.scan(stations)
+        finally:
+            self.source.close()
+
+    def scan(self, stations):
         while True:
 
             # Set the SDR's center frequency so that it
@@ -129,45 +137,21 @@ class ScanFm(DisplayTask):
             # Cycle through the whole band until you reach the end
             # of the FM band
             while self.center_freq < ScanFm.FM_END_FREQ:
-                # Fork process
-                pid = os.fork()
-
-                if pid == 0:
-                    # Close the reading end of the pipe
-                    r.close()
-                    # Redirect the stdin of the new process to the
-                    # writting end of the pipe
-                    os.dup2(w, sys.stdout.fileno())
-
-                    # Redirect the stderr of the new process to
-                    # /dev/null. Done because the programe 'rtl_sdr'
-                    # starts printing info about the SDR to the
-                    # stderr, which pollutes the terminal
-                    err = os.open('/dev/null', os.O_WRONLY)
-                    os.dup2(err, sys.stderr.fileno())
-
-                    # Build the argument array for 'rtl_sdr'
-                    # Argument descriptions can be found with
-                    # 'rtl_sdr --help'
-                    cmd_args = ['rtl_sdr', '-', '-f', str(self.center_freq),
-                                '-s', str(self.samp_rate), '-g',
-                                str(self.gain), '-b', str(self.samp_size*2),
-                                '-n', str(self.samp_size)]
-
-                    os.execvp('rtl_sdr', cmd_args)
-
-                data = []
-                # Wait for the child process to write data
-                # in the pipe
-                while len(data) == 0:
-                    data = list(r.read(int(self.samp_size) * 2))
+                # Tune the source to the current step of the band
+                self.source.retune(self)
+
+                # Wait for the source to deliver a whole block
+                # of data. Stop scanning once it runs out
+                if self.source.read_block(self.raw_buf) < len(self.raw_buf):
+                    return
 
                 # Because 'rtl_sdr' serves data byte by byte, meaning
                 # that the even bytes will be the In-phase component
                 # and the odd ones - the Quadrature or vice-versa
                 # Thus we need to split them in order to get complex
                 # numbers and normalise them between [1 + 1j] and [-1 + -1j]
-                samples = ScanFm.normalise_samples(data)
+                samples = ScanFm.normalise_samples(self.raw_arr,
+                                                   self.samp_buf)
 
                 # Get the new found stations
                 new_stations = self.execute(samples)
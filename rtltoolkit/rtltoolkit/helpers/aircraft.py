@@ -0,0 +1,122 @@
+import collections
+import pyModeS as pms
+
+
+class Aircraft:
+    # Everything known about a single aircraft. Slots keep the
+    # per-aircraft footprint small with hundreds of them in range
+    __slots__ = ('icao', 'first_seen', 'last_seen', 'msg_count',
+                 'even_msg', 'even_time', 'odd_msg', 'odd_time',
+                 'lat', 'lon', 'pos_time', 'alt',
+                 'speed', 'heading', 'vertical',
+                 'callsign', 'category')
+
+    def __init__(self, icao, now):
+        self.icao = icao
+        self.first_seen = now
+        self.last_seen = now
+        self.msg_count = 0
+
+        # Last even and odd CPR position frames and when they arrived
+        self.even_msg = None
+        self.even_time = 0.0
+        self.odd_msg = None
+        self.odd_time = 0.0
+
+        self.lat = None
+        self.lon = None
+        self.pos_time = 0.0
+        self.alt = None
+
+        self.speed = None
+        self.heading = None
+        self.vertical = None
+
+        self.callsign = None
+        self.category = None
+
+
+class AircraftTable:
+    # Even and odd frames further apart than this can't be combined
+    # into a global position, the aircraft may have moved too far
+    CPR_PAIR_TIME = 10.0
+    # A decoded position is used as the reference for local decoding
+    # of the aircraft's next frames for this long
+    REF_TIME = 600.0
+
+    def __init__(self, max_size=1024, timeout=300.0, ref_pos=None):
+        # Aircraft are kept in least recently seen order, so both the
+        # aircraft which timed out and the least recently used one when
+        # the table is full are found at the front in O(1)
+        self.aircraft = collections.OrderedDict()
+        self.max_size = max_size
+        self.timeout = timeout
+
+        # Receiver position (lat, lon). Aircraft within range of it can
+        # be located from their very first position frame
+        self.ref_pos = ref_pos
+
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.aircraft)
+
+    def get(self, icao, now):
+        plane = self.aircraft.get(icao)
+
+        if plane is None:
+            plane = Aircraft(icao, now)
+            self.aircraft[icao] = plane
+            if len(self.aircraft) > self.max_size:
+                self.aircraft.popitem(last=False)
+                self.evicted += 1
+        else:
+            self.aircraft.move_to_end(icao)
+
+        plane.last_seen = now
+        plane.msg_count += 1
+
+        return plane
+
+    def expire(self, now):
+        # Drop the aircraft not heard from for 'timeout' seconds
+        while self.aircraft:
+            plane = next(iter(self.aircraft.values()))
+            if now - plane.last_seen <= self.timeout:
+                break
+            self.aircraft.popitem(last=False)
+            self.expired += 1
+
+    def update_position(self, plane, msg, now):
+        # Airborne CPR decoding. A recent position of the aircraft (or
+        # the receiver position) is enough to decode a single frame
+        # locally. Otherwise an even and an odd frame received close
+        # together are decoded globally. Returns (lat, lon) or None
+        if pms.adsb.oe_flag(msg):
+            plane.odd_msg = msg
+            plane.odd_time = now
+        else:
+            plane.even_msg = msg
+            plane.even_time = now
+
+        pos = None
+        if plane.lat is not None and now - plane.pos_time <= \
+                AircraftTable.REF_TIME:
+            pos = pms.adsb.airborne_position_with_ref(msg, plane.lat,
+                                                      plane.lon)
+        elif plane.even_msg is not None and plane.odd_msg is not None and \
+                abs(plane.even_time - plane.odd_time) <= \
+                AircraftTable.CPR_PAIR_TIME:
+            pos = pms.adsb.airborne_position(plane.even_msg, plane.odd_msg,
+                                             plane.even_time, plane.odd_time)
+        elif self.ref_pos is not None:
+            pos = pms.adsb.airborne_position_with_ref(msg, *self.ref_pos)
+
+        if pos is None:
+            return None
+
+        plane.lat, plane.lon = pos
+        plane.pos_time = now
+
+        return pos
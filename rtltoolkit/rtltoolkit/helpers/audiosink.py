@@ -0,0 +1,134 @@
+import numpy as np
+
+
+class AudioSink:
+    # Plays 16 bit mono audio through PyAudio in callback mode. The
+    # demodulator only copies its samples into a ring buffer, the sound
+    # card pulls them out from PortAudio's own thread, so a slow or
+    # stalled output device never holds up the processing of samples
+    #
+    # There is exactly one writer (the task) and one reader (the
+    # callback). Each of them only ever advances its own counter, and
+    # does so after the samples are copied, so the ring needs no lock
+    #
+    # Playback starts once 'latency' seconds of audio are buffered and
+    # starts over the same way after an underrun, which absorbs the
+    # jitter of the blocks arriving. Once a block's worth more than
+    # that is buffered, the newest samples are dropped (an overrun)
+    # instead of waiting for room, which also keeps the latency from
+    # creeping up when the sound card's clock runs slower than the SDR's
+    def __init__(self, audio_rate, latency=0.2, block_len=0):
+        self.audio_rate = audio_rate
+        self.latency = latency
+        self.target = max(int(latency * audio_rate), 1)
+        # Frames handed to the sound card per callback
+        self.period = max(self.target // 4, 64)
+
+        # Most audio the ring holds at a time. 'block_len' is the
+        # number of samples the task writes at once
+        self.max_fill = self.target + max(self.target, block_len) + \
+            self.period
+
+        size = 1
+        while size < self.max_fill:
+            size *= 2
+        self.size = size
+        self.mask = size - 1
+        self.ring = np.zeros(size, dtype=np.int16)
+
+        # Samples written and read so far. Only the task advances
+        # 'written' and only the callback advances 'read'
+        self.written = 0
+        self.read = 0
+        self.playing = False
+
+        self.underruns = 0
+        self.overruns = 0
+        self.dropped = 0
+
+        self.pa = None
+        self.stream = None
+        # pyaudio.paContinue
+        self.continue_flag = 0
+
+    def start(self):
+        import pyaudio
+
+        self.pa = pyaudio.PyAudio()
+        self.continue_flag = pyaudio.paContinue
+        self.stream = self.pa.open(format=pyaudio.paInt16,
+                                   channels=1,
+                                   rate=int(self.audio_rate),
+                                   output=True,
+                                   frames_per_buffer=self.period,
+                                   stream_callback=self.callback)
+        self.stream.start_stream()
+
+    def fill(self):
+        # Seconds of audio waiting to be played
+        return (self.written - self.read) / self.audio_rate
+
+    def write(self, samples):
+        samples = np.asarray(samples)
+        free = self.max_fill - (self.written - self.read)
+        if len(samples) > free:
+            self.overruns += 1
+            self.dropped += len(samples) - free
+            samples = samples[:free]
+
+        n = len(samples)
+        if not n:
+            return
+
+        pos = self.written & self.mask
+        first = min(n, self.size - pos)
+        self.ring[pos:pos + first] = samples[:first]
+        self.ring[:n - first] = samples[first:]
+
+        self.written += n
+
+    def callback(self, in_data, frame_count, time_info, status):
+        out = np.zeros(frame_count, dtype=np.int16)
+        avail = self.written - self.read
+
+        if not self.playing:
+            # Silence until the jitter buffer is full
+            if avail < self.target:
+                return out.tobytes(), self.continue_flag
+            self.playing = True
+
+        n = min(avail, frame_count)
+        if n < frame_count:
+            self.underruns += 1
+            self.playing = False
+
+        pos = self.read & self.mask
+        first = min(n, self.size - pos)
+        out[:first] = self.ring[pos:pos + first]
+        out[first:n] = self.ring[:n - first]
+
+        self.read += n
+        return out.tobytes(), self.continue_flag
+
+    def add_gauges(self, metrics):
+        metrics.add_gauge('audio_fill_seconds', 'Audio waiting to be played',
+                          self.fill)
+        metrics.add_gauge('audio_underruns',
+                          'Times the sound card ran out of audio',
+                          lambda: self.underruns)
+        metrics.add_gauge('audio_overruns',
+                          'Times audio was dropped because the buffer was full',
+                          lambda: self.overruns)
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+        if self.pa is not None:
+            self.pa.terminate()
+            self.pa = None
+
+    def print_stats(self):
+        print('Audio: {} underruns, {} overruns ({} samples dropped)'
+              .format(self.underruns, self.overruns, self.dropped))
@@ -0,0 +1,58 @@
+import datetime
+
+
+# Output formats understood by the usual Mode S tools (dump1090,
+# Virtual Radar Server, tar1090, ...)
+
+# Beast binary. Every frame is 0x1a, a type byte, a 6 byte timestamp
+# of a 12 MHz clock, a signal level byte and the message. A 0x1a
+# byte within the frame is sent twice
+BEAST_ESC = 0x1a
+BEAST_SHORT = 0x32
+BEAST_LONG = 0x33
+BEAST_CLOCK = 12e6
+
+
+def beast_frame(msg, timestamp, signal=0):
+    # 'msg' is the message as bytes, 'timestamp' in seconds
+    ticks = int(timestamp * BEAST_CLOCK) & 0xFFFFFFFFFFFF
+    body = ticks.to_bytes(6, 'big') + bytes((min(int(signal), 255),)) + msg
+    body = body.replace(b'\x1a', b'\x1a\x1a')
+    frame_type = BEAST_LONG if len(msg) == 14 else BEAST_SHORT
+
+    return bytes((BEAST_ESC, frame_type)) + body
+
+
+# SBS-1 BaseStation text. Every message is one line of 22 comma
+# separated fields, only those known for the transmission type are
+# filled in
+SBS_ID = 1
+SBS_AIRBORNE_POS = 3
+SBS_AIRBORNE_VEL = 4
+SBS_SURV_ALT = 5
+SBS_SURV_ID = 6
+SBS_AIR_TO_AIR = 7
+SBS_ALL_CALL = 8
+
+
+def sbs_field(value):
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return '{:.5f}'.format(value).rstrip('0').rstrip('.')
+    return str(value)
+
+
+def sbs_line(msg_type, icao, now, callsign=None, alt=None, speed=None,
+             track=None, lat=None, lon=None, vertical=None, squawk=None):
+    stamp = datetime.datetime.fromtimestamp(now)
+    date = stamp.strftime('%Y/%m/%d')
+    clock = stamp.strftime('%H:%M:%S.') + '{:03d}'.format(
+        stamp.microsecond // 1000)
+
+    fields = ['MSG', msg_type, 1, 1, icao.upper(), 1,
+              date, clock, date, clock,
+              callsign, alt, speed, track, lat, lon, vertical, squawk,
+              None, None, None, None]
+
+    return ','.join(sbs_field(field) for field in fields) + '\r\n'
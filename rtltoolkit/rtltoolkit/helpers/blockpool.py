@@ -0,0 +1,133 @@
+import collections
+import multiprocessing
+import numpy as np
+from multiprocessing import shared_memory
+
+
+# State of a worker process, set up once by 'init_worker'
+worker = {}
+
+
+def init_worker(task, slots):
+    worker['task'] = task
+    worker['slots'] = slots
+    worker['buf'] = np.empty(slots.shape[1], dtype=np.float64)
+
+
+def run_job(slot, start, end, position):
+    # Normalise the block straight from shared memory into the worker's
+    # own buffer and run the task's detector on it. Only the (small)
+    # result travels back through the pool. 'position' is the index of
+    # the first sample of the job within the stream
+    task = worker['task']
+    block = worker['slots'][slot, start:end]
+    if task.raw_samples:
+        return task.detect(block, position)
+
+    samples = type(task).normalise_samples(block,
+                                           worker['buf'][:end - start])
+
+    return task.detect(samples, position)
+
+
+class BlockPool:
+    def __init__(self, task, workers):
+        self.task = task
+        self.workers = workers
+
+        # Every job is the previous block's last 'block_overlap' samples
+        # followed by the new block. Keeping the overlap lets detectors
+        # find messages which straddle the block boundary
+        self.overlap = int(task.block_overlap) * 2
+        self.block_size = int(task.samp_size) * 2
+        slot_size = self.overlap + self.block_size
+
+        # Two jobs per worker keep every worker busy while the results
+        # of the oldest jobs are collected
+        self.slot_count = workers * 2
+        self.shm = shared_memory.SharedMemory(create=True,
+                                              size=self.slot_count * slot_size)
+        self.slots = np.ndarray((self.slot_count, slot_size), dtype=np.uint8,
+                                buffer=self.shm.buf)
+
+        self.tail = np.empty(self.overlap, dtype=np.uint8)
+        self.tail_len = 0
+        # Samples submitted so far
+        self.position = 0
+        self.free_slots = collections.deque(range(self.slot_count))
+        self.jobs = collections.deque()
+
+        # The workers are forked before any reader thread is started,
+        # so the task and the shared buffers are inherited instead of
+        # being pickled
+        ctx = multiprocessing.get_context('fork')
+        self.pool = ctx.Pool(workers, init_worker, (task, self.slots))
+
+    def submit(self, block):
+        if not self.free_slots:
+            self.collect(wait=True)
+
+        slot = self.free_slots.popleft()
+        data = self.slots[slot]
+
+        # Copy the new block behind the tail of the previous one and
+        # keep the end of the new block as the next tail
+        data[self.overlap:] = block
+        start = self.overlap - self.tail_len
+        data[start:self.overlap] = self.tail[:self.tail_len]
+        if self.overlap:
+            self.tail[:] = block[len(block) - self.overlap:]
+            self.tail_len = self.overlap
+
+        position = self.position - (self.overlap - start) // 2
+        self.position += len(block) // 2
+
+        result = self.pool.apply_async(run_job,
+                                       (slot, start, len(data), position))
+        self.jobs.append((slot, result))
+
+        self.collect(wait=False)
+
+    def collect(self, wait):
+        # Results are handed to the task strictly in submission order,
+        # so the output follows the order of the samples even though
+        # the jobs may finish out of order
+        while self.jobs:
+            slot, result = self.jobs[0]
+            if not wait and not result.ready():
+                break
+
+            detected = result.get()
+            self.jobs.popleft()
+
+            samples = None
+            if self.task.report_samples:
+                block = self.slots[slot, self.overlap:]
+                samples = type(self.task).normalise_samples(
+                    block, self.task.samp_buf)
+
+            start = self.task.metrics.clock()
+            self.task.report(samples, detected)
+            self.task.metrics.record('report', start)
+            self.free_slots.append(slot)
+
+            # Waiting is only needed until a single slot is free
+            wait = False
+
+    def finish(self):
+        while self.jobs:
+            self.collect(wait=True)
+
+        self.close()
+
+    def close(self):
+        if self.shm is None:
+            return
+
+        self.pool.terminate()
+        self.pool.join()
+
+        self.slots = None
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
@@ -0,0 +1,89 @@
+import threading
+import numpy as np
+
+
+class BlockRing:
+    def __init__(self, block_count, block_size):
+        self.block_count = int(block_count)
+        self.block_size = int(block_size)
+
+        # All of the blocks are allocated once. The producer and the
+        # consumer only ever hand out views into this array
+        self.blocks = np.empty((self.block_count, self.block_size),
+                               dtype=np.uint8)
+        # Block the producer writes to while the ring is full. Its
+        # content is thrown away so the source keeps being drained
+        self.scratch = np.empty(self.block_size, dtype=np.uint8)
+
+        # Monotonic counters - the slot of a block is the counter
+        # modulo the number of blocks
+        self.write_count = 0
+        self.read_count = 0
+
+        # Loss accounting. An overrun is counted once every time the
+        # ring becomes full, the dropped count grows with every
+        # block that could not be stored
+        self.overruns = 0
+        self.dropped = 0
+        self.max_fill = 0
+
+        self.closed = False
+        self.overflowing = False
+        self.cond = threading.Condition()
+
+    def fill(self):
+        return self.write_count - self.read_count
+
+    def get_write_block(self, wait=False):
+        with self.cond:
+            # Lossless producers wait for the consumer to free a slot
+            # instead of dropping the block
+            while wait and self.fill() >= self.block_count:
+                self.cond.wait()
+
+            if self.fill() >= self.block_count:
+                if not self.overflowing:
+                    self.overruns += 1
+                    self.overflowing = True
+                return self.scratch
+
+            self.overflowing = False
+            return self.blocks[self.write_count % self.block_count]
+
+    def commit_write(self):
+        with self.cond:
+            if self.overflowing:
+                self.dropped += 1
+                return
+
+            self.write_count += 1
+            self.max_fill = max(self.max_fill, self.fill())
+            self.cond.notify_all()
+
+    def get_read_block(self, timeout=None):
+        # Wait for a block to become available. None is returned once
+        # the producer has closed the ring and every block is consumed
+        with self.cond:
+            while not self.fill():
+                if self.closed:
+                    return None
+                if not self.cond.wait(timeout):
+                    return None
+
+            return self.blocks[self.read_count % self.block_count]
+
+    def release_read(self):
+        with self.cond:
+            self.read_count += 1
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def print_stats(self):
+        print('Blocks received: {}'.format(self.write_count + self.dropped))
+        print('Ring overruns: {}'.format(self.overruns))
+        print('Blocks dropped: {}'.format(self.dropped))
+        print('Peak ring fill: {}/{}'.format(self.max_fill, self.block_count))
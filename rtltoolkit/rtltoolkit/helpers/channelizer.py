@@ -0,0 +1,107 @@
+import numpy as np
+import scipy.signal as signal
+
+
+class Channelizer:
+    # Splits a wideband capture into narrow channels, each shifted to
+    # baseband, lowpass filtered and decimated, with one FFT of the
+    # input shared by all of them (a fast convolution filter bank)
+    #
+    # The input is cut into overlapping frames of 'fft_size' samples
+    # (overlap-save). A channel takes the 'fft_size / dec' bins around
+    # its own frequency out of every frame's FFT, weighs them with the
+    # channel filter's response and transforms them back with a short
+    # inverse FFT. Keeping fewer bins is what decimates the channel,
+    # picking them around the channel's frequency is what shifts it.
+    # The bins are 'samp_rate / fft_size' apart, channel frequencies
+    # are rounded to them
+    #
+    # Shifting by whole bins leaves every frame with its own constant
+    # phase, it advances by 2*pi*k*hop/fft_size per frame for a channel
+    # k bins off center. It is taken out again, otherwise the channel
+    # would jump in phase (and an FM discriminator click) every frame
+
+    # Width of the filter's transition band
+    TRANSITION = 25e3
+    # Inverse FFT length of a channel
+    CHANNEL_FFT = 1024
+
+    def __init__(self, samp_rate, offsets, channel_bw=200e3):
+        # 'offsets' are the channel frequencies relative to the center
+        # of the capture. Channels are sampled at twice their bandwidth
+        # (or the closest rate above it the capture divides into)
+        self.samp_rate = samp_rate
+        self.offsets = list(offsets)
+        self.dec = max(int(samp_rate / (2 * channel_bw)), 1)
+        self.out_rate = samp_rate / self.dec
+
+        for offset in self.offsets:
+            if abs(offset) > (samp_rate - channel_bw) / 2:
+                raise ValueError('channel at {:+g} Hz is outside of the '
+                                 '{:g} Hz capture'.format(offset, samp_rate))
+
+        num_taps = int(3.3 * samp_rate / Channelizer.TRANSITION) | 1
+        taps = signal.firwin(num_taps, channel_bw / 2, fs=samp_rate)
+
+        # Frames overlap by the filter length, rounded up so every hop
+        # is a whole number of output samples
+        self.overlap = -(-(num_taps - 1) // self.dec) * self.dec
+        channel_fft = Channelizer.CHANNEL_FFT
+        while channel_fft * self.dec < 4 * self.overlap:
+            channel_fft *= 2
+        self.fft_size = channel_fft * self.dec
+        self.hop = self.fft_size - self.overlap
+
+        # Filter response on the channel's bins, in the order the
+        # inverse FFT expects them. The 1 / dec makes up for the
+        # shorter inverse transform
+        idx = np.fft.fftfreq(channel_fft, 1 / channel_fft).astype(int)
+        response = np.fft.fft(taps, self.fft_size)
+        self.response = response[idx % self.fft_size] / self.dec
+
+        self.bins = []
+        self.rotation = []
+        self.phase = []
+        # Frequencies the channels are actually centered on
+        self.centers = []
+        for offset in self.offsets:
+            k = int(round(offset * self.fft_size / samp_rate))
+            self.centers.append(k * samp_rate / self.fft_size)
+            self.bins.append((k + idx) % self.fft_size)
+            self.rotation.append(np.exp(-2j * np.pi * k * self.hop /
+                                        self.fft_size))
+            # The first frame starts 'overlap' samples before the input
+            self.phase.append(np.exp(2j * np.pi * k * self.overlap /
+                                     self.fft_size))
+
+        # Input not processed yet, preceded by the overlap
+        self.pending = np.zeros(self.overlap, dtype=np.complex128)
+
+    def process(self, samples):
+        # Returns one array of baseband samples per channel
+        pending = np.concatenate((self.pending, samples))
+        frames = (len(pending) - self.overlap) // self.hop
+
+        outputs = []
+        if frames > 0:
+            spectra = np.fft.fft(np.lib.stride_tricks.sliding_window_view(
+                pending, self.fft_size)[::self.hop][:frames], axis=1)
+            skip = self.overlap // self.dec
+
+            for k in range(len(self.offsets)):
+                rotation = self.rotation[k]
+                phases = self.phase[k] * rotation ** np.arange(frames)
+                self.phase[k] *= rotation ** frames
+                # Keep the phase on the unit circle
+                self.phase[k] /= abs(self.phase[k])
+
+                channel = np.fft.ifft(spectra[:, self.bins[k]] *
+                                      self.response, axis=1)
+                channel = channel[:, skip:] * phases[:, None]
+                outputs.append(channel.ravel())
+        else:
+            outputs = [np.empty(0, dtype=np.complex128)
+                       for _ in self.offsets]
+
+        self.pending = pending[max(frames, 0) * self.hop:]
+        return outputs
@@ -30,7 +30,9 @@ import numpy as np
 class FilterDesign():
     # Butterworth Filter Lowpass Prototype Element Values
     # http://www.rfcafe.com/references/electrical/butter-proto-values.htm
-
+    #
+    # The rows have different lengths, numpy only builds such a ragged
+    # array with an explicit dtype=object
     coefs = np.array([[0],
                       [2.0],
                       [1.41421, 1.41421],
@@ -40,7 +42,7 @@ class FilterDesign():
                       [0.51764, 1.41421, 1.93185, 1.93185, 1.41421, 0.51764],
                       [0.44504, 1.24698, 1.80194, 2.0, 1.80194, 1.24698, 0.44504],
                       [0.39018, 1.11114, 1.66294, 1.96157, 1.96157, 1.66294, 1.11114, 0.39018],
-                      [0.34730, 1.0, 1.53209, 1.87938, 2.0, 1.87938, 1.53209, 1.0, 0.34730]])
+                      [0.34730, 1.0, 1.53209, 1.87938, 2.0, 1.87938, 1.53209, 1.0, 0.34730]], dtype=object)
 
     def __init__(self, poles, bw, L, Rs = 50, Rl = 50):
         self.poles = poles # Number of poles(defines the order of the filter)
@@ -0,0 +1,38 @@
+class IcaoCache:
+    # ICAO addresses recently confirmed by messages with plain parity
+    # (DF11, DF17). Most Mode S replies carry their address XORed into
+    # the parity field instead, so their CRC remainder is the address.
+    # Such a reply is accepted only if the remainder is a confirmed
+    # address, which is a single dictionary lookup per message
+    def __init__(self, timeout=60.0):
+        self.timeout = timeout
+        # Address (int) -> time it was last confirmed
+        self.seen = {}
+        self.last_purge = 0.0
+
+    def __len__(self):
+        return len(self.seen)
+
+    def add(self, icao, now):
+        self.seen[icao] = now
+
+    def contains(self, icao, now):
+        seen = self.seen.get(icao)
+        if seen is None:
+            return False
+
+        if now - seen > self.timeout:
+            del self.seen[icao]
+            return False
+
+        return True
+
+    def expire(self, now):
+        # Addresses which are never looked up again are dropped by an
+        # occasional full pass, keeping the cache bounded
+        if now - self.last_purge < self.timeout:
+            return
+
+        self.seen = {icao: seen for icao, seen in self.seen.items()
+                     if now - seen <= self.timeout}
+        self.last_purge = now
@@ -0,0 +1,226 @@
+import bisect
+import os
+import threading
+import time
+
+
+class StageStats:
+    # Upper bounds of the latency histogram buckets in seconds. They
+    # span the time a single numpy call takes up to a stalled block
+    BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3,
+               5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self):
+        # The last counter collects everything above the largest bucket
+        self.counts = [0] * (len(StageStats.BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, elapsed):
+        self.counts[bisect.bisect_left(StageStats.BUCKETS, elapsed)] += 1
+        self.total += elapsed
+        self.count += 1
+        if elapsed > self.max:
+            self.max = elapsed
+
+
+class NullMetrics:
+    # Stand-in used while instrumentation is off. Every hook is a no-op
+    # which skips even reading the clock, so the instrumented code
+    # paths cost a couple of method calls per block
+    enabled = False
+
+    def clock(self):
+        return 0.0
+
+    def record(self, stage, start):
+        return 0.0
+
+    def count_block(self, elapsed):
+        pass
+
+    def add_gauge(self, name, help_text, func):
+        pass
+
+    def start(self, task):
+        pass
+
+    def stop(self):
+        pass
+
+
+class Metrics:
+    # Per stage latency histograms, block throughput and real-time
+    # headroom of a running task. Stages are timed by the code doing
+    # the work:
+    #
+    #   start = metrics.clock()
+    #   ...
+    #   start = metrics.record('stage', start)
+    #
+    # 'record' returns the current time, so consecutive stages can be
+    # chained without reading the clock twice. The stats are exported
+    # in the Prometheus text format, either as a file rewritten every
+    # 'interval' seconds or over HTTP on localhost
+    enabled = True
+    PREFIX = 'rtltoolkit'
+
+    def __init__(self, file_name=None, port=None, interval=5.0):
+        self.file_name = file_name
+        self.port = port
+        self.interval = interval
+
+        self.stages = {}
+        self.gauges = []
+        self.lock = threading.Lock()
+
+        self.blocks = 0
+        self.block_time = 0.0
+        self.budget = 0.0
+        self.headroom = 0.0
+        self.min_headroom = 1.0
+        self.start_time = None
+        self.labels = ''
+
+        self.server = None
+        self.writer = None
+        self.stopping = threading.Event()
+
+    def clock(self):
+        return time.perf_counter()
+
+    def record(self, stage, start):
+        now = time.perf_counter()
+        stats = self.stages.get(stage)
+        if stats is None:
+            # Stages may first show up on the reader thread
+            with self.lock:
+                stats = self.stages.setdefault(stage, StageStats())
+        stats.add(now - start)
+
+        return now
+
+    def count_block(self, elapsed):
+        # 'elapsed' is the time the block took to process. The budget
+        # is the time the block covers, so the headroom is the fraction
+        # of it left idle. Negative headroom means falling behind
+        self.blocks += 1
+        self.block_time += elapsed
+        if self.budget:
+            self.headroom = 1 - elapsed / self.budget
+            self.min_headroom = min(self.min_headroom, self.headroom)
+
+    def add_gauge(self, name, help_text, func):
+        # Values owned by other objects (e.g. the ring fill) are
+        # sampled only when the metrics are exported
+        self.gauges.append((name, help_text, func))
+
+    def render(self):
+        prefix = Metrics.PREFIX
+        labels = self.labels
+        elapsed = max(time.perf_counter() - self.start_time, 1e-9) \
+            if self.start_time is not None else 0.0
+
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append('# HELP {}_{} {}'.format(prefix, name, help_text))
+            lines.append('# TYPE {}_{} {}'.format(prefix, name, kind))
+
+        def value(name, val, extra=''):
+            sep = ',' if extra and labels else ''
+            label_set = labels + sep + extra
+            if label_set:
+                label_set = '{' + label_set + '}'
+            lines.append('{}_{}{} {}'.format(prefix, name, label_set, val))
+
+        metric('blocks_total', 'counter', 'Blocks processed')
+        value('blocks_total', self.blocks)
+        metric('blocks_per_second', 'gauge',
+               'Average blocks processed per second')
+        value('blocks_per_second', self.blocks / elapsed if elapsed else 0)
+        metric('block_budget_seconds', 'gauge',
+               'Real-time duration of a single block')
+        value('block_budget_seconds', self.budget)
+        metric('headroom_ratio', 'gauge',
+               'Fraction of the last block\'s budget left idle')
+        value('headroom_ratio', self.headroom)
+        metric('min_headroom_ratio', 'gauge',
+               'Lowest headroom of any block so far')
+        value('min_headroom_ratio', self.min_headroom)
+        metric('busy_ratio', 'gauge',
+               'Fraction of the wall clock time spent processing blocks')
+        value('busy_ratio', self.block_time / elapsed if elapsed else 0)
+
+        metric('stage_seconds', 'histogram', 'Latency of each pipeline stage')
+        with self.lock:
+            stages = list(self.stages.items())
+        for stage, stats in stages:
+            extra = 'stage="{}"'.format(stage)
+            cumulative = 0
+            for bound, count in zip(StageStats.BUCKETS, stats.counts):
+                cumulative += count
+                value('stage_seconds_bucket', cumulative,
+                      '{},le="{}"'.format(extra, bound))
+            value('stage_seconds_bucket', stats.count,
+                  '{},le="+Inf"'.format(extra))
+            value('stage_seconds_sum', stats.total, extra)
+            value('stage_seconds_count', stats.count, extra)
+
+        metric('stage_max_seconds', 'gauge', 'Slowest run of each stage')
+        for stage, stats in stages:
+            value('stage_max_seconds', stats.max, 'stage="{}"'.format(stage))
+
+        for name, help_text, func in self.gauges:
+            metric(name, 'gauge', help_text)
+            value(name, func())
+
+        return '\n'.join(lines) + '\n'
+
+    def write_file(self):
+        # Written to a temporary file and renamed, so a collector never
+        # reads a half written file
+        tmp_name = self.file_name + '.tmp'
+        with open(tmp_name, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_name, self.file_name)
+
+    def write_loop(self):
+        while not self.stopping.wait(self.interval):
+            self.write_file()
+
+    def start(self, task):
+        self.start_time = time.perf_counter()
+        self.budget = int(task.samp_size) / task.samp_rate
+        self.labels = 'task="{}"'.format(type(task).__name__)
+
+        if self.file_name:
+            self.writer = threading.Thread(target=self.write_loop,
+                                           daemon=True)
+            self.writer.start()
+
+        if self.port is not None:
+            # Imported here, 'http.server' is only needed by the exporter
+            from rtltoolkit.helpers.metricsserver import MetricsServer, \
+                MetricsHandler
+            self.server = MetricsServer(('127.0.0.1', self.port),
+                                        MetricsHandler)
+            self.server.daemon_threads = True
+            self.server.metrics = self
+            threading.Thread(target=self.server.serve_forever,
+                             daemon=True).start()
+            print('Serving metrics on http://127.0.0.1:{}/metrics'
+                  .format(self.server.server_address[1]))
+
+    def stop(self):
+        self.stopping.set()
+
+        # The final stats are always written out
+        if self.file_name:
+            self.write_file()
+
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
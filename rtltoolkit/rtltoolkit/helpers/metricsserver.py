@@ -0,0 +1,26 @@
+import socketserver
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+class MetricsServer(socketserver.ThreadingMixIn, HTTPServer):
+    # What 'http.server.ThreadingHTTPServer' is, which only exists
+    # since Python 3.7
+    pass
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes would otherwise be logged to stderr
+        pass
@@ -0,0 +1,93 @@
+import numpy as np
+
+
+# Mode S parity. The last 24 bits of every message are the CRC of the
+# bits before them (generator polynomial 0x1FFF409), for some downlink
+# formats XORed with the aircraft address. Everything here works on
+# raw bytes, one message per row, so a whole batch of candidates is
+# checked with a handful of vectorised operations per byte
+
+GENERATOR = 0xFFF409
+CRC_BYTES = 3
+
+
+def make_table():
+    # CRC of every possible leading byte, so the CRC is updated a byte
+    # at a time instead of a bit at a time
+    table = np.empty(256, dtype=np.uint32)
+    for byte in range(256):
+        crc = byte << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= 0x1000000 | GENERATOR
+        table[byte] = crc
+
+    return table
+
+
+TABLE = make_table()
+
+
+def remainder(data):
+    # 'data' holds one message per row (uint8). Returns the parity
+    # remainder of every row: the CRC of the data bytes XORed with the
+    # transmitted parity. Zero means the message is intact (for formats
+    # with plain parity), otherwise it is the error syndrome or address
+    data = np.atleast_2d(data)
+    crc = np.zeros(len(data), dtype=np.uint32)
+
+    for j in range(data.shape[1] - CRC_BYTES):
+        idx = ((crc >> 16) ^ data[:, j]) & 0xFF
+        crc = ((crc << 8) ^ TABLE[idx]) & 0xFFFFFF
+
+    parity = data[:, -3].astype(np.uint32) << 16 | \
+        data[:, -2].astype(np.uint32) << 8 | \
+        data[:, -1].astype(np.uint32)
+
+    return crc ^ parity
+
+
+def batch_remainder(data, msg_bits):
+    # Remainders of a batch of short (56 bit) and long (112 bit)
+    # messages. 'data' holds 14 bytes per row, only the first
+    # 'msg_bits' of each row are part of the message
+    rem = np.empty(len(data), dtype=np.uint32)
+
+    for bits in np.unique(msg_bits):
+        rows = msg_bits == bits
+        rem[rows] = remainder(data[rows, :bits // 8])
+
+    return rem
+
+
+def make_syndromes(msg_bits):
+    # The CRC is linear, so the remainder of a message with a single
+    # flipped bit is the remainder of that bit alone. Returns those
+    # syndromes sorted, along with the bit position of each. The
+    # downlink format bits are left out, so a fix never turns one
+    # format into another
+    positions = np.arange(5, msg_bits)
+    data = np.zeros((len(positions), msg_bits // 8), dtype=np.uint8)
+    data[np.arange(len(positions)), positions // 8] = 0x80 >> (positions % 8)
+    syndromes = remainder(data)
+
+    order = np.argsort(syndromes)
+    return syndromes[order], positions[order]
+
+
+SYNDROMES, SYNDROME_POS = make_syndromes(112)
+
+
+def fix_single_bit(data, rem):
+    # Look the remainder of each row of long messages up in the
+    # syndrome table and flip the matching bit. Rows are fixed in
+    # place. Returns a mask of the rows which were fixed
+    idx = np.minimum(np.searchsorted(SYNDROMES, rem), len(SYNDROMES) - 1)
+    fixed = (SYNDROMES[idx] == rem) & (rem != 0)
+
+    rows = np.flatnonzero(fixed)
+    pos = SYNDROME_POS[idx[rows]]
+    data[rows, pos // 8] ^= (0x80 >> (pos % 8)).astype(np.uint8)
+
+    return fixed
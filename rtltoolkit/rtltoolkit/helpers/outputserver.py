@@ -0,0 +1,213 @@
+import collections
+import selectors
+import socket
+import threading
+
+
+class Client:
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        # Pending chunks and how much of the first one was already sent
+        self.queue = collections.deque()
+        self.offset = 0
+        # Set once the queue overflows, the server thread then drops it
+        self.slow = False
+
+
+class OutputServer:
+    # Serves a stream of bytes to any number of TCP clients. The task
+    # only appends a chunk (typically one per block) to every client's
+    # queue, all of the network I/O happens on the server's own thread
+    # with non-blocking sockets, so a client can never stall the task.
+    # A client whose queue grows past 'max_queue' chunks is too slow to
+    # keep up and is disconnected
+    def __init__(self, name, port, host='127.0.0.1', max_queue=256):
+        self.name = name
+        self.port = port
+        self.host = host
+        self.max_queue = max_queue
+
+        self.clients = []
+        self.lock = threading.Lock()
+        self.selector = None
+        self.thread = None
+        self.running = False
+
+        self.bytes_sent = 0
+        self.slow_clients = 0
+
+    def start(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((self.host, self.port))
+        self.listener.listen()
+        self.listener.setblocking(False)
+        self.port = self.listener.getsockname()[1]
+
+        # Written to by 'send' to wake the server thread up when new
+        # data is queued
+        self.wake_r, self.wake_w = socket.socketpair()
+        self.wake_r.setblocking(False)
+        self.wake_w.setblocking(False)
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.selector.register(self.wake_r, selectors.EVENT_READ)
+
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+        print('Serving {} output on {}:{}'.format(self.name, self.host,
+                                                  self.port))
+
+    def send(self, data):
+        if not data or not self.clients:
+            return
+
+        with self.lock:
+            for client in self.clients:
+                if client.slow:
+                    continue
+                if len(client.queue) < self.max_queue:
+                    client.queue.append(data)
+                else:
+                    # Mark the client, it is dropped by the server thread
+                    # even if its socket never becomes writable again
+                    client.queue.clear()
+                    client.slow = True
+
+        self.wake()
+
+    def wake(self):
+        try:
+            self.wake_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            # A wake up is already pending
+            pass
+
+    def serve(self):
+        while self.running:
+            self.update_interest()
+
+            for key, events in self.selector.select():
+                sock = key.fileobj
+                if sock is self.listener:
+                    self.accept()
+                elif sock is self.wake_r:
+                    self.drain_wake()
+                else:
+                    if events & selectors.EVENT_READ:
+                        self.read(key.data)
+                    if events & selectors.EVENT_WRITE and \
+                            key.data in self.clients:
+                        self.write(key.data)
+
+    def update_interest(self):
+        with self.lock:
+            clients = list(self.clients)
+
+        for client in clients:
+            if client.slow:
+                print('{} client {}:{} is too slow, disconnecting'
+                      .format(self.name, *client.addr[:2]))
+                self.slow_clients += 1
+                self.drop(client)
+                continue
+
+            events = selectors.EVENT_READ
+            if client.queue:
+                events |= selectors.EVENT_WRITE
+            self.selector.modify(client.sock, events, client)
+
+    def accept(self):
+        try:
+            sock, addr = self.listener.accept()
+        except BlockingIOError:
+            return
+
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = Client(sock, addr)
+        self.selector.register(sock, selectors.EVENT_READ, client)
+        with self.lock:
+            self.clients.append(client)
+
+    def drain_wake(self):
+        try:
+            while self.wake_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def read(self, client):
+        # Clients aren't expected to send anything, reading only tells
+        # when they disconnect
+        try:
+            if not client.sock.recv(4096):
+                self.drop(client)
+        except BlockingIOError:
+            pass
+        except OSError:
+            self.drop(client)
+
+    def write(self, client):
+        while True:
+            # 'send' may clear the queue of a slow client at any time
+            with self.lock:
+                if not client.queue:
+                    return
+                data = client.queue[0]
+
+            try:
+                sent = client.sock.send(memoryview(data)[client.offset:])
+            except BlockingIOError:
+                return
+            except OSError:
+                self.drop(client)
+                return
+
+            self.bytes_sent += sent
+            client.offset += sent
+            if client.offset < len(data):
+                return
+
+            client.offset = 0
+            with self.lock:
+                # 'send' may have cleared the queue in the meantime
+                if client.queue and client.queue[0] is data:
+                    client.queue.popleft()
+
+    def drop(self, client):
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+
+        try:
+            self.selector.unregister(client.sock)
+        except KeyError:
+            pass
+        client.sock.close()
+
+    def close(self):
+        if not self.running:
+            return
+
+        self.running = False
+        self.wake()
+        self.thread.join(1.0)
+
+        with self.lock:
+            clients, self.clients = self.clients, []
+        for client in clients:
+            client.sock.close()
+
+        self.selector.close()
+        self.listener.close()
+        self.wake_r.close()
+        self.wake_w.close()
+
+    def print_stats(self):
+        print('{} output: {} bytes sent, {} slow clients dropped'
+              .format(self.name, self.bytes_sent, self.slow_clients))
@@ -0,0 +1,194 @@
+import numpy as np
+import scipy.signal as signal
+from fractions import Fraction
+
+
+# Streaming multirate filters. The FIR taps of every rate change are
+# designed once and shared by all of the filters using it. Each filter
+# keeps the end of the previous block as its state, so a signal split
+# into blocks comes out exactly as if it was filtered in one go
+
+# (decimation factor, precision) -> polyphase filter bank
+BANKS = {}
+# (up, down) -> lowpass taps of the rational resampler
+RESAMPLE_TAPS = {}
+
+# Largest interpolation factor a pair of rates is approximated with
+MAX_UP = 10000
+
+
+def design_taps(factor):
+    # The anti-aliasing lowpass 'scipy.signal.decimate' designs for
+    # ftype='fir': 20 taps per unit of the factor, Hamming window,
+    # cutoff at the output Nyquist frequency
+    if factor == 1:
+        return np.ones(1)
+    return signal.firwin(20 * factor + 1, 1 / factor, window='hamming')
+
+
+def bank_dtype(samples_dtype):
+    # Single precision samples are filtered in single precision, so
+    # complex64 in gives complex64 out. Anything else in double
+    if samples_dtype in (np.float32, np.complex64):
+        return np.dtype(np.float32)
+    return np.dtype(np.float64)
+
+
+def decimation_bank(factor, dtype=np.float64):
+    # The taps split into 'factor' phases, bank[r] = taps[r::factor],
+    # each padded with zeros to the same length. They are designed in
+    # double precision and only then rounded to 'dtype'
+    dtype = np.dtype(dtype)
+    bank = BANKS.get((factor, dtype))
+    if bank is None:
+        taps = design_taps(factor)
+        phase_len = -(-len(taps) // factor)
+        padded = np.zeros(phase_len * factor)
+        padded[:len(taps)] = taps
+        bank = np.ascontiguousarray(padded.reshape(phase_len, factor).T,
+                                    dtype=dtype)
+        BANKS[(factor, dtype)] = bank
+
+    return bank
+
+
+class Decimator:
+    # Lowpass filters and keeps every 'factor'-th sample. Only the kept
+    # output samples are computed: sample r of every group of 'factor'
+    # inputs only ever meets the taps of phase r, so the filter runs as
+    # 'factor' short convolutions at the output rate. The taps are
+    # taken in the precision of the samples
+    def __init__(self, factor):
+        self.factor = factor
+        self.bank = decimation_bank(factor)
+        self.phase_len = self.bank.shape[1]
+
+        # Input history, enough samples for every tap of the next output
+        self.history = self.phase_len * factor
+        self.buffer = None
+        # Position of the next output sample within the buffer
+        self.pos = self.history
+
+    def reset(self):
+        self.buffer = None
+        self.pos = self.history
+
+    def output_len(self, input_len):
+        # Number of samples the next call returns for 'input_len' inputs
+        return max(-(-(self.history + input_len - self.pos) // self.factor),
+                   0)
+
+    def process(self, samples):
+        samples = np.asarray(samples)
+        factor = self.factor
+        history = self.history
+
+        if self.buffer is None or self.buffer.dtype != samples.dtype:
+            self.buffer = np.zeros(history, dtype=samples.dtype)
+            self.bank = decimation_bank(factor, bank_dtype(samples.dtype))
+
+        buf = np.concatenate((self.buffer, samples))
+        out_len = self.output_len(len(samples))
+
+        out_dtype = np.result_type(samples.dtype, self.bank.dtype)
+        out = np.zeros(out_len, dtype=out_dtype)
+        if out_len:
+            first = self.pos - (self.phase_len - 1) * factor
+            last = self.pos + (out_len - 1) * factor + 1
+            for r in range(factor):
+                out += np.convolve(buf[first - r:last - r:factor],
+                                   self.bank[r], 'valid')
+
+        # Keep the end of the input and move the next output position
+        # into the coordinates of the next buffer
+        self.pos += out_len * factor - len(samples)
+        self.buffer = buf[len(buf) - history:]
+
+        return out
+
+
+def rational_ratio(in_rate, out_rate):
+    # (up, down) with out_rate / in_rate == up / down, both reduced
+    ratio = Fraction(out_rate / in_rate).limit_denominator(MAX_UP)
+    return ratio.numerator, ratio.denominator
+
+
+def resample_taps(up, down):
+    # The lowpass 'scipy.signal.resample_poly' designs, cutting off at
+    # the lower of the two Nyquist frequencies, with a gain of 'up' to
+    # make up for the zeros stuffed between the input samples
+    taps = RESAMPLE_TAPS.get((up, down))
+    if taps is None:
+        max_rate = max(up, down)
+        if max_rate == 1:
+            # Equal rates, the samples pass through unchanged
+            taps = np.ones(1)
+        else:
+            taps = signal.firwin(20 * max_rate + 1, 1 / max_rate,
+                                 window=('kaiser', 5.0)) * up
+        RESAMPLE_TAPS[(up, down)] = taps
+
+    return taps
+
+
+class Resampler:
+    # Changes the sampling rate by the rational factor up / down in a
+    # single pass. 'scipy.signal.upfirdn' does the polyphase filtering:
+    # no zeros are ever stuffed and only the kept outputs are computed.
+    # Each call is handed the end of the previous block first, starting
+    # at the input whose upsampled position lines the outputs up with
+    # those of the previous call
+    def __init__(self, up, down):
+        self.up = up
+        self.down = down
+        self.taps = resample_taps(up, down)
+
+        # Input history, enough samples for every tap of the next output
+        # plus up to 'down' more to line the outputs up
+        self.min_history = -(-(len(self.taps) - 1) // up)
+        self.history = self.min_history + down
+        # Inverse of 'up' modulo 'down', gives that count in one step
+        self.up_inverse = next(k for k in range(down)
+                               if k * up % down == 1 % down)
+        self.buffer = None
+        # Time of the next output sample at the upsampled rate, relative
+        # to the first sample of the next block, in [0, down)
+        self.time = 0
+
+    def from_rates(in_rate, out_rate):
+        return Resampler(*rational_ratio(in_rate, out_rate))
+
+    def reset(self):
+        self.buffer = None
+        self.time = 0
+
+    def output_len(self, input_len):
+        # Number of samples the next call returns for 'input_len' inputs
+        return max(-(-(input_len * self.up - self.time) // self.down), 0)
+
+    def process(self, samples):
+        samples = np.asarray(samples)
+        up = self.up
+        down = self.down
+        history = self.history
+
+        if self.buffer is None or self.buffer.dtype != samples.dtype:
+            self.buffer = np.zeros(history, dtype=samples.dtype)
+
+        buf = np.concatenate((self.buffer, samples))
+        out_len = self.output_len(len(samples))
+
+        # Number of history samples to filter again. Enough of them for
+        # the first output's taps and the one count at which the first
+        # output falls on a multiple of 'down'
+        back = self.min_history + \
+            (-self.time * self.up_inverse - self.min_history) % down
+        first = (back * up + self.time) // down
+
+        out = signal.upfirdn(self.taps, buf[history - back:], up, down)
+        out = out[first:first + out_len]
+
+        self.time += out_len * down - len(samples) * up
+        self.buffer = buf[len(buf) - history:]
+
+        return out
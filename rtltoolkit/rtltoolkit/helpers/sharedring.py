@@ -0,0 +1,271 @@
+import fcntl
+import os
+import tempfile
+import time
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+
+class SharedRing:
+    # Shared memory layout
+    #
+    # +--------+-----------------+-----------------+------------------+
+    # | HEADER | CONSUMER TABLE  | SLOT SEQUENCES  | BLOCKS           |
+    # +--------+-----------------+-----------------+------------------+
+    #
+    # HEADER          - magic, block count, block size, write count,
+    #                   closed flag, sampling rate, center frequency
+    #                   (int64 each)
+    # CONSUMER TABLE  - pid, cursor, overruns, dropped for every
+    #                   attached consumer (int64 each)
+    # SLOT SEQUENCES  - number of the block held by each slot, -1
+    #                   while the slot is being written
+    # BLOCKS          - the raw 8 bit I/Q blocks
+    #
+    # There is a single writer (the capture task). Every consumer
+    # keeps its own cursor and reads the blocks in place, so the data
+    # is never copied per consumer. Consumers which fall behind by more
+    # than the ring size lose the oldest blocks, the writer never waits.
+    # Consumers attach from unrelated processes, so their entries in
+    # the consumer table are claimed under a lock on a file named after
+    # the ring
+    MAGIC = 0x52544c52494e4730     # 'RTLRING0'
+    HEADER_LEN = 7
+    MAX_CONSUMERS = 16
+    CONSUMER_LEN = 4
+
+    MAGIC_POS = 0
+    COUNT_POS = 1
+    SIZE_POS = 2
+    WRITE_POS = 3
+    CLOSED_POS = 4
+    RATE_POS = 5
+    FREQ_POS = 6
+
+    PID_POS = 0
+    CURSOR_POS = 1
+    OVERRUNS_POS = 2
+    DROPPED_POS = 3
+
+    def __init__(self, name, block_count=0, block_size=0, create=False):
+        self.name = name
+        self.create = create
+
+        meta_len = SharedRing.HEADER_LEN + \
+            SharedRing.MAX_CONSUMERS * SharedRing.CONSUMER_LEN
+
+        if create:
+            size = (meta_len + block_count) * 8 + block_count * block_size
+            self.shm = shared_memory.SharedMemory(name, create=True,
+                                                  size=size)
+        else:
+            self.shm = SharedRing.attach(name)
+
+        self.header = np.ndarray(SharedRing.HEADER_LEN, dtype=np.int64,
+                                 buffer=self.shm.buf)
+
+        if create:
+            self.header[:] = [SharedRing.MAGIC, block_count, block_size,
+                              0, 0, 0, 0]
+        elif self.header[SharedRing.MAGIC_POS] != SharedRing.MAGIC:
+            self.header = None
+            self.shm.close()
+            raise ValueError('{} is not a sample ring'.format(name))
+
+        self.block_count = int(self.header[SharedRing.COUNT_POS])
+        self.block_size = int(self.header[SharedRing.SIZE_POS])
+
+        offset = SharedRing.HEADER_LEN * 8
+        self.consumers = np.ndarray((SharedRing.MAX_CONSUMERS,
+                                     SharedRing.CONSUMER_LEN),
+                                    dtype=np.int64, buffer=self.shm.buf,
+                                    offset=offset)
+        offset = meta_len * 8
+        self.seqs = np.ndarray(self.block_count, dtype=np.int64,
+                               buffer=self.shm.buf, offset=offset)
+        offset += self.block_count * 8
+        self.blocks = np.ndarray((self.block_count, self.block_size),
+                                 dtype=np.uint8, buffer=self.shm.buf,
+                                 offset=offset)
+
+        if create:
+            self.consumers[:] = 0
+            self.seqs[:] = -1
+
+    def attach(name):
+        # Attaching processes must not unlink the segment when they exit,
+        # only the creator owns it. Older Pythons have no 'track' flag
+        # so the segment is unregistered from the resource tracker
+        try:
+            return shared_memory.SharedMemory(name, track=False)
+        except TypeError:
+            shm = shared_memory.SharedMemory(name)
+            resource_tracker.unregister(shm._name, 'shared_memory')
+            return shm
+
+    def lock_path(self):
+        return os.path.join(tempfile.gettempdir(),
+                            '{}.lock'.format(self.name.lstrip('/')))
+
+    def lock_consumers(self):
+        # Returns the locked file, closing it releases the lock
+        lock = open(self.lock_path(), 'a')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def set_tuning(self, samp_rate, center_freq):
+        self.header[SharedRing.RATE_POS] = int(samp_rate)
+        self.header[SharedRing.FREQ_POS] = int(center_freq)
+
+    def get_tuning(self):
+        return (int(self.header[SharedRing.RATE_POS]),
+                int(self.header[SharedRing.FREQ_POS]))
+
+    def write_count(self):
+        return int(self.header[SharedRing.WRITE_POS])
+
+    def is_closed(self):
+        return bool(self.header[SharedRing.CLOSED_POS])
+
+    # Writer side. The interface matches BlockRing so any SampleSource
+    # can stream straight into shared memory
+
+    def get_write_block(self, wait=False):
+        slot = self.write_count() % self.block_count
+        # Mark the slot as being written so readers holding it can
+        # tell their block was overwritten
+        self.seqs[slot] = -1
+        return self.blocks[slot]
+
+    def commit_write(self):
+        count = self.write_count()
+        self.seqs[count % self.block_count] = count
+        self.header[SharedRing.WRITE_POS] = count + 1
+
+    def close(self):
+        if self.create:
+            self.header[SharedRing.CLOSED_POS] = 1
+
+    def print_stats(self):
+        print('Blocks captured: {}'.format(self.write_count()))
+        for pid, cursor, overruns, dropped in self.consumers:
+            if pid:
+                SharedRing.print_consumer(pid, self.write_count() - cursor,
+                                          overruns, dropped)
+
+    def print_consumer(pid, lag, overruns, dropped):
+        print('Consumer {}: lag {} blocks, {} overruns, {} blocks dropped'
+              .format(pid, lag, overruns, dropped))
+
+    def release(self):
+        # Drop every view into the segment before closing it,
+        # otherwise the buffer can't be released
+        self.header = None
+        self.consumers = None
+        self.seqs = None
+        self.blocks = None
+
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+
+        if self.create:
+            self.shm.unlink()
+            try:
+                os.remove(self.lock_path())
+            except FileNotFoundError:
+                pass
+
+
+class SharedRingReader:
+    def __init__(self, ring, sub_size):
+        self.ring = ring
+
+        # Consumers may use a smaller block size than the capture, as
+        # long as it divides the capture block. Each ring block is then
+        # handed out as several consecutive views
+        if ring.block_size % sub_size:
+            raise ValueError('Block size {} does not divide the capture '
+                             'block size {}'.format(sub_size,
+                                                    ring.block_size))
+        self.sub_size = sub_size
+        self.sub_count = ring.block_size // sub_size
+        self.sub = 0
+
+        # Start with the newest data instead of replaying the ring
+        self.cursor = ring.write_count()
+        self.overruns = 0
+        self.dropped = 0
+        self.max_lag = 0
+
+        self.entry = self.claim_entry()
+
+    def claim_entry(self):
+        # Two consumers attaching at once would otherwise both see the
+        # same entry free
+        with self.ring.lock_consumers():
+            for i, consumer in enumerate(self.ring.consumers):
+                if not consumer[SharedRing.PID_POS]:
+                    consumer[:] = [os.getpid(), self.cursor, 0, 0]
+                    return i
+
+        raise ValueError('Too many consumers attached to {}'
+                         .format(self.ring.name))
+
+    def publish(self):
+        consumer = self.ring.consumers[self.entry]
+        consumer[SharedRing.CURSOR_POS] = self.cursor
+        consumer[SharedRing.OVERRUNS_POS] = self.overruns
+        consumer[SharedRing.DROPPED_POS] = self.dropped
+
+    def get_read_block(self, timeout=None, poll=1e-3):
+        start = time.perf_counter()
+
+        while self.ring.write_count() <= self.cursor:
+            if self.ring.is_closed():
+                return None
+            if timeout is not None and time.perf_counter() - start > timeout:
+                return None
+            time.sleep(poll)
+
+        lag = self.ring.write_count() - self.cursor
+        self.max_lag = max(self.max_lag, lag)
+
+        # The writer has lapped this consumer. Skip to the oldest block
+        # which is still intact, leaving one slot for the writer
+        if lag >= self.ring.block_count:
+            skip = lag - self.ring.block_count + 1
+            self.overruns += 1
+            self.dropped += skip
+            self.cursor += skip
+            self.sub = 0
+            self.publish()
+
+        slot = self.cursor % self.ring.block_count
+        start = self.sub * self.sub_size
+        return self.ring.blocks[slot, start:start + self.sub_size]
+
+    def release_read(self):
+        # If the writer reused the slot while it was being read the
+        # block was torn, which is counted as an overrun
+        slot = self.cursor % self.ring.block_count
+        if self.ring.seqs[slot] != self.cursor:
+            self.overruns += 1
+
+        self.sub += 1
+        if self.sub == self.sub_count:
+            self.sub = 0
+            self.cursor += 1
+            self.publish()
+
+    def close(self):
+        with self.ring.lock_consumers():
+            self.ring.consumers[self.entry] = 0
+        self.ring.release()
+
+    def print_stats(self):
+        SharedRing.print_consumer(os.getpid(),
+                                  self.ring.write_count() - self.cursor,
+                                  self.overruns, self.dropped)
+        print('Peak lag: {}/{}'.format(self.max_lag, self.ring.block_count))
@@ -0,0 +1,146 @@
+import numpy as np
+
+from rtltoolkit.transmittasks.tempmodulate import TempModulate
+
+
+# Deterministic synthetic I/Q generators. Every generator returns the
+# samples in the format 'rtl_sdr' produces - interleaved unsigned 8 bit
+# I and Q values - so they go through the same ingest path as real data
+
+# Valid DF17 messages used to build Mode S test signals
+MODES_MSGS = ['8D4840D6202CC371C32CE0576098',
+              '8D40621D58C382D690C8AC2863A7',
+              '8D40621D58C386435CC412692AD6',
+              '8D485020994409940838175B284F',
+              '8DA05F219B06B6AF189400CBC33F']
+
+
+def to_uint8(samples):
+    # Inverse of SDRTask.normalise_samples
+    iq = np.empty(len(samples) * 2, dtype=np.float64)
+    iq[0::2] = samples.real
+    iq[1::2] = samples.imag
+    iq = np.rint(iq * 127.5 + 127.5)
+
+    return np.clip(iq, 0, 255).astype(np.uint8)
+
+
+def complex_noise(rng, length, sigma):
+    return rng.normal(0, sigma, length) + 1j * rng.normal(0, sigma, length)
+
+
+def noise(length, sigma=0.05, seed=0):
+    rng = np.random.default_rng(seed)
+    return to_uint8(complex_noise(rng, length, sigma))
+
+
+def modes_envelope(msg):
+    # One sample per half bit (2 MS/s). The preamble has pulses on
+    # half bits 0, 2, 7 and 9, every data bit is a pulse either in
+    # its first (one) or second (zero) half
+    bits = np.unpackbits(np.frombuffer(bytes.fromhex(msg), dtype=np.uint8))
+    preamble = np.zeros(16)
+    preamble[[0, 2, 7, 9]] = 1
+    data = np.empty(len(bits) * 2)
+    data[0::2] = bits
+    data[1::2] = 1 - bits
+
+    return np.concatenate((preamble, data))
+
+
+def modes_frames(length, snr_db=20, spacing=1000, amplitude=0.5, seed=0,
+                 samp_rate=2e6):
+    # Mode S frames every 'spacing' samples. The SNR is the ratio of
+    # the pulse amplitude to the noise amplitude. Above 2 MS/s every
+    # frame starts at a random fraction of a sample. Returns the
+    # samples and the number of frames
+    rng = np.random.default_rng(seed)
+    sigma = amplitude / 10 ** (snr_db / 20) / np.sqrt(2)
+    ratio = samp_rate / 2e6
+    frac_rng = np.random.default_rng(seed + 1)
+
+    env = np.zeros(length)
+    count = 0
+    for pos in range(spacing // 2, length - spacing, spacing):
+        frame = modes_envelope(MODES_MSGS[count % len(MODES_MSGS)])
+        if ratio == 1:
+            env[pos:pos + len(frame)] = frame
+        else:
+            # Half bit seen by the middle of every sample of the frame
+            start = pos + frac_rng.uniform(0, 1)
+            n = np.arange(pos, pos + int(np.ceil(len(frame) * ratio)) + 1)
+            half_bit = np.floor((n + 0.5 - start) / ratio).astype(int)
+            inside = (half_bit >= 0) & (half_bit < len(frame))
+            env[n[inside]] = frame[half_bit[inside]]
+        count += 1
+
+    # Every sample gets a random carrier phase, like an unlocked
+    # receiver would see it
+    phase = np.exp(1j * rng.uniform(0, 2 * np.pi, length))
+    samples = amplitude * env * phase + complex_noise(rng, length, sigma)
+
+    return to_uint8(samples), count
+
+
+def ook_frames(length, samp_rate, snr_db=30, temp=21, humid=45, chan=1,
+               amplitude=0.5, seed=0):
+    # Repeated TFA 30 3200 frames, encoded and modulated exactly as
+    # TempModulate does it. Returns the samples and the number of
+    # complete frames
+    rng = np.random.default_rng(seed)
+    sigma = amplitude / 10 ** (snr_db / 20) / np.sqrt(2)
+
+    data = TempModulate.encode_data(chan, temp, humid)
+    frame = TempModulate.modulate_data(data, samp_rate)
+
+    # The frame ends with a stop gap. A leading pulse closes that gap,
+    # otherwise it would merge with the gap of the next frame's first
+    # bit when the frames are sent back to back
+    pulse = TempModulate.generate_iq(TempModulate.ON_FREQ,
+                                     TempModulate.DIV_LEN, samp_rate)
+    frame = np.concatenate((pulse, frame))
+
+    # A message is only decoded between two stop gaps. The frames are
+    # preceded by one and a last pulse closes the gap of the last frame
+    lead = int(TempModulate.STOP_LEN * samp_rate)
+    count = max((length - lead - len(pulse)) // len(frame), 0)
+    end = lead + count * len(frame)
+    signal = np.zeros(length, dtype=np.complex128)
+    signal[lead:end] = np.tile(frame, count)
+    if count:
+        signal[end:end + len(pulse)] = pulse
+
+    samples = amplitude * signal + complex_noise(rng, length, sigma)
+
+    return to_uint8(samples), count
+
+
+def fm_tone(length, samp_rate, tone_freq=1e3, deviation=75e3,
+            amplitude=0.5, snr_db=30, seed=0):
+    # A single tone, frequency modulated like a broadcast FM station
+    rng = np.random.default_rng(seed)
+    sigma = amplitude / 10 ** (snr_db / 20) / np.sqrt(2)
+
+    t = np.arange(length) / samp_rate
+    phase = deviation / tone_freq * np.sin(2 * np.pi * tone_freq * t)
+    samples = amplitude * np.exp(1j * phase) + \
+        complex_noise(rng, length, sigma)
+
+    return to_uint8(samples)
+
+
+def fm_stations(length, samp_rate, offsets, tone_freqs, deviation=75e3,
+                amplitude=0.2, snr_db=30, seed=0):
+    # Several FM stations, each modulated by a tone of its own and
+    # placed at its offset from the center of the capture
+    rng = np.random.default_rng(seed)
+    sigma = amplitude / 10 ** (snr_db / 20) / np.sqrt(2)
+
+    t = np.arange(length) / samp_rate
+    samples = complex_noise(rng, length, sigma)
+    for offset, tone_freq in zip(offsets, tone_freqs):
+        phase = 2 * np.pi * offset * t + \
+            deviation / tone_freq * np.sin(2 * np.pi * tone_freq * t)
+        samples += amplitude * np.exp(1j * phase)
+
+    return to_uint8(samples)
@@ -0,0 +1,196 @@
+import os
+import numpy as np
+
+
+class TrackStore:
+    # Append-only history of decoded aircraft positions. Every field is
+    # a column of its own, a flat binary file in 'directory' read back
+    # through np.memmap, so a query only touches the pages it needs
+    #
+    # <directory>/time.bin     float64  seconds since the epoch
+    #             icao.bin     uint32   ICAO address
+    #             lat.bin      float32  degrees
+    #             lon.bin      float32  degrees
+    #             alt.bin      float32  feet, NaN if unknown
+    #             speed.bin    float32  knots, NaN if unknown
+    #             index.bin    (uint32, int64) per chunk ICAO index
+    #             chunks.bin   one CHUNK_DTYPE record per chunk
+    #
+    # Points are buffered in memory and written 'chunk_size' at a time.
+    # Along with every chunk goes its ICAO index, the (icao, row) pairs
+    # of the chunk sorted by address, and its record in the chunk
+    # table holding where it starts and its time span. A query skips
+    # the chunks outside of its time range and binary searches the
+    # index of the rest, so it never scans the whole history
+    #
+    # With 'read_only' the store only queries what the chunk table
+    # holds, without touching the files. That is safe while another
+    # process is appending to them, the columns are always written
+    # before the chunk they belong to
+    COLUMNS = (('time', np.float64), ('icao', np.uint32),
+               ('lat', np.float32), ('lon', np.float32),
+               ('alt', np.float32), ('speed', np.float32))
+
+    INDEX_DTYPE = np.dtype([('icao', '<u4'), ('row', '<i8')])
+    CHUNK_DTYPE = np.dtype([('start', '<i8'), ('count', '<i8'),
+                            ('t_min', '<f8'), ('t_max', '<f8')])
+
+    def __init__(self, directory, chunk_size=4096, read_only=False):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.read_only = read_only
+        if not read_only:
+            os.makedirs(directory, exist_ok=True)
+
+        self.buffer = {name: np.empty(chunk_size, dtype=dtype)
+                       for name, dtype in TrackStore.COLUMNS}
+        self.buffered = 0
+
+        self.chunks = self.load_chunks()
+        self.rows = int(self.chunks['count'].sum())
+        # Only the writer may cut off what it left behind, to a reader
+        # it looks the same as a chunk which is being written
+        if not read_only:
+            self.truncate()
+
+    def path(self, name):
+        return os.path.join(self.directory, name + '.bin')
+
+    def load_chunks(self):
+        if not os.path.isfile(self.path('chunks')):
+            return np.empty(0, dtype=TrackStore.CHUNK_DTYPE)
+
+        # A record the writer is in the middle of appending is left out
+        with open(self.path('chunks'), 'rb') as f:
+            data = f.read()
+        count = len(data) // TrackStore.CHUNK_DTYPE.itemsize
+        return np.frombuffer(data, dtype=TrackStore.CHUNK_DTYPE,
+                             count=count).copy()
+
+    def truncate(self):
+        # The chunk table is written last, so after a crash the columns
+        # may hold a partial chunk past the end of the table. It is cut
+        # off, the store always reopens in a consistent state
+        files = [(name, np.dtype(dtype).itemsize)
+                 for name, dtype in TrackStore.COLUMNS]
+        files.append(('index', TrackStore.INDEX_DTYPE.itemsize))
+        sizes = [(name, self.rows * itemsize) for name, itemsize in files]
+        # As well as a partial record of the chunk table itself
+        sizes.append(('chunks', len(self.chunks) *
+                      TrackStore.CHUNK_DTYPE.itemsize))
+
+        for name, size in sizes:
+            path = self.path(name)
+            if os.path.isfile(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    def __len__(self):
+        return self.rows + self.buffered
+
+    def append(self, now, icao, lat, lon, alt=None, speed=None):
+        # 'icao' is the address as a hex string or an int
+        if self.read_only:
+            raise ValueError('track store is opened read-only')
+        if isinstance(icao, str):
+            icao = int(icao, 16)
+
+        k = self.buffered
+        self.buffer['time'][k] = now
+        self.buffer['icao'][k] = icao
+        self.buffer['lat'][k] = lat
+        self.buffer['lon'][k] = lon
+        self.buffer['alt'][k] = np.nan if alt is None else alt
+        self.buffer['speed'][k] = np.nan if speed is None else speed
+        self.buffered += 1
+
+        if self.buffered == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        count = self.buffered
+        if not count:
+            return
+
+        for name, _ in TrackStore.COLUMNS:
+            with open(self.path(name), 'ab') as f:
+                self.buffer[name][:count].tofile(f)
+
+        icao = self.buffer['icao'][:count]
+        order = np.argsort(icao, kind='stable')
+        index = np.empty(count, dtype=TrackStore.INDEX_DTYPE)
+        index['icao'] = icao[order]
+        index['row'] = self.rows + order
+        with open(self.path('index'), 'ab') as f:
+            index.tofile(f)
+
+        times = self.buffer['time'][:count]
+        chunk = np.array([(self.rows, count, times.min(), times.max())],
+                         dtype=TrackStore.CHUNK_DTYPE)
+        with open(self.path('chunks'), 'ab') as f:
+            chunk.tofile(f)
+
+        self.chunks = np.concatenate((self.chunks, chunk))
+        self.rows += count
+        self.buffered = 0
+
+    def close(self):
+        self.flush()
+
+    def column(self, name, dtype):
+        if not self.rows:
+            return np.empty(0, dtype=dtype)
+
+        return np.memmap(self.path(name), dtype=dtype, mode='r',
+                         shape=(self.rows,))
+
+    def query(self, icao=None, start=None, end=None):
+        # Points of one aircraft (or of all of them if 'icao' is None)
+        # with start <= time <= end, as a dictionary of column arrays
+        # in time order. Points still buffered are included
+        if isinstance(icao, str):
+            icao = int(icao, 16)
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+
+        chunks = np.flatnonzero((self.chunks['t_max'] >= start) &
+                                (self.chunks['t_min'] <= end))
+
+        if icao is None:
+            rows = [np.arange(self.chunks['start'][k],
+                              self.chunks['start'][k] +
+                              self.chunks['count'][k]) for k in chunks]
+        else:
+            index = self.column('index', TrackStore.INDEX_DTYPE)
+            rows = []
+            for k in chunks:
+                first = self.chunks['start'][k]
+                last = first + self.chunks['count'][k]
+                seg = index['icao'][first:last]
+                lo, hi = np.searchsorted(seg, [icao, icao + 1])
+                rows.append(index['row'][first + lo:first + hi])
+
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+
+        times = self.column('time', np.float64)[rows]
+        keep = (times >= start) & (times <= end)
+        rows = rows[keep]
+
+        # Buffered points have row numbers past the stored ones
+        buf = slice(0, self.buffered)
+        buf_keep = (self.buffer['time'][buf] >= start) & \
+            (self.buffer['time'][buf] <= end)
+        if icao is not None:
+            buf_keep &= self.buffer['icao'][buf] == icao
+        buf_rows = np.flatnonzero(buf_keep)
+
+        result = {}
+        for name, dtype in TrackStore.COLUMNS:
+            result[name] = np.concatenate((self.column(name, dtype)[rows],
+                                           self.buffer[name][buf_rows]))
+
+        order = np.argsort(result['time'], kind='stable')
+        return {name: values[order] for name, values in result.items()}
+
+    def aircraft(self, start=None, end=None):
+        # Addresses seen within the time range
+        return np.unique(self.query(start=start, end=end)['icao'])
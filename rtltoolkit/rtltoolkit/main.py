@@ -4,54 +4,16 @@ import os
 import sys
 import argparse
 
-from rtlsdr import RtlSdr
-
-from rtltoolkit.basetasks.transmittask import TransmitTask
-from rtltoolkit.basetasks.sdrtask import SDRTask
-from rtltoolkit.demodtasks.tempdemod import TempDemod
-from rtltoolkit.demodtasks.fmdemod import FmDemod
-from rtltoolkit.demodtasks.adsbdemod import AdsbDemod
-from rtltoolkit.recordtasks.rawiq import RawIQ
-from rtltoolkit.displaytasks.fftsink import FftSink
-from rtltoolkit.displaytasks.scanfm import ScanFm
-from rtltoolkit.transmittasks.jammertask import JammerTask
-from rtltoolkit.transmittasks.fmmodulate import FmModulate
-from rtltoolkit.transmittasks.tempmodulate import TempModulate
-from rtltoolkit.transmittasks.tunemodulate import TuneModulate
-
-
-def init_parser(parser):
-    group = parser.add_mutually_exclusive_group()
-    group.add_argument("--temp",
-                       action="store_true",
-                       help="Listen to temperature sensor")
-    group.add_argument("--fm-radio",
-                       action="store_true",
-                       help="Listen to radio station")
-    group.add_argument("--raw",
-                       action="store_true",
-                       help="Listen to Raw IQ data")
-    group.add_argument("--adsb",
-                       action="store_true",
-                       help="Listen ADS-B data sent from airplanes")
-    group.add_argument("--fft",
-                       action="store_true",
-                       help="Start FFT sink")
-    group.add_argument("--scan-fm",
-                       action="store_true",
-                       help="Scan FM radio spectrum")
-    group.add_argument("--jammer",
-                       action="store_true",
-                       help="Jam certain frequency")
-    group.add_argument("--transmit-fm",
-                       action="store_true",
-                       help="Transmit FM radio")
-    group.add_argument("--transmit-temp",
-                       action="store_true",
-                       help="Transmit data based on the TFA 30 3200 sensor")
-    group.add_argument("--transmit-tune",
-                       action="store_true",
-                       help="Transmit FM radio")
+from rtltoolkit import registry
+
+
+# Block size handed to receive tasks, RtlSdr.DEFAULT_READ_SIZE. It is
+# spelled out so librtlsdr is only loaded when the device is used
+DEFAULT_READ_SIZE = 1024
+
+
+def init_parser(parser, tasks):
+    registry.add_arguments(parser, tasks)
 
     parser.add_argument("-c",
                         "--center",
@@ -73,34 +35,35 @@ def init_parser(parser):
                         action="store_true",
                         help="Print data to standard output")
 
-    parser.add_argument("--on-active",
-                         action="store_true",
-                         help='''Record samples only on activity
-                                 - reffers to Raw IQ recording''')
-    parser.add_argument("--diff",
-                        type=int,
-                        help='''Set difference that qualifies as activity''')
-    parser.add_argument("--limit",
-                         type=int,
-                         help="Set lower limit by Y axis for FFT Sink")
-    parser.add_argument("--persistence",
+    parser.add_argument("-i",
+                        "--input",
+                        help="Read samples from a raw rtl_sdr dump or .npy file instead of the SDR")
+    parser.add_argument("--realtime",
                         action="store_true",
-                        help="Display highest values over time")
-    parser.add_argument("--cmd",
+                        help="Replay the input file at the sampling rate instead of as fast as possible")
+    parser.add_argument("--tcp",
+                        help="Read samples from an rtl_tcp server given as HOST[:PORT]")
+    parser.add_argument("--shm",
+                        metavar="NAME",
+                        help="Read samples from a running --capture task")
+    parser.add_argument("--fork",
                         action="store_true",
-                        help="Choose CMD mode for the FFT Sink")
-    parser.add_argument("--tune-freq",
+                        help="Read samples through an rtl_sdr process instead of librtlsdr")
+    parser.add_argument("--workers",
                         type=int,
-                        help="Choose frequency for transmit-fm")
-    parser.add_argument("--channel",
-                        type=int,
-                        help="Channel value to be transmitted with transmit-temp")
-    parser.add_argument("--humidity",
-                        type=int,
-                        help="Humidity value to be transmitted with transmit-temp")
-    parser.add_argument("--temperature",
+                        help="Spread the blocks of ADS-B and Raw IQ tasks over several processes")
+    parser.add_argument("--buffer-time",
+                        type=float,
+                        help="Seconds of samples buffered between the SDR and the task")
+    parser.add_argument("--metrics-file",
+                        help="Periodically write per-stage timing stats to a Prometheus text file")
+    parser.add_argument("--metrics-port",
                         type=int,
-                        help="Temperature value to be transmited with transmit-temp")
+                        help="Serve per-stage timing stats on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-interval",
+                        type=float,
+                        default=5.0,
+                        help="Seconds between writes of the metrics file")
 
 
 def check_args(args):
@@ -110,52 +73,15 @@ def check_args(args):
     # for it
     pass
 
-def init_rtl_task(args):
-    sdr_task = None
-
-    samp_rate = args.rate
-    center_freq = args.center
-    gain = args.gain
-    samp_size = RtlSdr.DEFAULT_READ_SIZE
-
-    out_file = args.file
-    verbose = args.verbose
-
-    if not out_file:
-        out_file = ''
-
-    if args.temp:
-        sdr_task = TempDemod(samp_rate, center_freq, gain, samp_size, verbose, out_file)
-    elif args.fm_radio:
-        sdr_task = FmDemod(samp_rate, center_freq, gain, samp_size, verbose, out_file)
-    elif args.adsb:
-        sdr_task = AdsbDemod(samp_rate, center_freq, gain, samp_size, verbose, out_file)
-    elif args.fft:
-        limit = args.limit
-        persis = args.persistence
-        cmd = args.cmd
-        sdr_task = FftSink(samp_rate, center_freq, gain, samp_size, cmd, limit, persis)
-    elif args.raw:
-        diff = args.diff
-        sdr_task = RawIQ(samp_rate, verbose, out_file, diff)
-    elif args.scan_fm:
-        sdr_task = ScanFm(samp_rate, center_freq, gain, samp_size)
-    elif args.transmit_fm:
-        tune_freq = args.tune_freq
-        sdr_task = FmModulate(samp_rate, center_freq, gain, samp_size, tune_freq)
-    elif args.transmit_temp:
-        chan = args.channel
-        humid = args.humidity
-        temp = args.temperature
-        sdr_task = TempModulate(samp_rate, center_freq, gain, samp_size, 
-                                temp, humid, chan)
-    elif args.jammer:
-        sdr_task = JammerTask(samp_rate, center_freq, gain, samp_size)
-    elif args.transmit_tune:
-        file_name = args.file
-        sdr_task = TuneModulate(samp_rate, center_freq, gain, samp_size, file_name)
-
-    return sdr_task
+def init_rtl_task(args, tasks):
+    entry = registry.selected_task(args, tasks)
+    if entry is None:
+        return None
+
+    if not args.file:
+        args.file = ''
+
+    return entry.create(args, DEFAULT_READ_SIZE)
 
 
 def streaming(sdr_task):
@@ -163,32 +89,77 @@ def streaming(sdr_task):
 
 
 def main():
+    # 'rtltoolkit bench' runs the benchmark suite instead of a task
+    if sys.argv[1:2] == ['bench']:
+        from rtltoolkit import bench
+        bench.main(sys.argv[2:])
+        return
+
+    # 'rtltoolkit tracks' queries the positions stored by --adsb --file
+    if sys.argv[1:2] == ['tracks']:
+        from rtltoolkit import tracks
+        tracks.main(sys.argv[2:])
+        return
+
+    tasks = registry.all_tasks()
+
     parser = argparse.ArgumentParser(description="A toolkit for the RTL-SDR")
-    init_parser(parser)
+    init_parser(parser, tasks)
     args = parser.parse_args()
 
-    sdr_task = init_rtl_task(args)
-
-    parent_class = sdr_task.__class__.__base__
+    sdr_task = init_rtl_task(args, tasks)
+    if sdr_task is None:
+        parser.print_help()
+        return
 
-    while parent_class != TransmitTask and parent_class != SDRTask:
-        parent_class = parent_class.__base__
+    # Imported once the task is, they pull in numpy and the sources
+    from rtltoolkit.basetasks.transmittask import TransmitTask
+    from rtltoolkit.basetasks.sdrtask import SDRTask
 
     proc_arch = str(os.uname()[-1])
 
-    if parent_class == TransmitTask and 'arm' not in proc_arch:
+    if isinstance(sdr_task, TransmitTask) and 'arm' not in proc_arch:
         print('Transmit tasks must be run on Raspberry Pi')
         print('Exiting...')
         return
 
-    if parent_class == SDRTask:
-        try:
-            sdr = RtlSdr()
-        except OSError:
-            print('Recieve tasks must be run with RTL-SDR')
-            print('Exiting...')
-            return
-        sdr.close()
+    if isinstance(sdr_task, SDRTask):
+        if args.input:
+            from rtltoolkit.sources.filesource import FileSource
+            sdr_task.source = FileSource(args.input, args.realtime)
+        elif args.shm:
+            from rtltoolkit.sources.shmsource import ShmSource
+            sdr_task.source = ShmSource(args.shm)
+        elif args.tcp:
+            from rtltoolkit.sources.tcpsource import TcpSource
+            host, _, port = args.tcp.partition(':')
+            port = int(port) if port else TcpSource.DEFAULT_PORT
+            sdr_task.source = TcpSource(host, port)
+        else:
+            from rtlsdr import RtlSdr
+            from rtltoolkit.sources.rtlsdrsource import RtlSdrSource
+            try:
+                sdr = RtlSdr()
+            except OSError:
+                print('Recieve tasks must be run with RTL-SDR')
+                print('Exiting...')
+                return
+
+            # Hand the opened device to the task, unless the samples
+            # should come from a separate 'rtl_sdr' process
+            if args.fork:
+                sdr.close()
+            else:
+                sdr_task.source = RtlSdrSource(sdr)
+
+        if args.buffer_time:
+            sdr_task.buffer_time = args.buffer_time
+        if args.workers:
+            sdr_task.workers = args.workers
+        if args.metrics_file or args.metrics_port is not None:
+            from rtltoolkit.helpers.metrics import Metrics
+            sdr_task.metrics = Metrics(args.metrics_file, args.metrics_port,
+                                       args.metrics_interval)
 
     try:
         streaming(sdr_task)
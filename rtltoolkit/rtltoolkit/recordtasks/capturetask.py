@@ -0,0 +1,56 @@
+import threading
+
+from rtltoolkit.basetasks.sdrtask import SDRTask
+from rtltoolkit.helpers.sharedring import SharedRing
+from rtltoolkit.sources.pipesource import PipeSource
+
+
+class CaptureTask(SDRTask):
+    defaults = {
+            'samp_rate': 2e6,
+            'center_freq': 1090e6,
+            'gain': 44.5,
+            'samp_size': 2**18
+            }
+
+    # Seconds between the consumer lag reports
+    REPORT_INTERVAL = 10
+
+    def __init__(self, samp_rate, center_freq, gain, samp_size, shm_name):
+        super().__init__(samp_rate, center_freq, gain, samp_size)
+        self.shm_name = shm_name
+
+    def run(self):
+        self.print_info()
+
+        if self.source is None:
+            self.source = PipeSource()
+
+        # The shared ring takes the place of the in-process ring. The
+        # source streams straight into it and any number of tasks
+        # started with '--shm' read the blocks from there
+        self.samp_size = int(self.samp_size)
+        block_count = int(self.buffer_time * self.samp_rate / self.samp_size)
+        self.ring = SharedRing(self.shm_name, max(block_count, 4),
+                               self.samp_size * 2, create=True)
+        self.ring.set_tuning(self.samp_rate, self.center_freq)
+
+        self.source.open(self)
+
+        reader = threading.Thread(target=self.source.stream,
+                                  args=(self.ring,), daemon=True)
+        reader.start()
+
+        print('Capturing into shared memory \'{}\''.format(self.shm_name))
+
+        try:
+            while reader.is_alive():
+                reader.join(CaptureTask.REPORT_INTERVAL)
+                if reader.is_alive():
+                    self.ring.print_stats()
+        finally:
+            self.source.close()
+            self.ring.close()
+            self.ring.print_stats()
+            self.source.print_stats()
+            self.ring.release()
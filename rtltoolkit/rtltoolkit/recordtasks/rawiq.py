@@ -6,22 +6,39 @@ from rtltoolkit.helpers.ffthelpers import calc_fft
 
 
 class RawIQ(RecordTask):
+    defaults = {
+            'samp_rate': 2e6,
+            'center_freq': 433.9e6,
+            'gain': 40.2,
+            'samp_size': 2**18
+            }
+
+    parallel = True
+    report_samples = True
+
     def __init__(self, samp_rate, center_freq, gain, samp_size, verbose, file_name, diff):
         super().__init__(samp_rate, center_freq, gain, samp_size, verbose, file_name, diff)
         self.samp_record = RecordSamp(file_name)
         self.count = 0
         self.verbose = verbose
+        self.diff = diff
 
-    def execute(self, samples):
-        samples = np.array(samples)
+    def detect(self, samples, position=0):
+        # Energy check deciding if the block holds any activity. It
+        # doesn't depend on earlier blocks, so it can run in parallel
+        if not self.diff:
+            return True
+
+        samp_fft = calc_fft(samples, self.samp_rate, len(samples), average = True)
+        return min(samp_fft[100:]) + self.diff <= max(samp_fft[100:])
+
+    def report(self, samples, active):
+        samples = np.asarray(samples)
         if self.verbose:
             print(samples)
 
-        samp_fft = None
-        if self.diff:
-            samp_fft = calc_fft(samples, self.samp_rate, len(samples), average = True)
-            if min(samp_fft[100:]) + self.diff > max(samp_fft[100:]):
-                samples = np.array([])
+        if not active:
+            samples = np.array([])
 
         self.samp_record.add_to_queue(samples)
 
@@ -32,3 +49,6 @@ class RawIQ(RecordTask):
 
         if not self.diff:
             self.samp_record.save_to_file()
+
+    def execute(self, samples):
+        self.report(samples, self.detect(samples))
@@ -0,0 +1,261 @@
+import argparse
+import importlib
+
+
+# Tasks are described here instead of being imported by 'main'. Only
+# the module of the selected task is imported, so starting e.g. '--raw'
+# doesn't pay for matplotlib, pyaudio, scipy or pyModeS. The sampling
+# defaults of each task stay in its class' 'defaults' dictionary
+
+# Third-party packages add tasks by exposing a TaskEntry under this
+# entry point group, e.g. in their setup.py:
+#
+#   entry_points={
+#       'rtltoolkit.tasks': [
+#           'mytask = mypackage.entry:MY_TASK',
+#       ],
+#   }
+#
+# The module holding the entry should be lightweight and point to the
+# task class through 'target', so it is also imported only on use
+ENTRY_POINT_GROUP = 'rtltoolkit.tasks'
+
+
+def lat_lon(text):
+    lat, _, lon = text.partition(',')
+    try:
+        return float(lat), float(lon)
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected LAT,LON, got {}'
+                                         .format(text))
+
+
+def freq_list(text):
+    try:
+        return [float(freq) for freq in text.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected F1,F2,..., got {}'
+                                         .format(text))
+
+
+class TaskEntry:
+    def __init__(self, name, target, help, params=(), options=(),
+                 metavar=None):
+        # 'name' is the command line flag without the leading dashes.
+        # 'target' is 'module:Class'
+        self.name = name
+        self.target = target
+        self.help = help
+        # Names of the parsed arguments passed to the constructor after
+        # the sampling rate, center frequency, gain and block size
+        self.params = params
+        # Task specific options, as (flags, add_argument keywords)
+        self.options = options
+        # Tasks given a value on the command line (e.g. --capture NAME)
+        # set 'metavar'. The value is then available as the argument
+        # named after the task
+        self.metavar = metavar
+
+    def dest(self):
+        return self.name.replace('-', '_')
+
+    def load(self):
+        module_name, _, class_name = self.target.partition(':')
+        module = importlib.import_module(module_name)
+        return getattr(module, class_name)
+
+    def create(self, args, samp_size):
+        task_class = self.load()
+        params = [getattr(args, param) for param in self.params]
+
+        return task_class(args.rate, args.center, args.gain, samp_size,
+                          *params)
+
+
+TASKS = [
+    TaskEntry('temp', 'rtltoolkit.demodtasks.tempdemod:TempDemod',
+              'Listen to temperature sensor',
+              params=('verbose', 'file')),
+    TaskEntry('fm-radio', 'rtltoolkit.demodtasks.fmdemod:FmDemod',
+              'Listen to radio station',
+              params=('verbose', 'file', 'audio_rate', 'fm_polar', 'audio_latency'),
+              options=[
+                  (('--audio-rate',),
+                   dict(type=int,
+                        metavar='RATE',
+                        help='Audio output rate of the FM tasks, e.g. 44100 (default 48000)')),
+                  (('--fm-polar',),
+                   dict(action='store_true',
+                        help='Demodulate FM without the arctangent, cheaper but only accurate for a small deviation')),
+                  (('--audio-latency',),
+                   dict(type=float,
+                        metavar='SECONDS',
+                        help='Audio buffered before playback starts (default 0.2)')),
+              ]),
+    TaskEntry('multi-fm', 'rtltoolkit.demodtasks.multifmdemod:MultiFmDemod',
+              'Listen to several radio stations within the captured band',
+              params=('verbose', 'file', 'stations', 'audio_rate', 'fm_polar',
+                      'audio_latency'),
+              options=[
+                  (('--stations',),
+                   dict(type=freq_list,
+                        metavar='F1,F2,...',
+                        help='Frequencies of the stations for multi-fm, in Hz')),
+              ]),
+    TaskEntry('raw', 'rtltoolkit.recordtasks.rawiq:RawIQ',
+              'Listen to Raw IQ data',
+              params=('verbose', 'file', 'diff'),
+              options=[
+                  (('--on-active',),
+                   dict(action='store_true',
+                        help='''Record samples only on activity
+                                 - reffers to Raw IQ recording''')),
+                  (('--diff',),
+                   dict(type=int,
+                        help='''Set difference that qualifies as activity''')),
+              ]),
+    TaskEntry('adsb', 'rtltoolkit.demodtasks.adsbdemod:AdsbDemod',
+              'Listen ADS-B data sent from airplanes',
+              params=('verbose', 'file', 'ref_pos', 'beast_port', 'sbs_port'),
+              options=[
+                  (('--ref-pos',),
+                   dict(type=lat_lon,
+                        metavar='LAT,LON',
+                        help='Receiver position, lets positions be decoded from a single frame')),
+                  (('--beast-port',),
+                   dict(type=int,
+                        metavar='PORT',
+                        help='Serve raw frames in the Beast binary format on localhost (usually 30005)')),
+                  (('--sbs-port',),
+                   dict(type=int,
+                        metavar='PORT',
+                        help='Serve decoded messages in the SBS BaseStation format on localhost (usually 30003)')),
+              ]),
+    TaskEntry('fft', 'rtltoolkit.displaytasks.fftsink:FftSink',
+              'Start FFT sink',
+              params=('cmd', 'limit', 'persistence'),
+              options=[
+                  (('--limit',),
+                   dict(type=int,
+                        help='Set lower limit by Y axis for FFT Sink')),
+                  (('--persistence',),
+                   dict(action='store_true',
+                        help='Display highest values over time')),
+                  (('--cmd',),
+                   dict(action='store_true',
+                        help='Choose CMD mode for the FFT Sink')),
+              ]),
+    TaskEntry('scan-fm', 'rtltoolkit.displaytasks.scanfm:ScanFm',
+              'Scan FM radio spectrum'),
+    TaskEntry('capture', 'rtltoolkit.recordtasks.capturetask:CaptureTask',
+              'Capture samples into shared memory for other tasks',
+              params=('capture',),
+              metavar='NAME'),
+    TaskEntry('jammer', 'rtltoolkit.transmittasks.jammertask:JammerTask',
+              'Jam certain frequency'),
+    TaskEntry('transmit-fm', 'rtltoolkit.transmittasks.fmmodulate:FmModulate',
+              'Transmit FM radio',
+              params=('tune_freq',),
+              options=[
+                  (('--tune-freq',),
+                   dict(type=int,
+                        help='Choose frequency for transmit-fm')),
+              ]),
+    TaskEntry('transmit-temp',
+              'rtltoolkit.transmittasks.tempmodulate:TempModulate',
+              'Transmit data based on the TFA 30 3200 sensor',
+              params=('temperature', 'humidity', 'channel'),
+              options=[
+                  (('--channel',),
+                   dict(type=int,
+                        help='Channel value to be transmitted with transmit-temp')),
+                  (('--humidity',),
+                   dict(type=int,
+                        help='Humidity value to be transmitted with transmit-temp')),
+                  (('--temperature',),
+                   dict(type=int,
+                        help='Temperature value to be transmited with transmit-temp')),
+              ]),
+    TaskEntry('transmit-tune',
+              'rtltoolkit.transmittasks.tunemodulate:TuneModulate',
+              'Transmit FM radio',
+              params=('file',)),
+]
+
+
+def plugin_tasks():
+    # Tasks registered by other installed packages. A broken plugin is
+    # reported and skipped instead of taking the toolkit down with it
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return []
+
+    try:
+        eps = entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:
+        # Python < 3.10 returns a dictionary of groups
+        eps = entry_points().get(ENTRY_POINT_GROUP, [])
+
+    tasks = []
+    for ep in eps:
+        try:
+            entry = ep.load()
+        except Exception as err:
+            print('Could not load task plugin {}: {}'.format(ep.name, err))
+            continue
+
+        if not isinstance(entry, TaskEntry):
+            print('Task plugin {} is not a TaskEntry'.format(ep.name))
+            continue
+
+        tasks.append(entry)
+
+    return tasks
+
+
+def all_tasks():
+    tasks = list(TASKS)
+    names = {entry.name for entry in tasks}
+
+    for entry in plugin_tasks():
+        if entry.name in names:
+            print('Task plugin {} clashes with an existing task'
+                  .format(entry.name))
+            continue
+        names.add(entry.name)
+        tasks.append(entry)
+
+    return tasks
+
+
+def add_arguments(parser, tasks):
+    # One flag per task in a mutually exclusive group, followed by
+    # the options of every task
+    group = parser.add_mutually_exclusive_group()
+    for entry in tasks:
+        if entry.metavar:
+            group.add_argument('--' + entry.name,
+                               metavar=entry.metavar,
+                               help=entry.help)
+        else:
+            group.add_argument('--' + entry.name,
+                               action='store_true',
+                               help=entry.help)
+
+    for entry in tasks:
+        if not entry.options:
+            continue
+
+        options = parser.add_argument_group('--{} options'.format(entry.name))
+        for flags, kwargs in entry.options:
+            options.add_argument(*flags, **kwargs)
+
+
+def selected_task(args, tasks):
+    for entry in tasks:
+        value = getattr(args, entry.dest(), None)
+        if value:
+            return entry
+
+    return None
@@ -0,0 +1,6 @@
+from .samplesource import SampleSource
+from .pipesource import PipeSource
+from .filesource import FileSource
+from .rtlsdrsource import RtlSdrSource
+from .tcpsource import TcpSource
+from .shmsource import ShmSource
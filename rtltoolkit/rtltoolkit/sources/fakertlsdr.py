@@ -0,0 +1,57 @@
+import time
+import numpy as np
+
+
+class FakeRtlSdr:
+    # Stand-in for 'rtlsdr.RtlSdr' which replays a raw 8 bit I/Q
+    # recording. It implements the parts of the interface RtlSdrSource
+    # uses, so the async path can be exercised without a dongle
+
+    def __init__(self, file_name, realtime=False, loop=False):
+        self.data = np.memmap(file_name, dtype=np.uint8, mode='r')
+        self.realtime = realtime
+        self.loop = loop
+        self.pos = 0
+        self.canceling = False
+
+        self.sample_rate = 2.048e6
+        self.center_freq = 0
+        self.gain = 0
+
+    def read_bytes(self, num_bytes):
+        num_bytes = int(num_bytes)
+        if self.loop and self.pos + num_bytes > len(self.data):
+            self.pos = 0
+
+        data = self.data[self.pos:self.pos + num_bytes]
+        self.pos += len(data)
+
+        return data
+
+    def read_bytes_async(self, callback, num_bytes, context=None):
+        if not context:
+            context = self
+
+        self.canceling = False
+        start = time.perf_counter()
+        served = 0
+
+        while not self.canceling:
+            data = self.read_bytes(num_bytes)
+            if len(data) < num_bytes:
+                break
+
+            callback(data, context)
+            served += len(data)
+
+            if self.realtime:
+                delay = start + served / 2 / self.sample_rate - \
+                    time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def cancel_read_async(self):
+        self.canceling = True
+
+    def close(self):
+        self.data = None
@@ -0,0 +1,97 @@
+import time
+import numpy as np
+
+from rtltoolkit.sources.samplesource import SampleSource
+
+
+class FileSource(SampleSource):
+    lossless = True
+
+    def __init__(self, file_name, realtime=False):
+        super().__init__()
+        self.file_name = file_name
+        self.realtime = realtime
+        self.data = None
+        self.pos = 0
+        self.scratch = None
+
+    def open(self, task):
+        super().open(task)
+
+        # '.npy' files are the ones written by RecordSamp. Everything
+        # else is treated as a raw 'rtl_sdr' dump of interleaved
+        # unsigned 8 bit I/Q values (.cu8, .bin, .raw ...)
+        # In both cases the file is memory-mapped, so only the
+        # blocks which are being read are paged in. Complex samples
+        # are read as their interleaved real and imaginary parts and
+        # converted a block at a time
+        if self.file_name.endswith('.npy'):
+            data = np.load(self.file_name, mmap_mode='r')
+            if np.iscomplexobj(data):
+                data = data.reshape(-1)
+                data = data.view(data.real.dtype)
+            else:
+                data = data.reshape(-1).view(np.uint8)
+        else:
+            data = np.memmap(self.file_name, dtype=np.uint8, mode='r')
+
+        self.data = data
+        self.pos = 0
+
+    def retune(self, task):
+        # A recording can't be retuned, just keep reading from it
+        if self.data is None:
+            self.open(task)
+
+    def readinto(self, buf):
+        buf = np.frombuffer(buf, dtype=np.uint8)
+        chunk = self.data[self.pos:self.pos + len(buf)]
+        count = len(chunk)
+        if not count:
+            return 0
+
+        if chunk.dtype == np.uint8:
+            buf[:count] = chunk
+        else:
+            # Normalised complex samples are converted back to the 8 bit
+            # representation 'rtl_sdr' produces. Because RecordSamp saves
+            # samples which were normalised from bytes, this is lossless
+            if self.scratch is None or len(self.scratch) < count:
+                self.scratch = np.empty(count, dtype=np.float64)
+            scratch = self.scratch[:count]
+            np.multiply(chunk, 127.5, out=scratch)
+            scratch += 127.5
+            np.rint(scratch, out=scratch)
+            np.clip(scratch, 0, 255, out=scratch)
+            buf[:count] = scratch
+
+        self.pos += count
+
+        if self.realtime:
+            self.pace()
+
+        return count
+
+    def read_block(self, buf):
+        # The end of the recording rarely falls on a block boundary.
+        # The last, short block is filled up with the zero level rather
+        # than dropped
+        count = super().read_block(buf)
+        if 0 < count < len(buf):
+            buf = np.frombuffer(buf, dtype=np.uint8)
+            buf[count:] = 127
+            count = len(buf)
+
+        return count
+
+    def pace(self):
+        # Sleep until the wall clock catches up with the amount of
+        # samples served, so the file is replayed at 'samp_rate'
+        target = self.start_time + self.pos / 2 / self.samp_rate
+        delay = target - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def close(self):
+        super().close()
+        self.data = None
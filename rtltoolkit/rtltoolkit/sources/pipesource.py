@@ -0,0 +1,75 @@
+import os
+import signal
+import sys
+
+from rtltoolkit.sources.samplesource import SampleSource
+
+
+class PipeSource(SampleSource):
+    def __init__(self):
+        super().__init__()
+        self.pid = None
+        self.pipe = None
+
+    def open(self, task):
+        super().open(task)
+
+        # Create pipe for communication between the
+        # 'rtl_sdr' process and the main program
+        r, w = os.pipe()
+        os.set_inheritable(r, True)
+        os.set_inheritable(w, True)
+
+        # Fork process
+        pid = os.fork()
+
+        if pid != 0:
+            # Close the write end of the parent process
+            os.close(w)
+            self.pipe = os.fdopen(r, 'rb', buffering=0)
+            self.pid = pid
+            return
+
+        print('Listening...')
+
+        # Close the read end of the pipe
+        os.close(r)
+        # Redirect the stdin of the new process to the
+        # writting end of the pipe
+        os.dup2(w, sys.stdout.fileno())
+
+        # Redirect the stderr of the new process to
+        # /dev/null. Done because the programe 'rtl_sdr'
+        # starts printing info about the SDR to the
+        # stderr, which pollutes the terminal
+        err = os.open('/dev/null', os.O_WRONLY)
+        os.dup2(err, sys.stderr.fileno())
+
+        # Build the argument array for 'rtl_sdr'
+        # Argument descriptions can be found with
+        # 'rtl_sdr --help'
+        cmd_args = ['rtl_sdr', '-', '-f', str(self.center_freq), '-s',
+                    str(self.samp_rate), '-g', str(self.gain), '-b',
+                    str(self.block_size)]
+
+        # Execute 'rtl-sdr' in the child process
+        os.execvp('rtl_sdr', cmd_args)
+
+    def readinto(self, buf):
+        return self.pipe.readinto(buf)
+
+    def close(self):
+        super().close()
+
+        # Stop 'rtl_sdr' and reap it so no zombie processes are left
+        if self.pid is not None:
+            try:
+                os.kill(self.pid, signal.SIGTERM)
+                os.waitpid(self.pid, 0)
+            except OSError:
+                pass
+            self.pid = None
+
+        if self.pipe is not None:
+            self.pipe.close()
+            self.pipe = None
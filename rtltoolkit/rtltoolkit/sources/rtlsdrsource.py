@@ -0,0 +1,112 @@
+import threading
+import numpy as np
+
+from rtltoolkit.sources.samplesource import SampleSource
+
+
+class RtlSdrSource(SampleSource):
+    tunable = True
+
+    # Bytes read and thrown away after a retune, the device still holds
+    # samples taken at the previous frequency (the amount 'rtl_power'
+    # discards)
+    FLUSH_BYTES = 4096
+
+    def __init__(self, sdr=None):
+        super().__init__()
+        # An already opened RtlSdr (or an object with the same interface)
+        # can be handed in. Otherwise the first device is opened
+        self.sdr = sdr
+        self.opened = False
+        self.ring = None
+        self.streaming = threading.Event()
+        self.stopped = threading.Event()
+
+    def open(self, task):
+        super().open(task)
+
+        if self.sdr is None:
+            # Imported here so the other sources work without librtlsdr
+            from rtlsdr import RtlSdr
+            self.sdr = RtlSdr()
+
+        self.opened = True
+        self.configure(task)
+
+    def configure(self, task):
+        self.samp_rate = task.samp_rate
+        self.center_freq = task.center_freq
+        self.gain = task.gain
+        # Setting the rate restarts the device's sampling, so it is
+        # only done when the rate actually changes
+        if self.sdr.sample_rate != self.samp_rate:
+            self.sdr.sample_rate = self.samp_rate
+        self.sdr.center_freq = self.center_freq
+        self.sdr.gain = self.gain
+
+    def retune(self, task):
+        # The tuner is retuned in place, there is no need to
+        # restart the stream. A device which was handed in has not
+        # been set up yet the first time around (e.g. ScanFm never
+        # opens its source)
+        if not self.opened:
+            self.open(task)
+        else:
+            self.configure(task)
+
+        # Samples read synchronously right after the retune are still
+        # from the old frequency. While streaming they only cost a few
+        # milliseconds of a block, so they are left alone
+        if not self.streaming.is_set():
+            self.sdr.read_bytes(RtlSdrSource.FLUSH_BYTES)
+
+    def readinto(self, buf):
+        # Synchronous read, used when single blocks are requested
+        # (e.g. ScanFm) instead of a continuous stream
+        data = np.frombuffer(self.sdr.read_bytes(len(buf)), dtype=np.uint8)
+        buf = np.frombuffer(buf, dtype=np.uint8)
+        buf[:len(data)] = data
+
+        return len(data)
+
+    def on_bytes(self, values, context):
+        # Called by librtlsdr from within 'read_bytes_async' with the
+        # USB transfer buffer. It is copied once, directly into a free
+        # slot of the ring, as librtlsdr reuses the buffer afterwards
+        start = self.metrics.clock()
+        data = np.frombuffer(values, dtype=np.uint8)
+        block = self.ring.get_write_block()
+        count = min(len(data), len(block))
+        block[:count] = data[:count]
+        self.ring.commit_write()
+        self.metrics.record('ingest', start)
+        self.bytes_read += count
+
+    def stream(self, ring):
+        self.ring = ring
+        self.stopped.clear()
+        self.streaming.set()
+
+        try:
+            # Blocks until 'cancel_read_async' is called
+            self.sdr.read_bytes_async(self.on_bytes, self.block_size)
+        finally:
+            self.streaming.clear()
+            self.stopped.set()
+            ring.close()
+
+    def close(self):
+        super().close()
+
+        if self.sdr is None:
+            return
+
+        # Let the reader thread leave 'read_bytes_async' before the
+        # device is closed underneath it
+        if self.streaming.is_set():
+            self.sdr.cancel_read_async()
+            self.stopped.wait(1.0)
+
+        self.sdr.close()
+        self.sdr = None
+        self.opened = False
@@ -0,0 +1,87 @@
+import time
+
+
+class SampleSource:
+    # Sources whose data is not produced in real time (files) want the
+    # ring to wait for the consumer instead of dropping blocks
+    lossless = False
+
+    # Sources which can change the center frequency and gain while
+    # they are streaming
+    tunable = False
+
+    # Sources which deliver their blocks through a ring of their own
+    # (shared memory). The task then reads 'ring' directly instead of
+    # starting a reader thread
+    provides_ring = False
+
+    def __init__(self):
+        self.bytes_read = 0
+        self.start_time = None
+        self.stop_time = None
+
+    def open(self, task):
+        # Take the tuning parameters from the task which will be
+        # consuming the samples
+        self.samp_rate = task.samp_rate
+        self.center_freq = task.center_freq
+        self.gain = task.gain
+        self.block_size = int(task.samp_size) * 2
+        self.metrics = task.metrics
+
+        self.start_time = time.perf_counter()
+
+    def readinto(self, buf):
+        # Read up to len(buf) bytes of interleaved 8 bit I/Q data into
+        # 'buf'. Returns the number of bytes read, 0 at end of stream
+        return 0
+
+    def retune(self, task):
+        # Apply the task's current center frequency and gain. Sources
+        # which can't change them on the fly are simply reopened
+        self.close()
+        self.open(task)
+
+    def read_block(self, buf):
+        # Fill 'buf' completely, as a single 'readinto' may return
+        # less than requested
+        view = memoryview(buf)
+        pos = 0
+        while pos < len(view):
+            count = self.readinto(view[pos:])
+            if not count:
+                break
+            pos += count
+
+        self.bytes_read += pos
+        return pos
+
+    def stream(self, ring):
+        # Runs on the reader thread. Each block is read directly into
+        # a free slot of the ring. When the ring is full the block is
+        # still read so the source never stalls, but it is dropped
+        metrics = self.metrics
+        while True:
+            block = ring.get_write_block(wait=self.lossless)
+            start = metrics.clock()
+            if self.read_block(block) < len(block):
+                break
+            metrics.record('ingest', start)
+            ring.commit_write()
+
+        ring.close()
+
+    def close(self):
+        self.stop_time = time.perf_counter()
+
+    def print_stats(self):
+        if not self.bytes_read or self.start_time is None:
+            return
+
+        stop_time = self.stop_time or time.perf_counter()
+        elapsed = max(stop_time - self.start_time, 1e-9)
+        samples = self.bytes_read / 2
+
+        print('Read {:.2f} MS in {:.2f} s ({:.2f} MS/s, {:.2f}x real time)'
+              .format(samples / 1e6, elapsed, samples / elapsed / 1e6,
+                      samples / elapsed / self.samp_rate))
@@ -0,0 +1,56 @@
+import numpy as np
+
+from rtltoolkit.sources.samplesource import SampleSource
+
+
+class ShmSource(SampleSource):
+    # The shared ring already buffers the data, so the task reads its
+    # blocks in place instead of starting a reader thread
+    provides_ring = True
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.ring = None
+
+    def open(self, task):
+        super().open(task)
+
+        # Imported here, 'multiprocessing.shared_memory' needs Python
+        # 3.8 and the sources package imports every source
+        from rtltoolkit.helpers.sharedring import SharedRing, \
+            SharedRingReader
+        self.ring = SharedRingReader(SharedRing(self.name), self.block_size)
+
+        # The tuning is set by the capture task, consumers can't
+        # change it. Warn if the task expects something else
+        samp_rate, center_freq = self.ring.ring.get_tuning()
+        if samp_rate != int(self.samp_rate) or \
+           center_freq != int(self.center_freq):
+            print('Warning: capture is tuned to {} Hz at {} S/s'
+                  .format(center_freq, samp_rate))
+
+    def retune(self, task):
+        if self.ring is None:
+            self.open(task)
+
+    def readinto(self, buf):
+        # Blocks are normally read in place through 'ring'. This copying
+        # path only serves callers which need a plain buffer
+        block = self.ring.get_read_block()
+        if block is None:
+            return 0
+
+        buf = np.frombuffer(buf, dtype=np.uint8)
+        count = min(len(buf), len(block))
+        buf[:count] = block[:count]
+        self.ring.release_read()
+
+        return count
+
+    def close(self):
+        super().close()
+
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
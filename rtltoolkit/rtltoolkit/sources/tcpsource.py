@@ -0,0 +1,165 @@
+import socket
+import struct
+import time
+
+from rtltoolkit.sources.samplesource import SampleSource
+
+
+class TcpSource(SampleSource):
+    tunable = True
+
+    # rtl_tcp command codes. Each command is sent as one byte followed
+    # by a big endian 32 bit parameter
+    SET_FREQ = 0x01
+    SET_SAMPLE_RATE = 0x02
+    SET_GAIN_MODE = 0x03
+    SET_GAIN = 0x04
+
+    # On connect rtl_tcp sends the magic 'RTL0', the tuner type and
+    # the number of gain values the tuner supports
+    HEADER_LEN = 12
+    MAGIC = b'RTL0'
+
+    DEFAULT_PORT = 1234
+
+    def __init__(self, host, port=DEFAULT_PORT, timeout=5.0,
+                 retry_delay=1.0, max_retries=None):
+        super().__init__()
+        self.host = host
+        self.port = port
+        # A server which sends nothing for 'timeout' seconds is
+        # treated as lost and reconnected to
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+
+        self.sock = None
+        self.header = bytearray(TcpSource.HEADER_LEN)
+        self.tuner_type = None
+        self.gain_count = None
+        self.reconnects = 0
+        self.received = 0
+        self.closing = False
+
+    def open(self, task):
+        super().open(task)
+        self.closing = False
+        self.connect()
+
+    def connect(self):
+        self.sock = socket.create_connection((self.host, self.port),
+                                             self.timeout)
+
+        # Read the dongle info header before any samples
+        view = memoryview(self.header)
+        pos = 0
+        while pos < TcpSource.HEADER_LEN:
+            count = self.sock.recv_into(view[pos:])
+            if not count:
+                raise ConnectionError('rtl_tcp closed the connection')
+            pos += count
+
+        if self.header[:4] != TcpSource.MAGIC:
+            raise ConnectionError('{}:{} is not an rtl_tcp server'
+                                  .format(self.host, self.port))
+
+        self.tuner_type, self.gain_count = struct.unpack('>II',
+                                                         self.header[4:])
+
+        self.send_command(TcpSource.SET_SAMPLE_RATE, self.samp_rate)
+        self.configure()
+
+    def send_command(self, cmd, param):
+        self.sock.sendall(struct.pack('>BI', cmd, int(param)))
+
+    def configure(self):
+        self.send_command(TcpSource.SET_FREQ, self.center_freq)
+
+        if self.gain == 'auto':
+            self.send_command(TcpSource.SET_GAIN_MODE, 0)
+        else:
+            # Manual gain is given in tenths of a dB
+            self.send_command(TcpSource.SET_GAIN_MODE, 1)
+            self.send_command(TcpSource.SET_GAIN, round(float(self.gain) * 10))
+
+    def retune(self, task):
+        if self.sock is None:
+            self.open(task)
+            return
+
+        self.center_freq = task.center_freq
+        self.gain = task.gain
+        self.configure()
+
+    def reconnect(self):
+        # Keep trying to reach the server until it answers, the
+        # retries run out or the source is closed
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+        attempt = 0
+        while not self.closing:
+            if self.max_retries is not None and attempt >= self.max_retries:
+                return False
+            attempt += 1
+
+            try:
+                self.connect()
+            except OSError:
+                time.sleep(self.retry_delay)
+                continue
+
+            self.reconnects += 1
+            return True
+
+        return False
+
+    def readinto(self, buf):
+        # Samples are received straight into the caller's buffer,
+        # which for streaming tasks is a slot of the ring
+        while not self.closing:
+            sock = self.sock
+            if sock is None:
+                break
+
+            try:
+                count = sock.recv_into(buf)
+            except OSError:
+                count = 0
+
+            if count:
+                self.received += count
+                return count
+
+            if not self.reconnect():
+                break
+
+            # A connection lost in the middle of a sample leaves a lone
+            # I byte. Complete it with a zero level Q byte so the new
+            # stream starts on a sample boundary
+            if self.received % 2:
+                self.received = 0
+                buf[0] = 127
+                return 1
+            self.received = 0
+
+        return 0
+
+    def close(self):
+        super().close()
+        self.closing = True
+
+        if self.sock is not None:
+            # Shutting the socket down wakes up a blocked 'recv_into'
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+
+    def print_stats(self):
+        super().print_stats()
+        if self.reconnects:
+            print('Reconnected to rtl_tcp {} times'.format(self.reconnects))
@@ -0,0 +1,60 @@
+import argparse
+import os
+import time
+
+from rtltoolkit.helpers.trackstore import TrackStore
+
+
+def init_parser(parser):
+    parser.add_argument('directory',
+                        help='Track store written by --adsb --file')
+    parser.add_argument('--icao',
+                        help='Only the points of this aircraft (hex address)')
+    parser.add_argument('--last',
+                        type=float,
+                        metavar='SECONDS',
+                        help='Only the points of the last SECONDS seconds')
+    parser.add_argument('--start',
+                        type=float,
+                        help='Earliest time of the points (seconds since the epoch)')
+    parser.add_argument('--end',
+                        type=float,
+                        help='Latest time of the points (seconds since the epoch)')
+    parser.add_argument('--list',
+                        action='store_true',
+                        help='Only list the aircraft with points in the range')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='rtltoolkit tracks',
+                                     description='Query the stored ADS-B tracks')
+    init_parser(parser)
+    args = parser.parse_args(argv)
+
+    start = args.start
+    if args.last is not None:
+        start = time.time() - args.last
+
+    if not os.path.isdir(args.directory):
+        parser.error('no track store in \'{}\''.format(args.directory))
+    store = TrackStore(args.directory, read_only=True)
+
+    if args.list:
+        for icao in store.aircraft(start, args.end):
+            print('{:06x}'.format(icao))
+        return
+
+    try:
+        points = store.query(args.icao, start, args.end)
+    except ValueError:
+        parser.error('invalid ICAO address \'{}\''.format(args.icao))
+
+    print('{:<20}{:<8}{:>11}{:>12}{:>8}{:>7}'.format('TIME', 'ICAO', 'LAT',
+                                                     'LON', 'ALT', 'SPEED'))
+    for k in range(len(points['time'])):
+        print('{:<20}{:<8}{:>11.5f}{:>12.5f}{:>8.0f}{:>7.0f}'.format(
+            time.strftime('%Y-%m-%d %H:%M:%S',
+                          time.localtime(points['time'][k])),
+            '{:06x}'.format(points['icao'][k]),
+            points['lat'][k], points['lon'][k],
+            points['alt'][k], points['speed'][k]))
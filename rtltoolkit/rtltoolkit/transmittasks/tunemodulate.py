@@ -2,13 +2,22 @@ import numpy as np
 import wave
 
 from rtltoolkit.basetasks.transmittask import TransmitTask
+from rtltoolkit.helpers.polyphase import Resampler
 
 class TuneModulate(TransmitTask):
     def __init__(self, samp_rate, center_freq, gain, samp_size, file_name):
         super().__init__(samp_rate, center_freq, gain, samp_size)
         self.tune_file = wave.open(file_name, 'rb')
-        self.samp_rate = self.tune_file.getframerate()
 
+        # The tune is transmitted at its own rate unless another one is
+        # asked for, in which case it is resampled in a single pass
+        self.tune_rate = self.tune_file.getframerate()
+        self.resampler = None
+        if not self.samp_rate:
+            self.samp_rate = self.tune_rate
+        elif self.samp_rate != self.tune_rate:
+            self.resampler = Resampler.from_rates(self.tune_rate,
+                                                  self.samp_rate)
 
     def modulate_wave(tune_wav, coef):
         mod_r = np.cos(2 * np.pi * coef * tune_wav)
@@ -18,16 +27,19 @@ class TuneModulate(TransmitTask):
         return mod_wav
 
     def execute(self):
-        tune_arr = list(self.tune_file.readframes(self.samp_size))
+        tune_arr = self.tune_file.readframes(self.samp_size)
         if len(tune_arr) == 0:
             self.tune_file.rewind()
-            tune_arr = list(self.tune_file.readframes(self.samp_size))
+            tune_arr = self.tune_file.readframes(self.samp_size)
 
-        tune_arr = np.array(tune_arr, dtype=np.float64)
-        tune_arr *= 255 / max(tune_arr)
+        tune_arr = np.frombuffer(tune_arr, dtype=np.uint8).astype(np.float64)
+        tune_arr *= 255 / tune_arr.max()
         tune_arr /= 127.5
         tune_arr -= 1
 
+        if self.resampler is not None:
+            tune_arr = self.resampler.process(tune_arr)
+
         samp_arr = TuneModulate.modulate_wave(tune_arr, 2)
 
         return samp_arr
@@ -0,0 +1,236 @@
+import numpy as np
+import pytest
+
+from rtltoolkit.basetasks.sdrtask import SDRTask
+from rtltoolkit.demodtasks.adsbdemod import AdsbDemod
+from rtltoolkit.helpers import siggen
+
+
+# The scalar detector the batched one replaced, kept as the reference
+# the batched code has to agree with
+
+def scalar_magnitude(iq):
+    samples = SDRTask.normalise_samples(iq, np.empty(len(iq))) * 255
+    return np.around(samples.real ** 2 + samples.imag ** 2)
+
+
+def scalar_check_preamble(mag):
+    if not (mag[0] > mag[1] and
+            mag[1] < mag[2] and
+            mag[2] > mag[3] and
+            mag[3] < mag[0] and
+            mag[4] < mag[0] and
+            mag[5] < mag[0] and
+            mag[6] < mag[0] and
+            mag[7] > mag[8] and
+            mag[8] < mag[9] and
+            mag[9] > mag[6]):
+        return 0
+
+    high = (mag[0] + mag[2] + mag[7] + mag[9]) / 6
+    if mag[4] >= high or mag[5] >= high:
+        return 0
+    if mag[11] >= high or mag[12] >= high or \
+       mag[13] >= high or mag[14] >= high:
+        return 0
+
+    return 1
+
+
+def scalar_slice(mag, i):
+    # Bytes, message length and bit quality of the candidate at 'i'.
+    # A bit with equal halves is returned as None, the scalar slicer
+    # marked it with a 2
+    data_mag = list(mag[i + AdsbDemod.MODES_PREAMBLE * 2:
+                        i + AdsbDemod.MODES_FULL_LEN * 2])
+    mag_cpy = list(data_mag)
+
+    if i and (mag_cpy[3] > mag_cpy[2] / 3 or
+              mag_cpy[10] > mag_cpy[9] / 3 or
+              mag_cpy[6] > mag_cpy[7] / 3):
+        for j in range(0, AdsbDemod.MODES_LONG_MSG_BITS * 2 - 2, 2):
+            if mag_cpy[j] > mag_cpy[j + 1]:
+                mag_cpy[j + 2] = (mag_cpy[j + 2] * 5) / 4
+            else:
+                mag_cpy[j + 2] = (mag_cpy[j + 2] * 4) / 5
+
+    bits = []
+    for j in range(0, AdsbDemod.MODES_LONG_MSG_BITS * 2, 2):
+        if mag_cpy[j] == mag_cpy[j + 1]:
+            return None
+        bits.append(int(mag_cpy[j] > mag_cpy[j + 1]))
+
+    data = bytes(int(''.join(map(str, bits[j:j + 8])), 2)
+                 for j in range(0, len(bits), 8))
+    msg_bits = AdsbDemod.MODES_SHORT_MSG_BITS
+    if data[0] >> 3 in (16, 17, 19, 20, 21):
+        msg_bits = AdsbDemod.MODES_LONG_MSG_BITS
+
+    delta = sum(abs(data_mag[j] - data_mag[j + 1])
+                for j in range(0, msg_bits * 2, 2)) / msg_bits
+
+    return data, msg_bits, delta
+
+
+def make_demod(samp_rate, samp_size=2**16):
+    return AdsbDemod(samp_rate, 1090e6, 44.5, samp_size, False, '')
+
+
+def crc_frames(msgs):
+    return [msg for msg, rem in msgs if not rem]
+
+
+def execute_blocks(demod, iq, block_len):
+    msgs = []
+    demod.report = lambda samples, found: msgs.extend(found)
+    for start in range(0, len(iq), block_len):
+        demod.execute(iq[start:start + block_len])
+
+    return msgs
+
+
+def noisy_capture():
+    # Weak frames among plenty of noise, so many offsets pass some but
+    # not all of the preamble tests
+    iq, _ = siggen.modes_frames(2**16, snr_db=6, seed=7)
+    return iq
+
+
+def detect_in_jobs(demod, iq, block_len):
+    # Every block along with the overlap in front of it, searched on its
+    # own as the workers of a BlockPool do
+    overlap = demod.block_overlap * 2
+    msgs = []
+    for end in range(block_len, len(iq) + block_len, block_len):
+        start = max(end - block_len - overlap, 0)
+        msgs.extend(demod.detect(iq[start:end], start // 2))
+
+    return msgs
+
+
+@pytest.mark.parametrize('samp_rate', [2e6, 2.4e6])
+def test_blocks_match_whole_array(samp_rate):
+    iq, count = siggen.modes_frames(2**18, snr_db=10, seed=2,
+                                    samp_rate=samp_rate)
+    whole = make_demod(samp_rate).detect(iq)
+    assert len(crc_frames(whole)) > count // 2
+
+    for block_size in (600, 4099, 2**14, 2**16):
+        demod = make_demod(samp_rate, block_size)
+        assert execute_blocks(demod, iq, block_size * 2) == whole
+
+    # Blocks of varying size, some of them shorter than the overlap
+    demod = make_demod(samp_rate)
+    msgs = []
+    demod.report = lambda samples, found: msgs.extend(found)
+    start = 0
+    for block_size in [300, 7000, 50, 2**15, 123] * 5:
+        demod.execute(iq[start:start + block_size * 2])
+        start += block_size * 2
+    demod.execute(iq[start:])
+    assert msgs == whole
+
+
+@pytest.mark.parametrize('samp_rate', [2.4e6, 3.2e6])
+@pytest.mark.parametrize('block_size', [1000, 4099, 2**14])
+def test_oversampled_jobs_match_whole_array(samp_rate, block_size):
+    iq, _ = siggen.modes_frames(2**18, snr_db=8, seed=5, samp_rate=samp_rate,
+                                spacing=int(1200 * samp_rate / 2e6))
+    demod = make_demod(samp_rate)
+
+    whole = demod.detect(iq)
+    assert len(crc_frames(whole)) > 0
+    assert detect_in_jobs(demod, iq, block_size * 2) == whole
+
+
+@pytest.mark.parametrize('snr_db', [8, 10])
+def test_oversampling_decodes_more_frames(snr_db):
+    found = []
+    for samp_rate in (2e6, 2.4e6, 3.2e6):
+        iq, count = siggen.modes_frames(2**19, snr_db=snr_db, seed=3,
+                                        samp_rate=samp_rate,
+                                        spacing=int(1200 * samp_rate / 2e6))
+        msgs = make_demod(samp_rate).detect(iq)
+        found.append(len(crc_frames(msgs)) / count)
+
+    assert found[0] < found[1] < found[2]
+
+
+@pytest.mark.parametrize('samp_rate', [2e6, 2.4e6, 3.2e6])
+def test_back_to_back_frames_are_kept_apart(samp_rate):
+    # Frames two half bits apart
+    spacing = int((AdsbDemod.MODES_FULL_LEN * 2 + 2) * samp_rate / 2e6) + 1
+    iq, count = siggen.modes_frames(2**16, seed=1, samp_rate=samp_rate,
+                                    spacing=spacing)
+
+    frames = crc_frames(make_demod(samp_rate).detect(iq))
+    assert len(frames) == count
+    assert frames == [siggen.MODES_MSGS[k % len(siggen.MODES_MSGS)].lower()
+                      for k in range(count)]
+
+
+def test_copy_failing_crc_falls_back_to_next_best():
+    starts = np.array([10.0, 10.25, 10.5, 30.0])
+    valid = np.array([False, True, True, False])
+    delta = np.array([400.0, 200.0, 300.0, 100.0])
+
+    keep = AdsbDemod.best_copies(starts, valid, delta)
+    assert keep.tolist() == [False, False, True, True]
+
+    # Equal copies leave the earliest
+    keep = AdsbDemod.best_copies(starts[:2], valid[1:3], delta[[0, 0]])
+    assert keep.tolist() == [True, False]
+
+
+def test_find_preambles_matches_scalar_check():
+    iq = noisy_capture()
+    mag = scalar_magnitude(iq)
+    count = len(mag) - AdsbDemod.MODES_FULL_LEN * 2
+    preamble_len = AdsbDemod.MODES_PREAMBLE * 2
+
+    expected = [i for i in range(count)
+                if scalar_check_preamble(mag[i:i + preamble_len])]
+    assert len(expected) > 100
+
+    assert AdsbDemod.find_preambles(mag, count).tolist() == expected
+    # The same offsets on the halved integer scale of the lookup table
+    half = AdsbDemod.calc_magnitude(iq)
+    assert AdsbDemod.find_preambles(half, count).tolist() == expected
+
+
+def test_batched_slicing_matches_scalar_slicer():
+    iq = noisy_capture()
+    mag = scalar_magnitude(iq)
+    preambles, data_bytes, msg_bits, delta = \
+        AdsbDemod.candidates(AdsbDemod.calc_magnitude(iq))
+    assert len(preambles) > 100
+
+    compared = 0
+    for k, i in enumerate(preambles.tolist()):
+        expected = scalar_slice(mag, i)
+        if expected is None:
+            continue
+
+        data, bits, scalar_delta = expected
+        assert data_bytes[k].tobytes() == data
+        assert msg_bits[k] == bits
+        # The lookup table holds half of the scalar magnitude
+        assert delta[k] * 2 == pytest.approx(scalar_delta)
+        compared += 1
+
+    assert compared > len(preambles) // 2
+
+
+def test_lookup_table_halves_the_direct_magnitude():
+    # Every possible I/Q byte pair, I varying fastest
+    iq = np.empty(2 * 65536, dtype=np.uint8)
+    iq[0::2] = np.tile(np.arange(256), 256)
+    iq[1::2] = np.repeat(np.arange(256), 256)
+
+    half = AdsbDemod.calc_magnitude(iq)
+    assert half.dtype == np.uint16
+    assert np.array_equal(half.astype(np.float64) * 2, scalar_magnitude(iq))
+
+    # Bytes and arrays of any integer type give the same magnitude
+    assert np.array_equal(AdsbDemod.calc_magnitude(iq.tobytes()), half)
+    assert np.array_equal(AdsbDemod.calc_magnitude(iq.astype(np.int64)), half)
@@ -0,0 +1,84 @@
+import pytest
+
+from rtltoolkit.helpers.aircraft import AircraftTable
+
+# An even and an odd airborne position frame of one aircraft, and the
+# position they decode to when the even one is the latest
+EVEN_MSG = '8D40621D58C382D690C8AC2863A7'
+ODD_MSG = '8D40621D58C386435CC412692AD6'
+POSITION = (52.2572021484375, 3.91937255859375)
+
+
+def test_least_recently_seen_is_evicted():
+    table = AircraftTable(max_size=3)
+    for icao in ('A', 'B', 'C'):
+        table.get(icao, 0.0)
+
+    table.get('A', 1.0)
+    table.get('D', 2.0)
+    assert list(table.aircraft) == ['C', 'A', 'D']
+    assert table.evicted == 1
+
+    plane = table.get('A', 3.0)
+    assert plane.msg_count == 3
+    assert plane.first_seen == 0.0
+    assert plane.last_seen == 3.0
+
+
+def test_expire_drops_silent_aircraft():
+    table = AircraftTable(timeout=10.0)
+    table.get('A', 0.0)
+    table.get('B', 5.0)
+    table.get('A', 6.0)
+
+    table.expire(16.0)
+    assert list(table.aircraft) == ['A']
+    table.expire(16.5)
+    assert len(table) == 0
+    assert table.expired == 2
+
+
+def test_global_position_from_a_frame_pair():
+    table = AircraftTable()
+    plane = table.get('40621D', 0.0)
+
+    assert table.update_position(plane, ODD_MSG, 0.0) is None
+    assert table.update_position(plane, EVEN_MSG, 1.0) == \
+        pytest.approx(POSITION)
+    assert plane.pos_time == 1.0
+
+
+def test_frames_too_far_apart_are_not_paired():
+    table = AircraftTable()
+    plane = table.get('40621D', 0.0)
+
+    table.update_position(plane, ODD_MSG, 0.0)
+    assert table.update_position(
+        plane, EVEN_MSG, AircraftTable.CPR_PAIR_TIME + 1.0) is None
+    assert plane.lat is None
+
+
+def test_local_position_from_the_last_one():
+    table = AircraftTable()
+    plane = table.get('40621D', 0.0)
+    table.update_position(plane, ODD_MSG, 0.0)
+    table.update_position(plane, EVEN_MSG, 1.0)
+
+    # Long after the pair, a single frame is decoded against the
+    # aircraft's own last position
+    now = 1.0 + AircraftTable.REF_TIME
+    assert table.update_position(plane, EVEN_MSG, now) == \
+        pytest.approx(POSITION)
+    assert plane.pos_time == now
+
+    # Once that position is too old, it takes a new pair
+    now += AircraftTable.REF_TIME + 1.0
+    assert table.update_position(plane, EVEN_MSG, now) is None
+
+
+def test_local_position_from_the_receiver():
+    table = AircraftTable(ref_pos=(52.258, 3.918))
+    plane = table.get('40621D', 0.0)
+
+    assert table.update_position(plane, EVEN_MSG, 0.0) == \
+        pytest.approx(POSITION)
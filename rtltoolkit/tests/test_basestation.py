@@ -0,0 +1,67 @@
+import datetime
+
+from rtltoolkit.demodtasks.adsbdemod import AdsbDemod
+from rtltoolkit.helpers import basestation
+
+
+def unescape(frame):
+    assert frame[0] == basestation.BEAST_ESC
+    body = frame[2:]
+    assert body.replace(b'\x1a\x1a', b'').count(b'\x1a') == 0
+    return frame[1], body.replace(b'\x1a\x1a', b'\x1a')
+
+
+def test_beast_frame_layout():
+    msg = bytes.fromhex('8d4840d6202cc371c32ce0576098')
+    frame_type, body = unescape(basestation.beast_frame(msg, 2.0, signal=300))
+
+    assert frame_type == basestation.BEAST_LONG
+    assert int.from_bytes(body[:6], 'big') == 24000000
+    assert body[6] == 255
+    assert body[7:] == msg
+
+    frame_type, body = unescape(basestation.beast_frame(msg[:7], 0.0))
+    assert frame_type == basestation.BEAST_SHORT
+    assert body == bytes(7) + msg[:7]
+
+
+def test_beast_frame_escapes_0x1a():
+    # 0x1a in the timestamp, the signal level and the message
+    msg = bytes.fromhex('1a1a00001a0000')
+    timestamp = (0x1a001a + 0.5) / basestation.BEAST_CLOCK
+    frame = basestation.beast_frame(msg, timestamp, signal=0x1a)
+
+    assert frame[:2] == b'\x1a\x32'
+    assert frame[2:] == bytes.fromhex('000000') + b'\x1a\x1a\x00\x1a\x1a' + \
+        b'\x1a\x1a' + bytes.fromhex('1a1a1a1a00001a1a0000')
+    assert unescape(frame)[1][7:] == msg
+
+
+def test_sbs_line_format():
+    now = 1700000000.25
+    line = basestation.sbs_line(basestation.SBS_AIRBORNE_POS, '4840d6', now,
+                                alt=38000, lat=52.2572021484375,
+                                lon=3.9)
+
+    assert line.endswith('\r\n')
+    fields = line[:-2].split(',')
+    assert len(fields) == 22
+
+    stamp = datetime.datetime.fromtimestamp(now)
+    date = stamp.strftime('%Y/%m/%d')
+    clock = stamp.strftime('%H:%M:%S') + '.250'
+    assert fields[:10] == ['MSG', '3', '1', '1', '4840D6', '1',
+                           date, clock, date, clock]
+    assert fields[10:18] == ['', '38000', '', '', '52.2572', '3.9', '', '']
+    assert fields[18:] == [''] * 4
+
+
+def test_sbs_message_of_an_identification():
+    demod = AdsbDemod(2e6, 1090e6, 44.5, 2**16, False, '')
+    msg = '8d4840d6202cc371c32ce0576098'
+    msg_fields = demod.decode(msg, 0.0)
+
+    fields = AdsbDemod.sbs_message(msg, msg_fields, 0.0).split(',')
+    assert fields[1] == str(basestation.SBS_ID)
+    assert fields[4] == '4840D6'
+    assert fields[10] == 'KLM1023'
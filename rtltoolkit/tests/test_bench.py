@@ -0,0 +1,36 @@
+import json
+
+from rtltoolkit import bench
+
+
+def test_signal_length_is_whole_blocks():
+    assert bench.signal_length(1.0, 2e6, 2**18) == 7 * 2**18
+    assert bench.signal_length(0.01, 2e6, 2**18) == 2**18
+
+
+def test_bench_counts_the_generated_messages(tmp_path):
+    out = str(tmp_path / 'results.json')
+    bench.main(['adsb', 'temp', '--seconds', '0.5', '--repeat', '1',
+                '--output', out])
+
+    with open(out) as f:
+        results = json.load(f)['results']
+
+    assert set(results) == {'adsb', 'temp'}
+    for res in results.values():
+        assert res['expected'] > 0
+        assert res['decoded'] == res['expected']
+        assert res['samples'] == bench.signal_length(0.5, res['samp_rate'],
+                                                     res['samp_size'])
+        assert res['samples_per_sec'] > 0
+        assert res['peak_mem_bytes'] > 0
+
+
+def test_bench_compares_against_an_earlier_run(tmp_path, capsys):
+    out = str(tmp_path / 'results.json')
+    bench.main(['fft', '--seconds', '0.1', '--repeat', '1', '--output', out])
+    bench.main(['fft', '--seconds', '0.1', '--repeat', '1', '--compare', out])
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[-1].startswith('fft')
+    assert lines[-1].endswith('%')
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from rtltoolkit.basetasks.sdrtask import SDRTask
+from rtltoolkit.demodtasks.adsbdemod import AdsbDemod
+from rtltoolkit.helpers import siggen
+from rtltoolkit.helpers.blockpool import BlockPool
+
+
+class OverlapTask(SDRTask):
+    # Reports what every job saw
+    block_overlap = 10
+    raw_samples = True
+
+    def __init__(self):
+        super().__init__(2e6, 1, 1, 64)
+        self.reported = []
+        self.samp_buf = np.empty(self.samp_size * 2)
+
+    def detect(self, samples, position=0):
+        return position, np.array(samples)
+
+    def report(self, samples, detected):
+        # The samples are normalised into the task's buffer, which the
+        # next report reuses
+        if samples is not None:
+            samples = samples.copy()
+        self.reported.append((detected, samples))
+
+
+def run_pool(task, blocks, workers=2):
+    pool = BlockPool(task, workers)
+    try:
+        for block in blocks:
+            pool.submit(block)
+        pool.finish()
+    finally:
+        pool.close()
+
+
+def make_blocks(count, size):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, size, dtype=np.uint8) for _ in range(count)]
+
+
+def test_jobs_see_the_overlap_in_order():
+    task = OverlapTask()
+    blocks = make_blocks(20, task.samp_size * 2)
+    run_pool(task, blocks)
+
+    overlap = task.block_overlap * 2
+    assert len(task.reported) == len(blocks)
+    for k, ((position, seen), samples) in enumerate(task.reported):
+        expected = blocks[k]
+        if k:
+            expected = np.concatenate((blocks[k - 1][-overlap:], expected))
+        assert np.array_equal(seen, expected)
+        assert position == k * task.samp_size - (task.block_overlap if k
+                                                 else 0)
+        assert samples is None
+
+
+def test_normalised_jobs_and_reported_samples():
+    task = OverlapTask()
+    task.raw_samples = False
+    task.report_samples = True
+    blocks = make_blocks(6, task.samp_size * 2)
+    run_pool(task, blocks)
+
+    overlap = task.block_overlap * 2
+    for k, ((position, seen), samples) in enumerate(task.reported):
+        expected = blocks[k] if not k else \
+            np.concatenate((blocks[k - 1][-overlap:], blocks[k]))
+        assert np.array_equal(seen, SDRTask.normalise_samples(expected))
+        assert np.array_equal(samples, SDRTask.normalise_samples(blocks[k]))
+
+
+@pytest.mark.parametrize('samp_rate', [2e6, 2.4e6])
+def test_adsb_pool_matches_serial_execute(samp_rate):
+    samp_size = 4099
+    iq, _ = siggen.modes_frames(samp_size * 40, snr_db=10, seed=4,
+                                samp_rate=samp_rate, spacing=997)
+    blocks = [iq[start:start + samp_size * 2]
+              for start in range(0, len(iq), samp_size * 2)]
+
+    serial = AdsbDemod(samp_rate, 1090e6, 44.5, samp_size, False, '')
+    expected = []
+    serial.report = lambda samples, msgs: expected.extend(msgs)
+    for block in blocks:
+        serial.execute(block)
+    assert len(expected) > 100
+
+    task = AdsbDemod(samp_rate, 1090e6, 44.5, samp_size, False, '')
+    found = []
+    task.report = lambda samples, msgs: found.extend(msgs)
+    run_pool(task, blocks, workers=3)
+
+    assert found == expected
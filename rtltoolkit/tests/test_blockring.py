@@ -0,0 +1,90 @@
+import threading
+
+from rtltoolkit.helpers.blockring import BlockRing
+
+
+def write(ring, value, wait=False):
+    block = ring.get_write_block(wait)
+    block[:] = value
+    ring.commit_write()
+    return block
+
+
+def read(ring, timeout=None):
+    block = ring.get_read_block(timeout)
+    if block is None:
+        return None
+    value = int(block[0])
+    ring.release_read()
+    return value
+
+
+def test_blocks_are_read_in_order():
+    ring = BlockRing(3, 4)
+    for value in range(5):
+        write(ring, value)
+        assert read(ring) == value
+
+    assert read(ring, timeout=0) is None
+    assert ring.max_fill == 1
+
+
+def test_full_ring_drops_and_counts_blocks():
+    ring = BlockRing(2, 4)
+    write(ring, 0)
+    write(ring, 1)
+
+    # Every write into the full ring is dropped, the overrun is
+    # counted once per time the ring runs full
+    for value in (2, 3, 4):
+        assert write(ring, value) is ring.scratch
+    assert ring.overruns == 1
+    assert ring.dropped == 3
+
+    assert read(ring) == 0
+    write(ring, 5)
+    write(ring, 6)
+    assert ring.overruns == 2
+    assert ring.dropped == 4
+
+    assert [read(ring, timeout=0) for _ in range(3)] == [1, 5, None]
+    assert ring.max_fill == 2
+
+
+def test_close_wakes_a_waiting_reader():
+    ring = BlockRing(2, 4)
+    result = []
+    reader = threading.Thread(target=lambda: result.append(read(ring)))
+    reader.start()
+
+    reader.join(0.1)
+    assert reader.is_alive()
+    ring.close()
+    reader.join(5)
+    assert not reader.is_alive()
+    assert result == [None]
+
+
+def test_blocks_written_before_close_are_still_read():
+    ring = BlockRing(2, 4)
+    write(ring, 7)
+    ring.close()
+
+    assert read(ring) == 7
+    assert read(ring) is None
+
+
+def test_lossless_writer_waits_for_the_reader():
+    ring = BlockRing(1, 4)
+    write(ring, 0)
+
+    writer = threading.Thread(target=write, args=(ring, 1, True))
+    writer.start()
+    writer.join(0.1)
+    assert writer.is_alive()
+
+    assert read(ring) == 0
+    writer.join(5)
+    assert not writer.is_alive()
+    assert read(ring) == 1
+    assert ring.dropped == 0
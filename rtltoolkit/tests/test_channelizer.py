@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+import scipy.signal as signal
+
+from rtltoolkit.helpers.channelizer import Channelizer
+
+
+SAMP_RATE = 2.4e6
+CHANNEL_BW = 200e3
+OFFSETS = [-600e3, 0, 350e3]
+
+# Odd block sizes, some far shorter and some longer than a frame
+BLOCK_SIZES = [1, 7, 333, 1000, 4097, 2, 50000, 123457] * 2
+
+
+def noise(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal(count) + 1j * rng.standard_normal(count)
+
+
+def process_blocks(channelizer, samples, block_sizes):
+    outputs = [[] for _ in channelizer.offsets]
+    start = 0
+    for size in block_sizes + [len(samples)]:
+        for out, channel in zip(outputs,
+                                channelizer.process(samples[start:
+                                                            start + size])):
+            out.append(channel)
+        start += size
+
+    return [np.concatenate(out) for out in outputs]
+
+
+def mix_filter_decimate(samples, center, dec):
+    # The same lowpass Channelizer designs, applied the direct way
+    num_taps = int(3.3 * SAMP_RATE / Channelizer.TRANSITION) | 1
+    taps = signal.firwin(num_taps, CHANNEL_BW / 2, fs=SAMP_RATE)
+    mixer = np.exp(-2j * np.pi * center * np.arange(len(samples)) /
+                   SAMP_RATE)
+    return signal.lfilter(taps, 1, samples * mixer)[::dec]
+
+
+def test_blocks_match_mix_filter_decimate():
+    samples = noise(300000)
+    channelizer = Channelizer(SAMP_RATE, OFFSETS, CHANNEL_BW)
+    outputs = process_blocks(channelizer, samples, BLOCK_SIZES)
+
+    # The input of the last, partial frame is still pending
+    frame_len = channelizer.hop // channelizer.dec
+    for center, out in zip(channelizer.centers, outputs):
+        expected = mix_filter_decimate(samples, center, channelizer.dec)
+        assert len(expected) - frame_len < len(out) <= len(expected)
+        # Bins outside the channel are dropped rather than aliased in,
+        # which leaves differences at the level of the stopband
+        assert np.allclose(out, expected[:len(out)], rtol=0, atol=1e-3)
+
+
+def test_blocks_match_whole_array():
+    samples = noise(300000, seed=1)
+    whole = Channelizer(SAMP_RATE, OFFSETS, CHANNEL_BW).process(samples)
+    blocks = process_blocks(Channelizer(SAMP_RATE, OFFSETS, CHANNEL_BW),
+                            samples, BLOCK_SIZES)
+
+    for expected, out in zip(whole, blocks):
+        assert np.allclose(out, expected, rtol=0, atol=1e-9)
+
+
+def test_channel_outside_capture():
+    with pytest.raises(ValueError):
+        Channelizer(SAMP_RATE, [1.2e6], CHANNEL_BW)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from rtltoolkit.helpers.discriminator import FmDiscriminator
+
+
+# Odd block sizes, including single samples and an empty block
+BLOCK_SIZES = [1, 7, 0, 333, 1000, 4097, 2] * 3
+
+
+def fm_signal(count, seed=0):
+    # Constant envelope, random phase steps of up to 2 radians
+    rng = np.random.default_rng(seed)
+    phase = np.cumsum(rng.uniform(-2, 2, count))
+    return 3 * np.exp(1j * phase)
+
+
+def process_blocks(discriminator, samples):
+    # The discriminator reuses its output buffer, every block is copied
+    out = []
+    start = 0
+    for size in BLOCK_SIZES:
+        out.append(discriminator.process(samples[start:start + size]).copy())
+        start += size
+    out.append(discriminator.process(samples[start:]).copy())
+
+    return np.concatenate(out)
+
+
+@pytest.mark.parametrize('dtype', [np.complex64, np.complex128])
+def test_blocks_match_phase_steps(dtype):
+    samples = fm_signal(20000).astype(dtype)
+    expected = np.angle(samples[1:] * np.conj(samples[:-1]))
+
+    out = process_blocks(FmDiscriminator(), samples)
+    assert out.dtype == np.float32
+    # One output per input, the first has no predecessor
+    assert len(out) == len(samples)
+    assert out[0] == 0
+    assert np.allclose(out[1:], expected, rtol=0, atol=1e-5)
+
+
+def test_polar_gives_the_sine_of_the_phase_steps():
+    samples = fm_signal(20000, seed=1).astype(np.complex64)
+    expected = np.angle(samples[1:] * np.conj(samples[:-1]))
+
+    # Every block is scaled by its own mean power, so the signal is
+    # given as a single block
+    out = FmDiscriminator(polar=True).process(samples)
+    assert np.allclose(out[1:], np.sin(expected), rtol=0, atol=1e-3)
+
+
+def test_empty_block():
+    discriminator = FmDiscriminator()
+    assert len(discriminator.process(np.empty(0, np.complex64))) == 0
+    assert len(discriminator.process(np.ones(5, np.complex64))) == 5
@@ -0,0 +1,54 @@
+import numpy as np
+
+from rtltoolkit.helpers.metrics import NullMetrics
+from rtltoolkit.sources.filesource import FileSource
+
+
+class FakeTask:
+    samp_rate = 1e6
+    center_freq = 100e6
+    gain = 'auto'
+    samp_size = 8
+    metrics = NullMetrics()
+
+
+def read_blocks(source):
+    blocks = []
+    buf = bytearray(FakeTask.samp_size * 2)
+    while source.read_block(buf) == len(buf):
+        blocks.append(bytes(buf))
+
+    return blocks
+
+
+def test_raw_last_block_is_padded(tmp_path):
+    path = str(tmp_path / 'capture.cu8')
+    data = (np.arange(40) % 251).astype(np.uint8)
+    data.tofile(path)
+
+    source = FileSource(path)
+    source.open(FakeTask())
+    blocks = read_blocks(source)
+    source.close()
+
+    assert len(blocks) == 3
+    assert b''.join(blocks)[:len(data)] == data.tobytes()
+    assert blocks[-1][8:] == bytes([127]) * 8
+    assert source.bytes_read == len(data)
+
+
+def test_complex_npy_round_trips(tmp_path):
+    path = str(tmp_path / 'capture.npy')
+    data = (np.arange(32) % 256).astype(np.uint8)
+    # The way RecordSamp saves the normalised samples
+    norm = (data.astype(np.float64) - 127.5) / 127.5
+    np.save(path, (norm[0::2] + 1j * norm[1::2]).astype(np.complex64))
+
+    source = FileSource(path)
+    source.open(FakeTask())
+    assert source.data.dtype == np.float32
+    assert not source.data.flags.owndata
+    blocks = read_blocks(source)
+    source.close()
+
+    assert b''.join(blocks) == data.tobytes()
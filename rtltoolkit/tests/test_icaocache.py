@@ -0,0 +1,66 @@
+import numpy as np
+
+from rtltoolkit.demodtasks.adsbdemod import AdsbDemod
+from rtltoolkit.helpers import modescrc
+from rtltoolkit.helpers.icaocache import IcaoCache
+
+
+def test_addresses_expire():
+    cache = IcaoCache()
+    cache.add(0x4840D6, 100.0)
+
+    assert cache.contains(0x4840D6, 160.0)
+    assert not cache.contains(0x123456, 100.0)
+    assert not cache.contains(0x4840D6, 160.5)
+    # An expired address is dropped once it's looked up
+    assert len(cache) == 0
+
+
+def test_expire_purges_at_most_once_a_timeout():
+    cache = IcaoCache(timeout=60.0)
+    cache.add(1, 0.0)
+    cache.add(2, 50.0)
+
+    cache.expire(70.0)
+    assert sorted(cache.seen) == [2]
+
+    # Too soon after the last purge
+    cache.expire(120.0)
+    assert sorted(cache.seen) == [2]
+    cache.expire(130.5)
+    assert len(cache) == 0
+
+
+def addr_parity_reply(data, icao):
+    # A reply with its parity XORed with the address, as DF4/5/20/21
+    # replies are sent
+    data = np.frombuffer(bytes.fromhex(data), dtype=np.uint8).copy()
+    rem = int(modescrc.remainder(data)[0]) ^ icao
+    data[-3:] ^= np.array([rem >> 16, (rem >> 8) & 0xFF, rem & 0xFF],
+                          dtype=np.uint8)
+    return data.tobytes().hex()
+
+
+def test_address_parity_replies_need_a_known_address():
+    demod = AdsbDemod(2e6, 1090e6, 44.5, 2**16, False, '')
+    msg = addr_parity_reply('28000000000000', 0x4840D6)
+    rem = int(modescrc.remainder(
+        np.frombuffer(bytes.fromhex(msg), dtype=np.uint8))[0])
+    assert rem == 0x4840D6
+
+    assert not demod.check_address(msg, rem, 0.0)
+    # A DF17 squitter confirms the address
+    demod.report(None, [('8d4840d6202cc371c32ce0576098', 0)])
+    now = demod.known_icao.seen[0x4840D6]
+    assert demod.check_address(msg, rem, now + 1.0)
+    assert not demod.check_address(msg, rem, now + 61.0)
+
+
+def test_all_call_replies_carry_their_address():
+    demod = AdsbDemod(2e6, 1090e6, 44.5, 2**16, False, '')
+    # DF11 with a non-zero interrogator code in the remainder
+    msg = addr_parity_reply('5d4840d6000000', 0x12)
+
+    assert not demod.check_address(msg, 0x12, 0.0)
+    demod.known_icao.add(0x4840D6, 0.0)
+    assert demod.check_address(msg, 0x12, 1.0)
@@ -0,0 +1,115 @@
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+
+from rtltoolkit.helpers.metrics import Metrics, StageStats
+
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)'
+                    r'(?:\{((?:[a-zA-Z_][a-zA-Z0-9_]*="[^"\\]*",?)+)\})?'
+                    r' (\S+)$')
+
+
+class FakeTask:
+    samp_rate = 2e6
+    samp_size = 2**18
+
+
+def parse(text):
+    # Checks the Prometheus text format and returns the samples as
+    # {(name, labels): value}, labels as a sorted tuple of pairs
+    assert text.endswith('\n')
+    samples = {}
+    kinds = {}
+    for line in text[:-1].split('\n'):
+        if line.startswith('# HELP '):
+            name = line.split()[2]
+            assert name not in kinds
+            continue
+        if line.startswith('# TYPE '):
+            _, _, name, kind = line.split()
+            assert kind in ('counter', 'gauge', 'histogram')
+            kinds[name] = kind
+            continue
+
+        match = SAMPLE.match(line)
+        assert match, line
+        name, labels, value = match.groups()
+        family = re.sub('_(bucket|sum|count)$', '', name) \
+            if name not in kinds else name
+        assert family in kinds, line
+
+        labels = tuple(sorted(re.findall(r'(\w+)="([^"]*)"', labels or '')))
+        assert (name, labels) not in samples
+        samples[name, labels] = float(value)
+
+    return samples
+
+
+def make_metrics():
+    metrics = Metrics()
+    metrics.start(FakeTask())
+    for elapsed in (2e-5, 3e-4, 3e-4, 0.2, 10.0):
+        metrics.record('detect', metrics.clock() - elapsed)
+    metrics.record('report', metrics.clock())
+    metrics.count_block(0.1)
+    metrics.add_gauge('ring_fill', 'Blocks waiting in the ring', lambda: 3)
+    return metrics
+
+
+def test_render_is_valid_prometheus_text():
+    samples = parse(make_metrics().render())
+    task = ('task', 'FakeTask')
+
+    assert samples['rtltoolkit_blocks_total', (task,)] == 1
+    assert samples['rtltoolkit_block_budget_seconds', (task,)] == \
+        pytest.approx(2**18 / 2e6)
+    assert samples['rtltoolkit_ring_fill', (task,)] == 3
+
+
+def test_histogram_buckets_are_cumulative():
+    samples = parse(make_metrics().render())
+
+    def bucket(le):
+        return samples['rtltoolkit_stage_seconds_bucket',
+                       (('le', le), ('stage', 'detect'),
+                        ('task', 'FakeTask'))]
+
+    counts = [bucket(str(bound)) for bound in StageStats.BUCKETS]
+    assert counts == sorted(counts)
+    assert bucket('0.0005') == 3
+    assert counts[-1] == 4
+    assert bucket('+Inf') == 5
+    labels = (('stage', 'detect'), ('task', 'FakeTask'))
+    assert samples['rtltoolkit_stage_seconds_count', labels] == 5
+    assert samples['rtltoolkit_stage_seconds_sum', labels] == \
+        pytest.approx(10.2006, rel=1e-3)
+    assert samples['rtltoolkit_stage_max_seconds', labels] >= 10.0
+
+
+def test_render_before_start_has_no_empty_labels():
+    text = Metrics().render()
+    assert '{}' not in text
+    assert parse(text)['rtltoolkit_blocks_total', ()] == 0
+
+
+def test_metrics_file_and_http_export(tmp_path):
+    file_name = str(tmp_path / 'metrics.prom')
+    metrics = Metrics(file_name=file_name, port=0, interval=60.0)
+    metrics.start(FakeTask())
+    try:
+        url = 'http://127.0.0.1:{}'.format(
+            metrics.server.server_address[1])
+        with urllib.request.urlopen(url + '/metrics') as resp:
+            assert resp.headers['Content-Type'].startswith('text/plain')
+            parse(resp.read().decode())
+
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + '/other')
+    finally:
+        metrics.stop()
+
+    with open(file_name) as f:
+        parse(f.read())
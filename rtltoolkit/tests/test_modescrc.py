@@ -0,0 +1,68 @@
+import numpy as np
+import pyModeS as pms
+
+from rtltoolkit.helpers import modescrc
+from rtltoolkit.helpers import siggen
+
+
+def random_messages(rng, count, msg_bytes):
+    return rng.integers(0, 256, (count, msg_bytes), dtype=np.uint8)
+
+
+def test_remainder_matches_pymodes():
+    rng = np.random.default_rng(0)
+    for msg_bytes in (7, 14):
+        data = random_messages(rng, 200, msg_bytes)
+        expected = [pms.crc(row.tobytes().hex()) for row in data]
+        assert modescrc.remainder(data).tolist() == expected
+
+
+def test_batch_remainder_mixes_lengths():
+    rng = np.random.default_rng(1)
+    data = random_messages(rng, 100, 14)
+    msg_bits = np.where(rng.random(100) < 0.5, 56, 112)
+
+    rem = modescrc.batch_remainder(data, msg_bits)
+    for row, bits, r in zip(data, msg_bits, rem):
+        assert r == pms.crc(row[:bits // 8].tobytes().hex())
+
+
+def test_valid_messages_have_no_remainder():
+    data = np.array([list(bytes.fromhex(msg)) for msg in siggen.MODES_MSGS],
+                    dtype=np.uint8)
+    assert not modescrc.remainder(data).any()
+
+
+def test_fix_single_bit():
+    rng = np.random.default_rng(2)
+    valid = np.array([list(bytes.fromhex(msg)) for msg in siggen.MODES_MSGS],
+                     dtype=np.uint8)
+
+    # Every message with one random bit flipped, the downlink format
+    # bits excepted
+    rows = rng.integers(0, len(valid), 300)
+    pos = rng.integers(5, 112, 300)
+    data = valid[rows]
+    data[np.arange(300), pos // 8] ^= (0x80 >> (pos % 8)).astype(np.uint8)
+
+    rem = modescrc.remainder(data)
+    assert rem.all()
+    fixed = modescrc.fix_single_bit(data, rem)
+    assert fixed.all()
+    assert np.array_equal(data, valid[rows])
+    assert not modescrc.remainder(data).any()
+
+
+def test_fix_single_bit_leaves_other_errors():
+    valid = np.array([list(bytes.fromhex(siggen.MODES_MSGS[0]))],
+                     dtype=np.uint8)
+
+    # A flipped format bit, and two flipped bits
+    data = np.repeat(valid, 2, axis=0)
+    data[0, 0] ^= 0x80
+    data[1, 5] ^= 0x11
+    before = data.copy()
+
+    fixed = modescrc.fix_single_bit(data, modescrc.remainder(data))
+    assert not fixed.any()
+    assert np.array_equal(data, before)
@@ -0,0 +1,87 @@
+import socket
+import threading
+import time
+
+from rtltoolkit.helpers.outputserver import OutputServer
+
+
+def wait_for(condition, timeout=10.0):
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > end:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def start_server(**kwargs):
+    server = OutputServer('Test', 0, **kwargs)
+    server.start()
+    return server
+
+
+def test_clients_receive_every_chunk():
+    server = start_server()
+    try:
+        socks = [socket.create_connection((server.host, server.port))
+                 for _ in range(2)]
+        assert wait_for(lambda: len(server.clients) == 2)
+
+        chunks = [bytes([k]) * 1000 for k in range(50)]
+        for chunk in chunks:
+            server.send(chunk)
+
+        for sock in socks:
+            received = b''
+            sock.settimeout(10.0)
+            while len(received) < 50000:
+                received += sock.recv(65536)
+            assert received == b''.join(chunks)
+        assert wait_for(lambda: server.bytes_sent == 2 * 50000)
+    finally:
+        server.close()
+
+
+def test_slow_client_is_dropped():
+    server = start_server(max_queue=4)
+    try:
+        slow = socket.create_connection((server.host, server.port))
+        fast = socket.create_connection((server.host, server.port))
+        assert wait_for(lambda: len(server.clients) == 2)
+
+        received = []
+
+        def read():
+            fast.settimeout(10.0)
+            while True:
+                data = fast.recv(1 << 20)
+                if not data:
+                    break
+                received.append(len(data))
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+
+        # The slow client never reads. Once the socket buffers are full
+        # its queue grows until it is disconnected, while the fast one
+        # keeps up as long as it's given the time to
+        chunk = b'\x55' * (1 << 20)
+        sent = 0
+        while server.slow_clients == 0 and sent < 256:
+            server.send(chunk)
+            sent += 1
+            assert wait_for(lambda: sum(received) == sent * len(chunk))
+
+        assert server.slow_clients == 1
+        assert len(server.clients) == 1
+
+        # The dropped client sees its connection closed
+        slow.settimeout(10.0)
+        try:
+            while slow.recv(1 << 20):
+                pass
+        except ConnectionResetError:
+            pass
+    finally:
+        server.close()
+        reader.join(10.0)
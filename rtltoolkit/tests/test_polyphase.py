@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import scipy.signal as signal
+
+from rtltoolkit.helpers.polyphase import Decimator, Resampler, design_taps
+
+
+# Odd block sizes, some shorter than a single phase of the filter
+BLOCK_SIZES = [1, 7, 333, 1000, 4097, 2] * 3
+
+
+def noise(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal(count) + 1j * rng.standard_normal(count)
+
+
+def process_blocks(filt, samples):
+    out = []
+    start = 0
+    for size in BLOCK_SIZES:
+        out.append(filt.process(samples[start:start + size]))
+        start += size
+    out.append(filt.process(samples[start:]))
+
+    return np.concatenate(out)
+
+
+@pytest.mark.parametrize('factor', [1, 2, 5, 7])
+def test_decimator_blocks_match_lfilter(factor):
+    samples = noise(20000)
+    expected = signal.lfilter(design_taps(factor), 1, samples)[::factor]
+
+    out = process_blocks(Decimator(factor), samples)
+    assert len(out) == len(expected)
+    assert np.allclose(out, expected, rtol=0, atol=1e-12)
+
+
+def test_decimator_keeps_single_precision():
+    samples = noise(20000)
+    expected = signal.lfilter(design_taps(5), 1, samples)[::5]
+
+    out = process_blocks(Decimator(5), samples.astype(np.complex64))
+    assert out.dtype == np.complex64
+    assert np.allclose(out, expected, rtol=0, atol=1e-5)
+
+    # Switching back to double precision starts a new history, in the
+    # precision of the new samples
+    decimator = Decimator(5)
+    decimator.process(samples[:1000].astype(np.complex64))
+    assert decimator.process(samples[1000:2000]).dtype == np.complex128
+
+
+@pytest.mark.parametrize('up,down', [(1, 1), (3, 2), (12, 25), (48, 125)])
+def test_resampler_blocks_match_upfirdn(up, down):
+    samples = noise(20000)
+    resampler = Resampler(up, down)
+    expected = signal.upfirdn(resampler.taps, samples, up, down)
+
+    out = process_blocks(resampler, samples)
+    assert len(out) == -(-len(samples) * up // down)
+    assert np.allclose(out, expected[:len(out)], rtol=0, atol=1e-12)
+
+
+def test_resampler_from_rates_reduces_the_ratio():
+    resampler = Resampler.from_rates(200e3, 48e3)
+    assert (resampler.up, resampler.down) == (6, 25)
+
+    # Real audio, as FmDemod feeds it
+    samples = noise(30011).real
+    expected = signal.upfirdn(resampler.taps, samples, 6, 25)
+    out = process_blocks(resampler, samples)
+    assert np.allclose(out, expected[:len(out)], rtol=0, atol=1e-12)
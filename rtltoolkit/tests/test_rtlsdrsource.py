@@ -0,0 +1,42 @@
+import numpy as np
+
+from rtltoolkit.displaytasks.scanfm import ScanFm
+from rtltoolkit.sources.fakertlsdr import FakeRtlSdr
+from rtltoolkit.sources.rtlsdrsource import RtlSdrSource
+
+
+def make_recording(path, num_bytes):
+    data = (np.arange(num_bytes) % 251).astype(np.uint8)
+    data.tofile(str(path))
+    return data
+
+
+def test_scan_retunes_injected_device(tmp_path):
+    samp_size = 2**10
+    path = tmp_path / 'capture.bin'
+    data = make_recording(path, 4 * (samp_size * 2 + RtlSdrSource.FLUSH_BYTES))
+
+    # The way main hands an opened device to ScanFm, which never
+    # opens its source and only retunes it
+    sdr = FakeRtlSdr(str(path))
+    task = ScanFm(2e6, ScanFm.FM_BEGIN_FREQ, 40.2, samp_size)
+    task.source = RtlSdrSource(sdr)
+    task.init_buffers()
+
+    pos = 0
+    for step in range(3):
+        task.center_freq = ScanFm.FM_BEGIN_FREQ + (step + 0.5) * task.samp_rate
+        task.source.retune(task)
+
+        assert sdr.sample_rate == task.samp_rate
+        assert sdr.center_freq == task.center_freq
+        assert sdr.gain == task.gain
+
+        # What the device buffered before the retune is thrown away
+        pos += RtlSdrSource.FLUSH_BYTES
+        assert task.source.read_block(task.raw_buf) == len(task.raw_buf)
+        assert np.array_equal(task.raw_arr, data[pos:pos + len(task.raw_buf)])
+        pos += len(task.raw_buf)
+
+    task.source.close()
+    assert task.source.sdr is None
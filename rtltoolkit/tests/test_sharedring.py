@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+from multiprocessing import resource_tracker
+
+import pytest
+
+from rtltoolkit.helpers.sharedring import SharedRing, SharedRingReader
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRing('rtltest_{}'.format(os.getpid()), block_count=4,
+                      block_size=8, create=True)
+    yield ring
+    ring.close()
+    # Readers attached from this process (or its forks) unregister the
+    # segment from the resource tracker on Pythons without the 'track'
+    # flag, the creator's unlink expects it to be registered
+    resource_tracker.register(ring.shm._name, 'shared_memory')
+    ring.release()
+
+
+def write_blocks(ring, first, count):
+    for k in range(first, first + count):
+        ring.get_write_block()[:] = k
+        ring.commit_write()
+
+
+def read_block(reader):
+    block = reader.get_read_block(timeout=0)
+    if block is None:
+        return None
+    value = int(block[0])
+    assert (block == value).all()
+    reader.release_read()
+    return value
+
+
+def attach(ring, sub_size=8):
+    return SharedRingReader(SharedRing(ring.name), sub_size)
+
+
+def test_blocks_fan_out_to_every_reader(ring):
+    readers = [attach(ring), attach(ring)]
+    assert [reader.entry for reader in readers] == [0, 1]
+
+    write_blocks(ring, 0, 3)
+    for reader in readers:
+        assert [read_block(reader) for _ in range(4)] == [0, 1, 2, None]
+
+    write_blocks(ring, 3, 2)
+    assert read_block(readers[0]) == 3
+    assert ring.consumers[0, SharedRing.CURSOR_POS] == 4
+    assert ring.consumers[1, SharedRing.CURSOR_POS] == 3
+
+    for reader in readers:
+        reader.close()
+    assert not ring.consumers.any()
+
+
+def test_lapped_reader_skips_to_the_oldest_block(ring):
+    reader = attach(ring)
+    write_blocks(ring, 0, 10)
+
+    # One slot is left to the writer
+    assert [read_block(reader) for _ in range(4)] == [7, 8, 9, None]
+    assert reader.overruns == 1
+    assert reader.dropped == 7
+    assert ring.consumers[0, SharedRing.DROPPED_POS] == 7
+    reader.close()
+
+
+def test_torn_block_counts_as_overrun(ring):
+    reader = attach(ring)
+    write_blocks(ring, 0, 1)
+
+    reader.get_read_block(timeout=0)
+    write_blocks(ring, 1, 4)
+    reader.release_read()
+    assert reader.overruns == 1
+    reader.close()
+
+
+def test_sub_blocks(ring):
+    reader = attach(ring, sub_size=4)
+    write_blocks(ring, 0, 2)
+    assert [read_block(reader) for _ in range(5)] == [0, 0, 1, 1, None]
+
+    with pytest.raises(ValueError):
+        attach(ring, sub_size=3)
+    reader.close()
+
+
+def attach_and_report(name, queue, barrier):
+    ring = SharedRing(name)
+    # Every process claims its entry at the same moment
+    barrier.wait()
+    reader = SharedRingReader(ring, 8)
+    queue.put(reader.entry)
+    # Stay attached until every process has claimed its entry
+    barrier.wait()
+    reader.close()
+
+
+def test_concurrent_readers_claim_distinct_entries(ring):
+    ctx = multiprocessing.get_context('fork')
+    count = SharedRing.MAX_CONSUMERS
+
+    # The race is narrow, so it is given several chances
+    for _ in range(5):
+        queue = ctx.Queue()
+        barrier = ctx.Barrier(count)
+        procs = [ctx.Process(target=attach_and_report,
+                             args=(ring.name, queue, barrier))
+                 for _ in range(count)]
+        for proc in procs:
+            proc.start()
+
+        entries = [queue.get(timeout=10) for _ in range(count)]
+        for proc in procs:
+            proc.join(10)
+
+        assert sorted(entries) == list(range(count))
+        assert not ring.consumers.any()
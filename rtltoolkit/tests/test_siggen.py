@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from rtltoolkit.basetasks.sdrtask import SDRTask
+from rtltoolkit.demodtasks.adsbdemod import AdsbDemod
+from rtltoolkit.demodtasks.tempdemod import TempDemod
+from rtltoolkit.helpers import siggen
+
+
+def test_to_uint8_inverts_normalise_samples():
+    levels = (np.arange(256) - 127.5) / 127.5
+    samples = levels + 1j * levels[::-1]
+
+    iq = siggen.to_uint8(samples)
+    assert iq.dtype == np.uint8
+    assert np.array_equal(iq[0::2], np.arange(256))
+    assert np.array_equal(iq[1::2], np.arange(256)[::-1])
+    assert np.allclose(SDRTask.normalise_samples(iq, np.empty(len(iq))),
+                       samples)
+
+
+def test_generators_are_deterministic():
+    noise = siggen.noise(1000, seed=4)
+    assert np.array_equal(noise, siggen.noise(1000, seed=4))
+    assert not np.array_equal(noise, siggen.noise(1000, seed=5))
+    assert len(siggen.fm_tone(1000, 2e5)) == 2000
+    assert np.array_equal(siggen.modes_frames(10000, seed=1)[0],
+                          siggen.modes_frames(10000, seed=1)[0])
+
+
+@pytest.mark.parametrize('samp_rate', [2e6, 2.4e6])
+def test_modes_frames_decode(samp_rate):
+    length = 2**16
+    iq, count = siggen.modes_frames(length, samp_rate=samp_rate)
+    assert len(iq) == length * 2
+    assert count == len(range(500, length - 1000, 1000))
+
+    demod = AdsbDemod(samp_rate, 1090e6, 44.5, length, False, '')
+    frames = [msg for msg, rem in demod.detect(iq) if not rem]
+    assert frames == [siggen.MODES_MSGS[k % len(siggen.MODES_MSGS)].lower()
+                      for k in range(count)]
+
+
+def test_ook_frames_decode():
+    samp_rate = TempDemod.defaults['samp_rate']
+    samp_size = TempDemod.defaults['samp_size']
+    iq, count = siggen.ook_frames(samp_size * 4, samp_rate)
+    assert count > 0
+
+    demod = TempDemod(samp_rate, 433.9e6, 40.2, samp_size, False, '')
+    for start in range(0, len(iq), samp_size * 2):
+        block = iq[start:start + samp_size * 2]
+        demod.execute(SDRTask.normalise_samples(block, np.empty(len(block))))
+    assert demod.decoded == count
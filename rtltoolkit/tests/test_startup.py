@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+from rtltoolkit.bench import HEAVY_MODULES
+
+# Prints the command line help the way 'rtltoolkit --help' does, then
+# the time it took and the heavy modules loaded by then
+HELP_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+from rtltoolkit.main import main
+sys.argv = ['rtltoolkit', '--help']
+try:
+    main()
+except SystemExit:
+    pass
+print(time.perf_counter() - start)
+print(','.join(m for m in {} if m in sys.modules))
+'''.format(HEAVY_MODULES)
+
+# Seconds. Loose enough for a slow machine, the help normally takes
+# well under a tenth of a second
+MAX_STARTUP = 1.0
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_help_loads_no_heavy_module():
+    out = subprocess.run([sys.executable, '-c', HELP_SCRIPT], cwd=ROOT,
+                         check=True, stdout=subprocess.PIPE,
+                         universal_newlines=True).stdout
+
+    elapsed, heavy = out.splitlines()[-2:]
+    assert 'usage: rtltoolkit' in out
+    assert heavy == ''
+    assert float(elapsed) < MAX_STARTUP
@@ -0,0 +1,94 @@
+import socketserver
+import struct
+import threading
+import time
+
+from rtltoolkit.helpers.metrics import NullMetrics
+from rtltoolkit.sources.tcpsource import TcpSource
+
+
+class FakeTask:
+    def __init__(self, center_freq, gain):
+        self.samp_rate = 2.048e6
+        self.center_freq = center_freq
+        self.gain = gain
+        self.samp_size = 6
+        self.metrics = NullMetrics()
+
+
+class FakeRtlTcpHandler(socketserver.BaseRequestHandler):
+    # Answers like rtl_tcp: the dongle info header, then samples once
+    # the source has set it up. The first connection is dropped after
+    # an odd number of bytes, the second one stays open
+    def handle(self):
+        server = self.server
+        connection = len(server.commands)
+        commands = []
+        server.commands.append(commands)
+
+        self.request.sendall(TcpSource.MAGIC + struct.pack('>II', 5, 29))
+
+        while True:
+            cmd = self.recv_command()
+            if cmd is None:
+                return
+            commands.append(cmd)
+
+            # Sample rate, frequency, gain mode and gain
+            if len(commands) == 4:
+                self.request.sendall(server.blocks[connection])
+                if connection == 0:
+                    return
+
+    def recv_command(self):
+        data = b''
+        while len(data) < 5:
+            chunk = self.request.recv(5 - len(data))
+            if not chunk:
+                return None
+            data += chunk
+
+        return struct.unpack('>BI', data)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_commands_and_reconnect():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0),
+                                             FakeRtlTcpHandler)
+    server.daemon_threads = True
+    server.commands = []
+    server.blocks = [bytes([1, 2, 3, 4, 5]), bytes([6, 7, 8, 9, 10, 11])]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    source = TcpSource('127.0.0.1', server.server_address[1],
+                       retry_delay=0.01, max_retries=3)
+    try:
+        source.open(FakeTask(100e6, 40.2))
+
+        # The stream lost after 5 bytes is completed with a zero level
+        # Q byte before the samples of the new connection
+        buf = bytearray(12)
+        assert source.read_block(buf) == len(buf)
+        assert list(buf) == [1, 2, 3, 4, 5, 127, 6, 7, 8, 9, 10, 11]
+        assert source.reconnects == 1
+
+        source.retune(FakeTask(101.5e6, 'auto'))
+        wait_for(lambda: len(server.commands[1]) == 6)
+    finally:
+        source.close()
+        server.shutdown()
+        server.server_close()
+
+    setup = [(TcpSource.SET_SAMPLE_RATE, 2048000),
+             (TcpSource.SET_FREQ, 100000000),
+             (TcpSource.SET_GAIN_MODE, 1),
+             (TcpSource.SET_GAIN, 402)]
+    assert server.commands[0] == setup
+    assert server.commands[1] == setup + [(TcpSource.SET_FREQ, 101500000),
+                                          (TcpSource.SET_GAIN_MODE, 0)]
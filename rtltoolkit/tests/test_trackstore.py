@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pytest
+
+from rtltoolkit.helpers.trackstore import TrackStore
+
+
+def write_points(store, count, icao=0x4ca2b1):
+    for k in range(count):
+        store.append(1000.0 + k, icao, 42.0 + k / 1e3, 23.0, 35000, 450)
+
+
+def test_read_only_leaves_a_partial_chunk(tmp_path):
+    directory = str(tmp_path / 'tracks')
+    writer = TrackStore(directory, chunk_size=4)
+    write_points(writer, 8)
+
+    # A chunk the writer has written the columns of, but not yet
+    # the chunk table record
+    with open(writer.path('time'), 'ab') as f:
+        np.arange(4, dtype=np.float64).tofile(f)
+    with open(writer.path('chunks'), 'ab') as f:
+        f.write(b'\0' * 5)
+    size = os.path.getsize(writer.path('time'))
+
+    reader = TrackStore(directory, read_only=True)
+    assert len(reader) == 8
+    assert np.array_equal(reader.query(0x4ca2b1)['time'],
+                          1000.0 + np.arange(8))
+    assert os.path.getsize(writer.path('time')) == size
+
+    with pytest.raises(ValueError):
+        write_points(reader, 1)
+
+    # Reopening for writing cuts it off
+    assert len(TrackStore(directory)) == 8
+    assert os.path.getsize(writer.path('time')) == 8 * 8
+    assert os.path.getsize(writer.path('chunks')) == \
+        2 * TrackStore.CHUNK_DTYPE.itemsize
+
+
+def fill_store(directory):
+    # Three aircraft taking turns, one point a second, over several
+    # chunks and a few points still buffered
+    store = TrackStore(directory, chunk_size=8)
+    for k in range(30):
+        store.append(1000.0 + k, [0xabc123, 0x4ca2b1, 0x3c6586][k % 3],
+                     40.0 + k, 20.0 - k, alt=1000 * k)
+
+    return store
+
+
+def test_query_icao_across_chunks(tmp_path):
+    store = fill_store(str(tmp_path))
+    assert store.rows == 24 and store.buffered == 6
+
+    points = store.query('4ca2b1')
+    assert np.array_equal(points['time'], 1000.0 + np.arange(1, 30, 3))
+    assert np.array_equal(points['icao'], np.full(10, 0x4ca2b1))
+    assert np.array_equal(points['lat'], 40.0 + np.arange(1, 30, 3))
+    assert np.array_equal(points['alt'], 1000.0 * np.arange(1, 30, 3))
+    assert np.all(np.isnan(points['speed']))
+
+    assert len(store.query(0x123456)['time']) == 0
+
+
+def test_query_time_range(tmp_path):
+    store = fill_store(str(tmp_path))
+
+    # Both bounds are inclusive, the range spans a chunk boundary and
+    # the buffered points
+    points = store.query(start=1006, end=1010)
+    assert np.array_equal(points['time'], 1000.0 + np.arange(6, 11))
+    points = store.query(0xabc123, start=1020)
+    assert np.array_equal(points['time'], 1000.0 + np.arange(21, 30, 3))
+    assert np.array_equal(store.aircraft(end=1001), [0x4ca2b1, 0xabc123])
+    assert len(store.query(start=2000)['time']) == 0
+
+
+def test_reopen_keeps_flushed_points(tmp_path):
+    store = fill_store(str(tmp_path))
+    store.close()
+
+    store = TrackStore(str(tmp_path), chunk_size=8)
+    assert len(store) == 30
+    points = store.query('3c6586')
+    assert np.array_equal(points['time'], 1000.0 + np.arange(2, 30, 3))